@@ -4,6 +4,7 @@ from django.contrib import messages
 from django.shortcuts import redirect
 
 from .models import Backend, Embed
+from .backends import InvalidResponseError
 from .forms import EmbedForm
 from .admin_forms import EmbedFormPreview
 
@@ -16,7 +17,7 @@ class BackendAdmin(admin.ModelAdmin):
             'fields': ('name', 'code_path', 'description')
         }),
         ('Matching Behavior', {
-            'fields': ('regex', 'priority')
+            'fields': ('regex', 'host', 'priority')
         }),
     )
 
@@ -39,22 +40,75 @@ class BackendAdmin(admin.ModelAdmin):
         return redirect('admin:embeds_backend_changelist')
 
 
+try:
+    SimpleListFilter = admin.SimpleListFilter
+except AttributeError:  # DROP_WITH_DJANGO13 # pragma: no cover
+    HasImageFilter = None
+else:
+    class HasImageFilter(SimpleListFilter):
+        title = 'image'
+        parameter_name = 'has_image'
+
+        def lookups(self, request, model_admin):
+            return (('yes', 'Yes'), ('no', 'No'))
+
+        def queryset(self, request, queryset):
+            if self.value() == 'yes':
+                return queryset.with_image()
+            if self.value() == 'no':
+                return queryset.filter(image_url='')
+            return queryset
+
+
 class EmbedAdmin(admin.ModelAdmin):
+    # only stored columns; listing mustn't decode `response_cache`
     list_display = ['url', 'title', 'backend_name',
-                    'provider', 'type', 'cached']
+                    'provider', 'type', 'cached', 'failure_count']
     list_filter = ['backend__name', 'provider', 'type']
-    search_fields = ['url', 'response_cache']
+    if HasImageFilter is not None:  # DROP_WITH_DJANGO13
+        list_filter.append(HasImageFilter)
+    search_fields = ['url', 'title']  # see get_search_results()
+    actions = ['retry_now']
+
+    def get_queryset(self, request):
+        try:
+            qs = super(EmbedAdmin, self).get_queryset(request)
+        except AttributeError:  # DROP_WITH_DJANGO15 # pragma: no cover
+            qs = super(EmbedAdmin, self).queryset(request)
+        return qs.for_listing()
+    queryset = get_queryset  # DROP_WITH_DJANGO15
 
-    def title(self, obj):
-        return obj.response.title if obj.response else ''
+    def get_search_results(self, request, queryset, search_term):
+        """Search through the search index (Django 1.6+)"""
+        return queryset.search(search_term), False
 
     def backend_name(self, obj):
         return obj.backend.name
     backend_name.short_description = "Backend"
+    backend_name.admin_order_field = 'backend__name'
 
     def cached(self, obj):
-        return bool(obj.response_cache)
+        return obj.has_response
     cached.boolean = True
+    cached.admin_order_field = 'has_response'
+
+    def retry_now(self, request, queryset):
+        """Fetch new responses now, ignoring any failure backoff"""
+
+        updated = failed = 0
+        for embed in queryset.with_response():
+            try:
+                if embed.update_response(force=True):
+                    embed.save()
+                    updated += 1
+            except InvalidResponseError:
+                pass
+            if embed.failure_count:
+                failed += 1
+
+        self.message_user(
+            request, "%i updated, %i still failing" % (updated, failed))
+    retry_now.short_description = "Retry fetching the response now"
 
     def get_urls(self):
         try:
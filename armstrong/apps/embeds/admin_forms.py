@@ -19,6 +19,7 @@ try:
 except ImportError:  # DROP_WITH_DJANGO14 # pragma: no cover
     from django.template.defaultfilters import slugify
 
+from . import hedging
 from .models import Embed
 from .backends import InvalidResponseError
 
@@ -201,8 +202,11 @@ class EmbedFormPreview(AdminFormPreview):
         Update the form with the auto-assigned Backend if necessary.
 
         """
+        # an auto-assigned Backend may be beaten by another matching one
+        hedge = hedging.is_enabled() and not form.data['backend']
         try:
-            response = form.instance.get_response()
+            response = form.instance.get_response(hedge=True) if hedge \
+                else form.instance.get_response()
             if not response.is_valid():
                 # throw an error so we can share the except block logic
                 raise InvalidResponseError(response._data)
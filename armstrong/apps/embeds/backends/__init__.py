@@ -1,4 +1,6 @@
+import inspect
 from functools import wraps
+from threading import Lock
 
 
 class InvalidResponseError(Exception):
@@ -23,6 +25,63 @@ def get_backend(path):
     return getattr(module, cls)()
 
 
+def chunked(items, size):
+    """Split a list into lists of at most ``size`` items"""
+
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class BackendRegistry(object):
+    """
+    Hold a single instance of each backend class per process.
+
+    Backend code is stateless from the point of view of the Backend model
+    (or manages its own state, like an API client) so every Backend row
+    with the same ``code_path`` can share one instance instead of importing
+    and constructing it each time a row is loaded.
+
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._backends = {}
+
+    def get(self, path):
+        try:
+            return self._backends[path]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if path not in self._backends:
+                self._backends[path] = get_backend(path)
+            return self._backends[path]
+
+    def reset(self):
+        """Drop every instance so they are rebuilt on next use (for tests)"""
+        with self._lock:
+            self._backends = {}
+
+
+registry = BackendRegistry()
+
+
+_proxy_methods = {}
+
+
+def get_proxy_methods(cls):
+    """Names of the attributes on a backend class marked with @proxy"""
+
+    try:
+        return _proxy_methods[cls]
+    except KeyError:
+        names = frozenset(
+            name for name, attr in inspect.getmembers(cls)
+            if callable(attr) and getattr(attr, 'proxy', False))
+        _proxy_methods[cls] = names
+        return names
+
+
 def proxy(view_func=None):
     """Mark an attribute as proxyable"""
 
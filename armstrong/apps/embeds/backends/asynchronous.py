@@ -0,0 +1,105 @@
+"""
+Non-blocking calls to backends.
+
+``acall()`` and ``acall_many()`` return immediately with a result handle
+that has the same interface as ``multiprocessing.pool.AsyncResult``:
+``get([timeout])``, ``wait([timeout])``, ``ready()`` and ``successful()``.
+Network calls run on a shared, process-wide thread pool so a caller can
+start many fetches and collect them as they finish. Backends that don't
+touch the network are called in place and handed back already finished.
+
+"""
+from threading import Lock
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+
+
+class CompletedResult(object):
+    """An AsyncResult look-alike for a value that is already available"""
+
+    def __init__(self, value=None, error=None):
+        self._value = value
+        self._error = error
+
+    def ready(self):
+        return True
+
+    def successful(self):
+        return self._error is None
+
+    def wait(self, timeout=None):
+        pass
+
+    def get(self, timeout=None):
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class FlattenedResult(object):
+    """Join the lists from a ``map_async()`` result into one list"""
+
+    def __init__(self, result):
+        self._result = result
+
+    def ready(self):
+        return self._result.ready()
+
+    def successful(self):
+        return self._result.successful()
+
+    def wait(self, timeout=None):
+        self._result.wait(timeout)
+
+    def get(self, timeout=None):
+        flattened = []
+        for items in self._result.get(timeout):
+            flattened.extend(items)
+        return flattened
+
+
+_pool = None
+_pool_lock = Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPool(
+                    getattr(settings, 'EMBEDS_ASYNC_WORKERS', 20))
+    return _pool
+
+
+def reset_pool():
+    """Stop the shared pool; a new one starts on next use (for tests)"""
+
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool.join()
+        _pool = None
+
+
+def completed(func, *args):
+    """Call now and wrap the outcome, exceptions included"""
+
+    try:
+        return CompletedResult(func(*args))
+    except Exception as e:
+        return CompletedResult(error=e)
+
+
+def run_async(func, *args):
+    return get_pool().apply_async(func, args)
+
+
+def map_async(func, chunks):
+    """Call func on each chunk in parallel; get() returns one joined list"""
+
+    if len(chunks) == 1:
+        return run_async(func, chunks[0])
+    return FlattenedResult(get_pool().map_async(func, chunks))
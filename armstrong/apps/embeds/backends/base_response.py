@@ -8,6 +8,7 @@ class BaseResponse(object):
     def __init__(self, data=None, fresh=False):
         self._data = data or {}
         self._fresh = bool(fresh)  # True = new response data from the Backend
+        self._variants = {}  # `render` resized to set widths; see Embed
 
     def __eq__(self, other):
         try:
@@ -30,7 +31,7 @@ class BaseResponse(object):
             self._type = None
             name = self._data.get(self._type_field)
             if name:
-                self._type, _ = EmbedType.objects.get_or_create(name=name)
+                self._type = EmbedType.objects.get_for_name(name)
         return self._type
 
     @property
@@ -39,7 +40,7 @@ class BaseResponse(object):
             self._provider = None
             name = self._data.get(self._provider_field)
             if name:
-                self._provider, _ = Provider.objects.get_or_create(name=name)
+                self._provider = Provider.objects.get_for_name(name)
         return self._provider
 
     #
@@ -53,7 +54,37 @@ class BaseResponse(object):
     title = property(lambda self: self._get('title'))
     author_name = property(lambda self: self._get('author_name'))
     author_url = property(lambda self: self._get('author_url'))
+    description = property(lambda self: self._get('description'))
     image_url = property(lambda self: self._get('thumbnail_url'))
     image_height = property(lambda self: self._get('thumbnail_height'))
     image_width = property(lambda self: self._get('thumbnail_width'))
     render = property(lambda self: self._get('html'))
+
+    def build_render_variants(self, widths):
+        """`render` resized to each width, keyed by the width as a string"""
+
+        from ..templatetags.embed_helpers import resize_iframe
+        html = self.render
+        if not html:
+            return {}
+
+        variants = {}
+        for width in widths:
+            variants[str(width)] = resize_iframe(html, width)
+        return variants
+
+    def render_at(self, width):
+        """
+        `render` with its iframes no wider than ``width``. Widths listed in
+        ``EMBEDS_RENDER_WIDTHS`` were resized when the response was stored;
+        others are resized now. Empty without any HTML to render.
+
+        """
+        html = self._variants.get(str(width))
+        if html is None:
+            html = self.render
+            if not html:
+                return ''
+            from ..templatetags.embed_helpers import resize_iframe
+            html = resize_iframe(html, width)
+        return html
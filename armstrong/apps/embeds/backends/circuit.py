@@ -0,0 +1,117 @@
+"""
+Circuit breakers for network backends.
+
+After ``EMBEDS_CIRCUIT_THRESHOLD`` consecutive failed calls (default: 5),
+whether they raised InvalidResponseError or returned a server error, a
+backend's circuit opens and calls fail immediately with CircuitOpenError
+instead of waiting on a service that is down. After
+``EMBEDS_CIRCUIT_RESET`` seconds (default: 60) one caller is let through to
+try again; success closes the circuit, failure opens it for another period.
+
+State lives in the Django cache so every process sees the same circuit.
+
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .. import logger
+from . import InvalidResponseError
+
+
+CACHE_KEY = "armstrong.apps.embeds-circuit-%s-%s"
+
+
+class CircuitOpenError(InvalidResponseError):
+    pass
+
+
+def is_server_error(response):
+    """
+    True for a response that reports the service itself failing: no data at
+    all, or an ``error_code`` of 500 or more. Other invalid responses, like
+    a 404 for a URL, are the URL's problem and not the service's.
+
+    """
+    if response is None:
+        return True
+    if not hasattr(response, 'is_valid') or response.is_valid():
+        return False
+    data = response._data
+    if not data:
+        return True
+    try:
+        return int(data.get('error_code')) >= 500
+    except (TypeError, ValueError):
+        return False
+
+
+def is_failed_call(result):
+    """
+    True when a call()'s response or every one of a call_many()'s
+    responses is a server error
+
+    """
+    if isinstance(result, (list, tuple)):
+        return bool(result) and all(is_server_error(r) for r in result)
+    return is_server_error(result)
+
+
+class CircuitBreaker(object):
+    def __init__(self, name):
+        self.name = name
+        self.failures_key = CACHE_KEY % (name, 'failures')
+        self.open_key = CACHE_KEY % (name, 'open')  # holds the retry time
+        self.trial_key = CACHE_KEY % (name, 'trial')
+
+    @property
+    def threshold(self):
+        return getattr(settings, 'EMBEDS_CIRCUIT_THRESHOLD', 5)
+
+    @property
+    def reset_timeout(self):
+        return getattr(settings, 'EMBEDS_CIRCUIT_RESET', 60)
+
+    def is_open(self):
+        """True while calls are being refused outright"""
+
+        retry_at = cache.get(self.open_key)
+        return retry_at is not None and time.time() < retry_at
+
+    def allow(self):
+        """
+        Whether a call may go ahead. Once the open period is over only one
+        caller at a time gets to find out if the backend has recovered.
+
+        """
+        retry_at = cache.get(self.open_key)
+        if retry_at is None:
+            return True
+        if time.time() < retry_at:
+            return False
+        return cache.add(self.trial_key, 1, self.reset_timeout)
+
+    def record_success(self):
+        if cache.get_many([self.failures_key, self.open_key]):
+            cache.delete_many(
+                [self.failures_key, self.open_key, self.trial_key])
+
+    def record_failure(self):
+        timeout = self.reset_timeout
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:  # not set or expired
+            cache.add(self.failures_key, 1, timeout)
+            failures = 1
+
+        # a failed trial call reopens the circuit straight away
+        if failures >= self.threshold or cache.get(self.open_key):
+            logger.warn("Opening the circuit for %s after %i failures"
+                        % (self.name, failures))
+            # keep the key past the retry time to recognize a trial call
+            cache.set(self.open_key, time.time() + timeout, timeout * 2)
+            cache.delete(self.trial_key)
+
+    def reset(self):
+        cache.delete_many([self.failures_key, self.open_key, self.trial_key])
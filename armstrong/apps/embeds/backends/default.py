@@ -10,6 +10,7 @@ class DefaultResponse(BaseResponse):
 class DefaultBackend(object):
     "Use the only thing we can count on - the `url`"
     response_class = DefaultResponse
+    network = False
 
     @proxy
     def call(self, url):
@@ -1,11 +1,80 @@
 from __future__ import absolute_import
+import json
+try:
+    from urllib import quote, urlencode
+except ImportError:  # PY3 # pragma: no cover
+    from urllib.parse import quote, urlencode
+
 from django.conf import settings
 from embedly import Embedly as EmbedlyAPI
+from embedly.models import Url
 from httplib2 import ServerNotFoundError
 
 from .. import logger
-from . import proxy, InvalidResponseError
+from . import proxy, chunked, InvalidResponseError
 from .base_response import BaseResponse
+from .transport import get_transport, TransportError
+
+
+class EmbedlyClient(EmbedlyAPI):
+    """
+    The Embedly client, sending its requests through a shared keep-alive
+    transport (instead of a new connection per request) to the API at
+    ``settings.EMBEDLY_API_URL``.
+
+    ``_get()`` replaces the library's own, which is private, so the
+    ``embedly`` version is pinned in ``package.json``. Check it still
+    matches the library's before changing the pin.
+
+    """
+    def __init__(self, key=None, transport=None, api_url=None, **kwargs):
+        super(EmbedlyClient, self).__init__(key, **kwargs)
+        self.transport = transport or get_transport()
+        self.api_url = (api_url or getattr(
+            settings, 'EMBEDLY_API_URL', 'http://api.embed.ly')).rstrip('/')
+
+    def _get(self, version, method, url_or_urls, **kwargs):
+        if not url_or_urls:
+            raise ValueError('%s requires a url or a list of urls given: %s' %
+                             (method.title(), url_or_urls))
+
+        multi = isinstance(url_or_urls, list)
+        if multi and len(url_or_urls) > 20:
+            raise ValueError('Embedly accepts only 20 urls at a time. Url '
+                             'Count:%s' % len(url_or_urls))
+
+        kwargs['key'] = kwargs.get('key', self.key)
+        if not kwargs['key']:
+            raise ValueError('Requires a key. None given: %s' % kwargs['key'])
+
+        query = urlencode(kwargs)
+        if multi:
+            query += '&urls=%s' % ','.join(quote(url) for url in url_or_urls)
+        else:
+            query += '&url=%s' % quote(url_or_urls)
+
+        status, content = self.transport.get(
+            '%s/%s/%s?%s' % (self.api_url, version, method, query),
+            headers={'User-Agent': self.user_agent})
+
+        if status == 200:
+            try:
+                data = json.loads(content.decode('utf-8'))
+            except ValueError as e:
+                raise InvalidResponseError(
+                    "Undecodable %s response: %s" % (method, e))
+            if kwargs.get('raw', False) and isinstance(data, dict):
+                data['raw'] = content
+        else:
+            def error():
+                return dict(type='error', error=True, error_code=status)
+            data = [error() for _ in url_or_urls] if multi else error()
+
+        # anything but one entry per URL is returned as is for the caller
+        if multi and isinstance(data, list) and \
+                len(data) == len(url_or_urls):
+            return [Url(d, method, url) for url, d in zip(url_or_urls, data)]
+        return Url(data, method, url_or_urls)
 
 
 class EmbedlyResponse(BaseResponse):
@@ -56,6 +125,7 @@ class EmbedlyBackend(object):
 
     """
     response_class = EmbedlyResponse
+    batch_size = 20  # the API's limit for multiple URLs in one request
 
     def __init__(self):
         try:
@@ -65,17 +135,12 @@ class EmbedlyBackend(object):
             raise ImproperlyConfigured(
                 '%s requires an API key be specified in settings' %
                 type(self).__name__)
-        self.client = EmbedlyAPI(key)
-
-    @proxy
-    def call(self, url):
-        if not url:
-            return None
+        self.client = EmbedlyClient(key)
 
-        logger.debug("Embedly call to oembed('%s')" % url)
+    def _oembed(self, url_or_urls):
         try:
-            response = self.client.oembed(url)
-        except ServerNotFoundError:
+            return self.client.oembed(url_or_urls)
+        except (ServerNotFoundError, TransportError):
             #PY3 use PEP 3134 exception chaining
             import sys
             exc_cls, msg, trace = sys.exc_info()
@@ -83,13 +148,46 @@ class EmbedlyBackend(object):
                    "%s: %s" % (exc_cls.__name__, msg),
                    trace)
 
+    def _wrap_api_response(self, api_response):
         response = self.wrap_response_data(
-            getattr(response, 'data', None), fresh=True)
+            getattr(api_response, 'data', None), fresh=True)
         if not response.is_valid():
             logger.warn("%s error: %s" %
                         (type(response).__name__, response._data))
         return response
 
+    @proxy
+    def call(self, url):
+        if not url:
+            return None
+
+        logger.debug("Embedly call to oembed('%s')" % url)
+        return self._wrap_api_response(self._oembed(url))
+
+    @proxy
+    def call_many(self, urls):
+        """
+        Like call() for a list of URLs, sending up to ``batch_size`` URLs
+        per API request. Responses are returned in the same order.
+
+        """
+        responses = [None] * len(urls)
+        wanted = [(i, url) for i, url in enumerate(urls) if url]
+
+        for chunk in chunked(wanted, self.batch_size):
+            chunk_urls = [url for _, url in chunk]
+            logger.debug("Embedly call to oembed(%s)" % chunk_urls)
+            results = self._oembed(chunk_urls)
+            if not isinstance(results, list) or \
+                    len(results) != len(chunk_urls):
+                # An error for the whole request can't be paired with
+                # the URLs; retry individually to report it per URL
+                results = [self._oembed(url) for url in chunk_urls]
+
+            for (i, _), result in zip(chunk, results):
+                responses[i] = self._wrap_api_response(result)
+        return responses
+
     @proxy
     def wrap_response_data(self, data, **kwargs):
         return self.response_class(data, **kwargs)
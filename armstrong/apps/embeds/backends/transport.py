@@ -0,0 +1,216 @@
+"""
+HTTP transport for backends that call remote APIs.
+
+Connections are kept alive and reused so concurrent fetches don't pay for a
+TCP (and TLS) handshake on every call. Each request has exclusive use of a
+connection, so a transport is safe to share between threads.
+
+``PooledTransport`` keeps idle connections per host in a shared pool.
+``ThreadLocalTransport`` keeps one connection per host for each thread.
+Pick one with the ``EMBEDS_HTTP_TRANSPORT`` setting (a dotted path).
+
+"""
+import errno
+import socket
+from threading import Lock, local
+try:
+    import httplib
+    from Queue import Queue, Empty, Full
+    from urlparse import urlsplit
+except ImportError:  # PY3 # pragma: no cover
+    import http.client as httplib
+    from queue import Queue, Empty, Full
+    from urllib.parse import urlsplit
+
+from django.conf import settings
+
+
+class TransportError(Exception):
+    pass
+
+
+def is_stale_connection(error):
+    """
+    True for how a request on a kept-alive connection that the server has
+    since closed fails. A timeout isn't: the server is just slow and would
+    be as slow again on a fresh connection.
+
+    """
+    if isinstance(error, socket.timeout):
+        return False
+    if isinstance(error, httplib.BadStatusLine):  # closed without a reply
+        return True
+    return isinstance(error, socket.error) and \
+        error.errno in (errno.ECONNRESET, errno.EPIPE)
+
+
+class PooledTransport(object):
+    def __init__(self, connect_timeout=None, read_timeout=None,
+                 pool_size=None):
+        self.connect_timeout = connect_timeout or \
+            getattr(settings, 'EMBEDS_HTTP_CONNECT_TIMEOUT', 5)
+        self.read_timeout = read_timeout or \
+            getattr(settings, 'EMBEDS_HTTP_READ_TIMEOUT', 30)
+        self.pool_size = pool_size or \
+            getattr(settings, 'EMBEDS_HTTP_POOL_SIZE', 10)
+
+        self._lock = Lock()
+        self._pools = {}
+        self._stats = dict(
+            requests=0, errors=0,
+            connections_created=0, connections_reused=0)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        """Counters for sizing and monitoring the pool"""
+
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = sum(q.qsize() for q in self._pools.values())
+        return stats
+
+    def _connect(self, key):
+        scheme, host, port = key
+        cls = httplib.HTTPSConnection if scheme == 'https' \
+            else httplib.HTTPConnection
+        conn = cls(host, port, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        self._count('connections_created')
+        return conn
+
+    def _pool(self, key):
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = Queue(self.pool_size)
+            return self._pools[key]
+
+    def _acquire(self, key):
+        """Return an idle connection (and True) or a new one (and False)"""
+
+        try:
+            conn = self._pool(key).get_nowait()
+        except Empty:
+            return self._connect(key), False
+        self._count('connections_reused')
+        return conn, True
+
+    def _release(self, key, conn):
+        try:
+            self._pool(key).put_nowait(conn)
+        except Full:
+            conn.close()
+
+    def get(self, url, headers=None):
+        """
+        GET the URL and return ``(status, body)``. Network failures raise
+        TransportError. A reused connection the server already closed is
+        retried once on a fresh connection; nothing else is retried.
+
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or '/'
+        if parts.query:
+            path = "%s?%s" % (path, parts.query)
+
+        self._count('requests')
+        retry = True
+        while True:
+            try:
+                conn, reused = self._acquire(key)
+            except (socket.error, httplib.HTTPException) as e:
+                self._count('errors')
+                raise TransportError("%s: %s" % (type(e).__name__, e))
+
+            try:
+                conn.request('GET', path, headers=headers or {})
+                response = conn.getresponse()
+                body = response.read()
+            except (socket.error, httplib.HTTPException) as e:
+                conn.close()
+                if reused and retry and is_stale_connection(e):
+                    retry = False
+                    continue
+
+                self._count('errors')
+                raise TransportError("%s: %s" % (type(e).__name__, e))
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return response.status, body
+
+    def close(self):
+        """Close every idle connection"""
+
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except Empty:
+                    break
+
+
+class ThreadLocalTransport(PooledTransport):
+    """Keep one connection per host for each thread"""
+
+    def __init__(self, *args, **kwargs):
+        super(ThreadLocalTransport, self).__init__(*args, **kwargs)
+        self._local = local()
+
+    def _connections(self):
+        if not hasattr(self._local, 'connections'):
+            self._local.connections = {}
+        return self._local.connections
+
+    def _acquire(self, key):
+        conn = self._connections().pop(key, None)
+        if conn is None:
+            return self._connect(key), False
+        self._count('connections_reused')
+        return conn, True
+
+    def _release(self, key, conn):
+        self._connections()[key] = conn
+
+    def close(self):
+        for conn in self._connections().values():
+            conn.close()
+        self._local.connections = {}
+
+
+_transport = None
+_transport_lock = Lock()
+
+
+def get_transport():
+    """The process-wide transport shared by network backends"""
+
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                path = getattr(
+                    settings, 'EMBEDS_HTTP_TRANSPORT',
+                    'armstrong.apps.embeds.backends.transport.PooledTransport')
+                module, cls = path.rsplit('.', 1)
+                module = __import__(module, fromlist=[cls])
+                _transport = getattr(module, cls)()
+    return _transport
+
+
+def reset_transport():
+    """Close and forget the shared transport (for tests)"""
+
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+        _transport = None
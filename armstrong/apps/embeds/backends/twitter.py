@@ -23,6 +23,7 @@ class TwitterBackend(object):
 
     """
     response_class = TwitterResponse
+    network = False
 
     @proxy
     def call(self, url):
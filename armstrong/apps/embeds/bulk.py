@@ -0,0 +1,219 @@
+"""
+Create Embeds for many URLs at once.
+
+``Embed.objects.bulk_create_from_urls(urls)`` does what saving each new
+Embed would, ``batch_size`` URLs at a time:
+
+- one query finds the URLs that already have an Embed
+- Backends are chosen from the routing table, checking each one's circuit
+  once rather than once per URL
+- responses are fetched through a bounded pool of threads, several URLs per
+  request for backends that support it (as ``refresh`` does)
+- the EmbedTypes and Providers named by the responses are looked up, or
+  created, together
+- the new Embeds are inserted with ``bulk_create()`` in one transaction
+
+An Embed is still created when its fetch fails, with the failure recorded so
+it's retried later, just as ``Embed.save()`` would. URLs that no Backend
+matches are skipped. ``bulk_create()`` doesn't send ``post_save`` so the new
+Embeds are added to the search index directly.
+
+"""
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+from django.db import IntegrityError, models, transaction
+
+try:
+    from django.db.transaction import atomic
+except ImportError:  # DROP_WITH_DJANGO15 # pragma: no cover
+    from django.db.transaction import commit_on_success as atomic
+
+from . import logger, search
+from .backends import chunked
+from .refresh import fetch_many, group_by_backend
+from .routing import router
+
+CREATED = 'created'  # with a valid response
+FAILED = 'failed'  # created, but fetching the response failed
+EXISTS = 'exists'  # the URL already had an Embed
+NO_BACKEND = 'no_backend'  # no Backend matches the URL; nothing created
+
+# ``embed`` is None for NO_BACKEND and ``error`` is only set for FAILED
+BulkOutcome = namedtuple('BulkOutcome', 'url status embed error')
+
+
+def unique(items):
+    """The items without repeats, in their first order"""
+
+    seen = set()
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            yield item
+
+
+def availability():
+    """A ``Backend.is_available`` test that checks each Backend only once"""
+
+    checked = {}
+
+    def available(backend):
+        if backend.pk not in checked:
+            checked[backend.pk] = backend.is_available()
+        return checked[backend.pk]
+    return available
+
+
+def normalize_names(responses):
+    """
+    Look up the EmbedType and Provider of every response at once and attach
+    them so the Embeds don't look them up one by one.
+
+    """
+    from .models import EmbedType, Provider
+
+    for model, field, attr in ((EmbedType, '_type_field', '_type'),
+                               (Provider, '_provider_field', '_provider')):
+        names = [r._data.get(getattr(r, field)) for r in responses]
+        objs = model.objects.get_for_names([n for n in names if n])
+        for response, name in zip(responses, names):
+            setattr(response, attr, objs.get(name) if name else None)
+
+
+def insert(embeds):
+    """INSERT new Embeds, several rows per statement where Django can"""
+
+    from .models import Embed
+    # DROP_WITH_DJANGO13
+    if not hasattr(Embed.objects, 'bulk_create'):  # pragma: no cover
+        for embed in embeds:
+            models.Model.save(embed)  # without Embed.save()'s fetch
+        return
+    Embed.objects.bulk_create(embeds)
+
+
+def insert_in_savepoint(embeds):
+    """
+    insert() the Embeds, rolling back only the insert if it fails so the
+    surrounding transaction can carry on
+
+    """
+    # DROP_WITH_DJANGO15
+    if not hasattr(transaction, 'atomic'):  # pragma: no cover
+        # a nested commit_on_success() doesn't create a savepoint
+        sid = transaction.savepoint()
+        try:
+            insert(embeds)
+        except IntegrityError:
+            transaction.savepoint_rollback(sid)
+            raise
+        transaction.savepoint_commit(sid)
+        return
+    with atomic():
+        insert(embeds)
+
+
+class BulkCreator(object):
+    """
+    Create Embeds for a list of URLs, ``batch_size`` URLs at a time,
+    fetching their responses with ``workers`` threads.
+
+    """
+    def __init__(self, workers=8, batch_size=500):
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+
+    def existing(self, urls):
+        from .models import Embed
+        return dict((e.url, e) for e in Embed.objects.filter(url__in=urls))
+
+    def build(self, urls, outcomes):
+        """Unsaved Embeds with their Backend assigned"""
+
+        from .models import Embed
+
+        available = availability()
+        embeds = []
+        for url in urls:
+            best = router.choose(url, available)
+            if best is None:
+                outcomes[url] = BulkOutcome(url, NO_BACKEND, None, None)
+                continue
+            embed = Embed(url=url, backend=best)
+            embed.needs_upgrade = best != router.choose(url)
+            embeds.append(embed)
+        return embeds
+
+    def fetch(self, pool, embeds):
+        results = []
+        for chunk in pool.map(fetch_many, group_by_backend(embeds)):
+            results.extend(chunk)
+
+        normalize_names([r for _, r, error in results if error is None])
+        for embed, response, error in results:
+            if error is not None:
+                embed.record_failure(error)
+                logger.warn("Fetching %s failed: %s" % (embed, error))
+            else:
+                embed.response = response
+        return results
+
+    def save(self, embeds, outcomes):
+        """Insert the Embeds, passing over URLs taken since they were checked"""
+
+        from .models import Embed
+
+        urls = [e.url for e in embeds]
+        with atomic():
+            try:
+                insert_in_savepoint(embeds)
+            except IntegrityError:
+                taken = self.existing(urls)
+                for url, embed in taken.items():
+                    outcomes[url] = BulkOutcome(url, EXISTS, embed, None)
+                embeds = [e for e in embeds if e.url not in taken]
+                insert(embeds)
+
+            # bulk_create() doesn't set primary keys
+            pks = dict(Embed.objects.filter(url__in=urls)
+                       .values_list('url', 'pk'))
+            for embed in embeds:
+                embed.pk = pks[embed.url]
+            search.index.add_many(embeds)
+        return embeds
+
+    def create_batch(self, pool, urls):
+        """Outcomes by URL"""
+
+        outcomes = {}
+        for url, embed in self.existing(urls).items():
+            outcomes[url] = BulkOutcome(url, EXISTS, embed, None)
+
+        embeds = self.build([u for u in urls if u not in outcomes], outcomes)
+        if not embeds:
+            return outcomes
+
+        errors = dict((e.url, error) for e, _, error in self.fetch(pool, embeds))
+        for embed in self.save(embeds, outcomes):
+            error = errors[embed.url]
+            outcomes[embed.url] = BulkOutcome(
+                embed.url, CREATED if error is None else FAILED, embed, error)
+        return outcomes
+
+    def create(self, urls):
+        """
+        Create Embeds for the URLs that don't have one. Return a
+        ``BulkOutcome`` per distinct URL, in the order given.
+
+        """
+        urls = list(unique(urls))
+        outcomes = {}
+        pool = ThreadPool(self.workers)
+        try:
+            for batch in chunked(urls, self.batch_size):
+                outcomes.update(self.create_batch(pool, batch))
+        finally:
+            pool.close()
+            pool.join()
+        return [outcomes[url] for url in urls]
@@ -1,6 +1,18 @@
+import zlib
+from base64 import b64decode, b64encode
+
+from django.conf import settings
 from django.db import models
 from django.db.models.fields.subclassing import Creator
 from django.db.models.fields.related import ReverseSingleRelatedObjectDescriptor
+from django.db.models.query_utils import DeferredAttribute
+from django_extensions.db.fields.json import JSONField, dumps
+from model_utils.fields import MonitorField
+
+try:
+    string_types = basestring
+except NameError:  # PY3 # pragma: no cover
+    string_types = str
 
 
 class ResetResponseMixin(object):
@@ -56,6 +68,85 @@ class EmbedForeignKey(SetResponseFieldMixin, models.ForeignKey):
     descriptor_class = ResetResponseFKDescriptor
 
 
+class CompressedJSONField(JSONField):
+    """
+    A JSONField that can store its JSON zlib compressed. Compressed values
+    are base64 encoded (the column is still text) after a marker no JSON
+    starts with, so both forms are read and rows can be converted at any
+    time; see the ``compress_embed_responses`` command.
+
+    Values are written compressed when ``EMBEDS_COMPRESS_RESPONSES`` is True
+    and the JSON is at least ``EMBEDS_COMPRESS_MIN_SIZE`` bytes (default:
+    512). Smaller values don't shrink enough to pay for the decompression.
+
+    """
+    marker = 'zlib:'
+
+    def to_python(self, value):
+        if isinstance(value, string_types) and value.startswith(self.marker):
+            value = zlib.decompress(b64decode(value[len(self.marker):]))\
+                .decode('utf-8')
+        return super(CompressedJSONField, self).to_python(value)
+
+    def encode(self, value, compress=None):
+        """The text stored for a value"""
+
+        text = dumps(value)
+        if compress is None:
+            compress = getattr(settings, 'EMBEDS_COMPRESS_RESPONSES', False)
+        if not compress or \
+                len(text) < getattr(settings, 'EMBEDS_COMPRESS_MIN_SIZE', 512):
+            return text
+
+        compressed = self.marker + \
+            b64encode(zlib.compress(text.encode('utf-8'), 6)).decode('ascii')
+        return compressed if len(compressed) < len(text) else text
+
+    def get_db_prep_save(self, value, connection, **kwargs):
+        if value is None and self.null:
+            return None
+        return models.TextField.get_db_prep_save(
+            self, self.encode(value), connection=connection)
+
+
+class DeferredResponseAttribute(DeferredAttribute):
+    """
+    Replaces Django's loader for deferred response data so that the first
+    access loads every deferred response field in one query, through
+    ``Embed.load_response_data()``.
+
+    """
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if self.field_name not in instance.__dict__:
+            instance.load_response_data()
+        return instance.__dict__[self.field_name]
+
+
+class DeferrableMonitorField(MonitorField):
+    """
+    A MonitorField that doesn't load the field it monitors when that field
+    is deferred. A field that was never loaded hasn't changed and one that
+    was set without being loaded is taken to have changed. Whatever loads
+    the field later should call ``_save_initial()``.
+
+    """
+    not_loaded = object()
+
+    def _save_initial(self, sender, instance, **kwargs):
+        if self.monitor in instance.__dict__:
+            super(DeferrableMonitorField, self)._save_initial(
+                sender, instance, **kwargs)
+
+    def pre_save(self, model_instance, add):
+        if self.monitor not in model_instance.__dict__:
+            return models.DateTimeField.pre_save(self, model_instance, add)
+        if not hasattr(model_instance, self.monitor_attname):
+            setattr(model_instance, self.monitor_attname, self.not_loaded)
+        return super(DeferrableMonitorField, self).pre_save(model_instance, add)
+
+
 # If South is installed, create migration rules
 try:
     from south.modelsinspector import add_introspection_rules
@@ -72,3 +163,8 @@ else:  # pragma: no cover
         "^armstrong\.apps\.embeds\.fields\.EmbedURLField",
         "^armstrong\.apps\.embeds\.fields\.EmbedForeignKey"
     ])
+    # their arguments are covered by the rules for the classes they extend
+    add_introspection_rules([], [
+        "^armstrong\.apps\.embeds\.fields\.CompressedJSONField",
+        "^armstrong\.apps\.embeds\.fields\.DeferrableMonitorField"
+    ])
@@ -0,0 +1,86 @@
+"""
+Cache the HTML of Embeds rendered through ArmLayout templates.
+
+What an Embed renders to depends only on the Embed, its response and the
+template name, so each Embed keeps one cache entry holding its fragments by
+template name. The entry is stamped with ``response_last_updated`` and
+ignored once the response changes; saving or deleting the Embed drops it.
+A cached render is then a single cache lookup, with no template search.
+
+Use it by setting ``ARMSTRONG_LAYOUT_BACKEND`` to
+``armstrong.apps.embeds.fragments.CachedLayoutBackend``. Fragments are kept
+for ``EMBEDS_FRAGMENT_CACHE_TIMEOUT`` seconds (default: one day). Templates
+must not depend on anything but the Embed, e.g. ``{% render_model %}``
+``with`` arguments or the request.
+
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+
+CACHE_KEY = "armstrong.apps.embeds-fragments-%s"
+
+
+class FragmentCache(object):
+    @property
+    def timeout(self):
+        return getattr(settings, 'EMBEDS_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+    def _stamp(self, embed):
+        return embed.response_last_updated
+
+    def get(self, embed, name):
+        """The cached fragment or None"""
+
+        if not embed.pk:
+            return None
+        entry = cache.get(CACHE_KEY % embed.pk)
+        if not entry or entry['stamp'] != self._stamp(embed):
+            return None
+        html = entry['fragments'].get(name)
+        return None if html is None else mark_safe(html)
+
+    def set(self, embed, name, html):
+        if not embed.pk:
+            return
+
+        key = CACHE_KEY % embed.pk
+        stamp = self._stamp(embed)
+        entry = cache.get(key)
+        if not entry or entry['stamp'] != stamp:
+            entry = dict(stamp=stamp, fragments={})
+        entry['fragments'][name] = html
+        cache.set(key, entry, self.timeout)
+
+    def invalidate(self, instance, **kwargs):
+        """Usable directly as a ``post_save``/``post_delete`` receiver"""
+
+        from .models import Embed
+        if isinstance(instance, Embed):
+            cache.delete(CACHE_KEY % instance.pk)
+
+
+fragments = FragmentCache()
+
+
+try:
+    from armstrong.core.arm_layout.backends import ModelProvidedLayoutBackend
+except ImportError:  # pragma: no cover
+    pass
+else:
+    class CachedLayoutBackend(ModelProvidedLayoutBackend):
+        """ArmLayout backend that caches how Embeds render"""
+
+        def render(self, object, name, *args, **kwargs):
+            from .models import Embed
+            if not isinstance(object, Embed):
+                return super(CachedLayoutBackend, self)\
+                    .render(object, name, *args, **kwargs)
+
+            html = fragments.get(object, name)
+            if html is None:
+                html = super(CachedLayoutBackend, self)\
+                    .render(object, name, *args, **kwargs)
+                fragments.set(object, name, html)
+            return html
@@ -0,0 +1,156 @@
+"""
+Decide when an Embed's response data is stale and refresh it in the
+background ("stale-while-revalidate").
+
+Stale Embeds are still displayed from ``response_cache``; rendering never
+waits on the network. Instead each stale Embed is queued once for a
+background ``update_response()`` on the shared thread pool, so the Embeds
+people actually look at are the ones kept current.
+
+How long a response stays fresh is, from most to least specific:
+
+- ``EMBEDS_MAX_AGE_BY_TYPE``: a dict of EmbedType name to seconds
+- ``EMBEDS_MAX_AGE_BY_PROVIDER``: a dict of Provider name to seconds
+- ``EMBEDS_MAX_AGE_BY_BACKEND``: a dict of Backend name to seconds
+- ``EMBEDS_MAX_AGE``: seconds, or None (the default) to never go stale
+
+An oEmbed ``cache_age`` in the response shortens that lifetime unless
+``EMBEDS_RESPECT_CACHE_AGE`` is False, but never below ``EMBEDS_MIN_AGE``
+(default: one hour).
+
+"""
+from datetime import timedelta
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection
+
+try:
+    from django.utils.timezone import now
+except ImportError:  # DROP_WITH_DJANGO13 # pragma: no cover
+    from datetime import datetime
+    now = datetime.now
+
+from . import logger
+from .backends.asynchronous import run_async
+
+
+class FreshnessPolicy(object):
+    def _lookup(self, setting, obj):
+        """Look up a related object's name in a setting's dict"""
+
+        mapping = getattr(settings, setting, None)
+        if not mapping or obj is None:
+            return None
+        return mapping.get(obj.name)
+
+    def _cache_age(self, embed):
+        try:
+            return int((embed.response_cache or {}).get('cache_age'))
+        except (TypeError, ValueError):
+            return None
+
+    def max_age(self, embed):
+        """Seconds the Embed's response stays fresh, or None for forever"""
+
+        max_age = None
+        for setting, attr in (('EMBEDS_MAX_AGE_BY_TYPE', 'type'),
+                              ('EMBEDS_MAX_AGE_BY_PROVIDER', 'provider'),
+                              ('EMBEDS_MAX_AGE_BY_BACKEND', 'backend')):
+            # only touch the relation when it's configured
+            if getattr(settings, setting, None):
+                max_age = self._lookup(setting, getattr(embed, attr, None))
+                if max_age is not None:
+                    break
+        if max_age is None:
+            max_age = getattr(settings, 'EMBEDS_MAX_AGE', None)
+
+        cache_age = None
+        if getattr(settings, 'EMBEDS_RESPECT_CACHE_AGE', True):
+            cache_age = self._cache_age(embed)
+        if cache_age is not None:
+            max_age = cache_age if max_age is None else min(max_age, cache_age)
+            max_age = max(max_age, getattr(settings, 'EMBEDS_MIN_AGE', 60 * 60))
+        return max_age
+
+    def is_stale(self, embed):
+        if not embed.response_cache or embed.response_last_updated is None:
+            return False  # nothing to be stale; see Embed.update_response()
+
+        max_age = self.max_age(embed)
+        if max_age is None:
+            return False
+        return embed.response_last_updated + timedelta(seconds=max_age) < now()
+
+
+class Revalidator(object):
+    """
+    Refresh stale Embeds on the shared thread pool, each at most once at a
+    time no matter how often it's requested.
+
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._pending = set()
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'EMBEDS_REVALIDATE', True)
+
+    def queue(self, embed):
+        """Schedule a refresh; return False if one is already pending"""
+
+        if not self.enabled or not embed.pk:
+            return False
+
+        with self._lock:
+            if embed.pk in self._pending:
+                return False
+            self._pending.add(embed.pk)
+
+        try:
+            run_async(self._run, embed.pk)
+        except Exception:
+            self.done(embed.pk)
+            raise
+        return True
+
+    def done(self, pk):
+        with self._lock:
+            self._pending.discard(pk)
+
+    def _run(self, pk):
+        """Revalidate in a pool thread, where errors have nowhere to go"""
+
+        try:
+            self.revalidate(pk)
+        except Exception as e:  # anything the backend or network can throw
+            logger.warn("Revalidating Embed %s failed: %s" % (pk, e))
+        finally:
+            self.done(pk)
+            connection.close()  # this thread's connection
+
+    def revalidate(self, pk):
+        """Reload the Embed and update it if it's still stale"""
+
+        from .models import Embed
+        embed = Embed.objects.select_related('backend').with_response()\
+            .get(pk=pk)
+        if not embed.is_stale():
+            return False
+
+        if embed.update_response():
+            embed.save()
+        elif not embed.failure_count:
+            # confirmed unchanged; fresh again without rewriting the row
+            Embed.objects.filter(pk=pk).update(response_last_updated=now())
+        return True
+
+    def reset(self):
+        """Forget pending Embeds (for tests)"""
+        with self._lock:
+            self._pending.clear()
+
+
+policy = FreshnessPolicy()
+revalidator = Revalidator()
@@ -0,0 +1,120 @@
+"""
+Hedged fetches: cut tail latency when several Backends match a URL.
+
+The preferred Backend is called first. If it hasn't answered by the time
+most of its recent calls had (``EMBEDS_HEDGE_PERCENTILE``, default: the
+90th percentile), or it fails, the next matching Backend is called as well
+and the first valid response wins. Until a Backend has
+``EMBEDS_HEDGE_MIN_SAMPLES`` timings (default: 10) the wait is
+``EMBEDS_HEDGE_DELAY`` seconds (default: 1).
+
+Turn it on with ``EMBEDS_HEDGE = True``. It's used where someone is
+waiting: the admin preview and saving a new Embed.
+
+"""
+from collections import deque
+from threading import Lock
+try:
+    from Queue import Queue, Empty
+except ImportError:  # PY3 # pragma: no cover
+    from queue import Queue, Empty
+
+from django.conf import settings
+
+from .backends.asynchronous import run_async
+
+
+def is_enabled():
+    return getattr(settings, 'EMBEDS_HEDGE', False)
+
+
+class LatencyTracker(object):
+    """Recent call durations per Backend, kept in this process"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._samples = {}  # name: (window size, deque of durations)
+
+    def record(self, name, seconds):
+        size = getattr(settings, 'EMBEDS_HEDGE_SAMPLES', 100)
+        with self._lock:
+            window, samples = self._samples.get(name, (None, ()))
+            if window != size:
+                # deque.maxlen is Python 2.7+ so the size is kept alongside
+                samples = deque(samples, size)
+                self._samples[name] = (size, samples)
+            samples.append(seconds)
+
+    def percentile(self, name, percent):
+        """The given percentile of recent durations, or None if too few"""
+
+        with self._lock:
+            samples = sorted(self._samples.get(name, (None, ()))[1])
+        if not samples or \
+                len(samples) < getattr(settings, 'EMBEDS_HEDGE_MIN_SAMPLES', 10):
+            return None
+        index = int(round(percent / 100.0 * (len(samples) - 1)))
+        return samples[index]
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+
+
+latencies = LatencyTracker()
+
+
+def hedge_delay(backend):
+    """Seconds to wait on a Backend before calling the next one too"""
+
+    delay = latencies.percentile(
+        backend.code_path, getattr(settings, 'EMBEDS_HEDGE_PERCENTILE', 90))
+    if delay is None:
+        delay = getattr(settings, 'EMBEDS_HEDGE_DELAY', 1.0)
+    return delay
+
+
+def hedged_call(url, backends):
+    """
+    Call the Backends for the URL in order, each starting when the one
+    before it is late or has failed. Return the first valid response as a
+    ``(backend, response)`` tuple. If none is valid, return or raise what
+    the first Backend did.
+
+    """
+    backends = list(backends)[:getattr(settings, 'EMBEDS_HEDGE_MAX', 2)]
+    results = Queue()
+
+    def call(backend):
+        try:
+            results.put((backend, backend.call(url), None))
+        except Exception as e:  # anything the backend or network can throw
+            results.put((backend, None, e))
+
+    outcomes = {}
+    started = 0
+    while started < len(backends) or len(outcomes) < started:
+        if len(outcomes) == started:  # nothing running; start the next
+            run_async(call, backends[started])
+            started += 1
+
+        try:
+            if started < len(backends):
+                outcome = results.get(
+                    timeout=hedge_delay(backends[started - 1]))
+            else:
+                outcome = results.get()
+        except Empty:  # late; start the next one alongside
+            run_async(call, backends[started])
+            started += 1
+            continue
+
+        backend, response, error = outcome
+        if error is None and response is not None and response.is_valid():
+            return backend, response
+        outcomes[backend.pk] = outcome
+
+    backend, response, error = outcomes[backends[0].pk]
+    if error is not None:
+        raise error
+    return backend, response
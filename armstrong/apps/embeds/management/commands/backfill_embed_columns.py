@@ -0,0 +1,49 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+try:
+    from django.db.transaction import atomic
+except ImportError:  # DROP_WITH_DJANGO15 # pragma: no cover
+    from django.db.transaction import commit_on_success as atomic
+
+from ...models import Embed
+
+
+class Command(BaseCommand):
+    help = ("Copy response attributes of existing Embeds into their own "
+            "columns (Embed.RESPONSE_COLUMNS). Nothing is fetched.")
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--batch-size', type='int', default=500,
+            help="Embeds read and updated together [default: %default]"),
+    )
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get('verbosity', 1))
+        batch_size = options.get('batch_size', 500)
+
+        qs = Embed.objects.select_related('backend').with_response()\
+            .order_by('pk')
+        done = last_pk = 0
+        while True:
+            # walk the primary key so each batch is an index range scan
+            batch = list(qs.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+
+            with atomic():
+                for embed in batch:
+                    embed.copy_response_columns()
+                    Embed.objects.filter(pk=embed.pk).update(**dict(
+                        (name, getattr(embed, name))
+                        for name in Embed.RESPONSE_COLUMNS))
+
+            done += len(batch)
+            last_pk = batch[-1].pk
+            if verbosity > 1:
+                self.stdout.write("%i Embeds updated\n" % done)
+
+        if verbosity:
+            self.stdout.write("%i Embeds updated\n" % done)
@@ -0,0 +1,89 @@
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+try:
+    from django.db.transaction import atomic
+except ImportError:  # DROP_WITH_DJANGO15 # pragma: no cover
+    from django.db.transaction import commit_on_success as atomic
+
+from ...models import Embed
+
+
+class Command(BaseCommand):
+    help = ("Convert stored response data to compressed (or, with "
+            "--decompress, plain) JSON and report the size and decode cost.")
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--decompress', action='store_true', default=False,
+            help="Store plain JSON again"),
+        make_option(
+            '--dry-run', action='store_true', default=False,
+            help="Only measure; don't change any rows"),
+        make_option(
+            '--batch-size', type='int', default=500,
+            help="Embeds read and updated together [default: %default]"),
+    )
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get('verbosity', 1))
+        batch_size = options.get('batch_size', 500)
+        compress = not options.get('decompress')
+        dry_run = options.get('dry_run')
+
+        field = Embed._meta.get_field('response_cache')
+        qn = connection.ops.quote_name
+        update = "UPDATE %s SET %s = %%s WHERE %s = %%s" % (
+            qn(Embed._meta.db_table), qn(field.column),
+            qn(Embed._meta.pk.column))
+
+        rows = changed = before = after = 0
+        decode_before = decode_after = 0.0
+        last_pk = 0
+        while True:
+            # the stored text as is, not decoded
+            batch = list(Embed.objects.filter(pk__gt=last_pk).order_by('pk')
+                         .values_list('pk', field.attname)[:batch_size])
+            if not batch:
+                break
+
+            updates = []
+            for pk, text in batch:
+                text = text or ''
+                start = time.time()
+                value = field.to_python(text)
+                decode_before += time.time() - start
+
+                new = field.encode(value, compress=compress)
+                start = time.time()
+                field.to_python(new)
+                decode_after += time.time() - start
+
+                rows += 1
+                before += len(text)
+                after += len(new)
+                if new != text:
+                    updates.append((new, pk))
+
+            if updates and not dry_run:
+                with atomic():
+                    cursor = connection.cursor()
+                    for params in updates:
+                        cursor.execute(update, params)
+            changed += len(updates)
+            last_pk = batch[-1][0]
+            if verbosity > 1:
+                self.stdout.write("%i Embeds read\n" % rows)
+
+        if verbosity:
+            self.stdout.write(
+                "%i Embeds, %i %s\n"
+                "Stored size: %i -> %i bytes (%.0f%%)\n"
+                "Decode time: %.1f -> %.1f ms total\n" % (
+                    rows, changed,
+                    "to convert" if dry_run else "converted",
+                    before, after, 100.0 * after / before if before else 100,
+                    decode_before * 1000, decode_after * 1000))
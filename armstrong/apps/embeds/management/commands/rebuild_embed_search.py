@@ -0,0 +1,49 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+try:
+    from django.db.transaction import atomic
+except ImportError:  # DROP_WITH_DJANGO15 # pragma: no cover
+    from django.db.transaction import commit_on_success as atomic
+
+from ...models import Embed
+from ...search import TABLE, index
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the search index from scratch. Saving an Embed keeps it "
+            "current after that.")
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--batch-size', type='int', default=500,
+            help="Embeds read and indexed together [default: %default]"),
+    )
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get('verbosity', 1))
+        batch_size = options.get('batch_size', 500)
+
+        qs = Embed.objects.select_related('backend').with_response()\
+            .order_by('pk')
+        done = last_pk = 0
+
+        # searches see the old index until the new one is complete
+        with atomic():
+            connection.cursor().execute("DELETE FROM %s" % TABLE)
+            while True:
+                batch = list(qs.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+
+                index.add_many(batch)
+
+                done += len(batch)
+                last_pk = batch[-1].pk
+                if verbosity > 1:
+                    self.stdout.write("%i Embeds indexed\n" % done)
+
+        if verbosity:
+            self.stdout.write("%i Embeds indexed\n" % done)
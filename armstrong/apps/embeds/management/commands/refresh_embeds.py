@@ -0,0 +1,112 @@
+import os
+from datetime import timedelta
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+try:
+    from django.utils.timezone import now
+except ImportError:  # DROP_WITH_DJANGO13 # pragma: no cover
+    from datetime import datetime
+    now = datetime.now
+
+from ...models import Embed
+from ...refresh import EmbedRefresher
+
+
+class Command(BaseCommand):
+    help = "Request new response data for Embeds and save what changed."
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--older-than', type='float', metavar='DAYS',
+            help="Only Embeds whose response hasn't changed in DAYS days "
+                 "(or that have never had one)"),
+        make_option(
+            '--backend', action='append', default=[], metavar='NAME',
+            help="Only Embeds using this Backend (repeatable)"),
+        make_option(
+            '--provider', action='append', default=[], metavar='NAME',
+            help="Only Embeds from this Provider (repeatable)"),
+        make_option(
+            '--type', action='append', default=[], metavar='NAME',
+            help="Only Embeds of this EmbedType (repeatable)"),
+        make_option(
+            '--needs-upgrade', action='store_true', default=False,
+            help="Only Embeds using a fallback Backend because their "
+                 "preferred one was unavailable"),
+        make_option(
+            '--force', action='store_true', default=False,
+            help="Include Embeds still backing off after failed fetches"),
+        make_option(
+            '--workers', type='int', default=8,
+            help="Number of concurrent requests [default: %default]"),
+        make_option(
+            '--batch-size', type='int', default=100,
+            help="Embeds fetched and saved together [default: %default]"),
+        make_option(
+            '--checkpoint', metavar='FILE',
+            help="Record progress in FILE and resume from it if it exists. "
+                 "Removed once the refresh completes."),
+    )
+
+    def get_queryset(self, options):
+        qs = Embed.objects.all()
+
+        if options.get('older_than') is not None:
+            cutoff = now() - timedelta(days=options['older_than'])
+            qs = qs.filter(
+                Q(response_last_updated__lt=cutoff) |
+                Q(response_last_updated__isnull=True))
+        if options.get('needs_upgrade'):
+            qs = qs.filter(needs_upgrade=True)
+        if options.get('backend'):
+            qs = qs.filter(backend__name__in=options['backend'])
+        if options.get('provider'):
+            qs = qs.filter(provider__name__in=options['provider'])
+        if options.get('type'):
+            qs = qs.filter(type__name__in=options['type'])
+        return qs
+
+    def read_checkpoint(self, path):
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                return int(f.read().strip())
+        except ValueError:
+            raise CommandError("Checkpoint file %s is corrupt" % path)
+
+    def write_checkpoint(self, path, pk):
+        # write then rename so an interruption can't leave a partial file
+        tmp = "%s.tmp" % path
+        with open(tmp, 'w') as f:
+            f.write(str(pk))
+        os.rename(tmp, path)
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get('verbosity', 1))
+        checkpoint = options.get('checkpoint')
+
+        start_after = self.read_checkpoint(checkpoint)
+        if start_after is not None and verbosity:
+            self.stdout.write("Resuming after Embed %i\n" % start_after)
+
+        refresher = EmbedRefresher(
+            workers=options.get('workers', 8),
+            batch_size=options.get('batch_size', 100),
+            force=options.get('force', False))
+
+        stats = None
+        for stats in refresher.run(self.get_queryset(options), start_after):
+            if checkpoint:
+                self.write_checkpoint(checkpoint, stats.last_pk)
+            if verbosity > 1:
+                self.stdout.write("%s\n" % stats)
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        if verbosity:
+            self.stdout.write("%s\n" % (stats or "Nothing to refresh"))
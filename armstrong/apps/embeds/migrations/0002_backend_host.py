@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeds', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backend',
+            name='host',
+            field=models.CharField(help_text=b'Optional hostname (e.g. youtube.com) the regex applies to, including subdomains. Speeds up automatic assignment; if blank, a hostname is read from the regex if possible.', max_length=100, blank=True),
+            preserve_default=True,
+        ),
+    ]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeds', '0002_backend_host'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='embed',
+            name='failure_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='embed',
+            name='last_error',
+            field=models.TextField(editable=False, blank=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='embed',
+            name='retry_after',
+            field=models.DateTimeField(db_index=True, null=True, editable=False, blank=True),
+            preserve_default=True,
+        ),
+    ]
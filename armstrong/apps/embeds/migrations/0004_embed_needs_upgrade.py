@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeds', '0003_embed_failures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='embed',
+            name='needs_upgrade',
+            field=models.BooleanField(default=False, db_index=True, editable=False),
+            preserve_default=True,
+        ),
+    ]
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django_extensions.db.fields.json
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeds', '0004_embed_needs_upgrade'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='embed',
+            name='render_variants',
+            field=django_extensions.db.fields.json.JSONField(editable=False),
+            preserve_default=True,
+        ),
+    ]
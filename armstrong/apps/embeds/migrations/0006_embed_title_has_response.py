@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeds', '0005_embed_render_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='embed',
+            name='has_response',
+            field=models.BooleanField(default=False, editable=False),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='embed',
+            name='title',
+            field=models.CharField(db_index=True, max_length=255, editable=False, blank=True),
+            preserve_default=True,
+        ),
+    ]
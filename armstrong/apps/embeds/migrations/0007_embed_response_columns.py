@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeds', '0006_embed_title_has_response'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='embed',
+            name='author_name',
+            field=models.CharField(db_index=True, max_length=255, editable=False, blank=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='embed',
+            name='image_height',
+            field=models.PositiveIntegerField(null=True, editable=False, blank=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='embed',
+            name='image_url',
+            field=models.URLField(max_length=500, editable=False, blank=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='embed',
+            name='image_width',
+            field=models.PositiveIntegerField(null=True, editable=False, blank=True),
+            preserve_default=True,
+        ),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from armstrong.apps.embeds.search import get_index, get_installed_index
+
+
+def install(apps, schema_editor):
+    for sql in get_index(schema_editor.connection).install_sql():
+        schema_editor.execute(sql)
+
+
+def uninstall(apps, schema_editor):
+    for sql in get_installed_index(schema_editor.connection).uninstall_sql():
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeds', '0007_embed_response_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import armstrong.apps.embeds.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeds', '0008_embed_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='embed',
+            name='response_cache',
+            field=armstrong.apps.embeds.fields.CompressedJSONField(),
+            preserve_default=True,
+        ),
+    ]
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import armstrong.apps.embeds.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeds', '0009_compressed_response_cache'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='embed',
+            name='response_last_updated',
+            field=armstrong.apps.embeds.fields.DeferrableMonitorField(default=None, null=True, monitor=b'response_cache', blank=True),
+            preserve_default=True,
+        ),
+    ]
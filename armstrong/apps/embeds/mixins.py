@@ -3,6 +3,36 @@ If armstrong.core.arm_layout is being used in this project, provide a
 mixin that will let our Embed Model look for templates based on EmbedType.
 
 """
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.loader import select_template
+
+from .utils import LRUCache
+
+
+# Template names by (model class, type, template name, ...) so rendering
+# doesn't rebuild the candidate paths or probe the template loaders for the
+# ones that don't exist. Sized by ``EMBEDS_TEMPLATE_NAME_CACHE_SIZE``.
+template_names = LRUCache(
+    getattr(settings, 'EMBEDS_TEMPLATE_NAME_CACHE_SIZE', 1000))
+
+
+def resolve_template_names(candidates):
+    """
+    Narrow candidate template names to the one the loaders would pick.
+    Templates are only found once so with ``DEBUG`` on, when templates may
+    be added while the process is running, all candidates are kept.
+
+    """
+    if not candidates or settings.DEBUG:
+        return candidates
+    try:
+        name = getattr(select_template(candidates), 'name', None)
+    except TemplateDoesNotExist:
+        return candidates  # let rendering report every path it tried
+    return [name] if name in candidates else candidates
+
+
 try:
     from armstrong.core.arm_layout.mixins import TemplatesByTypeMixin
 except ImportError:  # pragma: no cover
@@ -34,8 +64,29 @@ else:
                 "embed/template.html"
             It will not include "embedtype/template.html".
 
+            The names are cached per model class, type and template name and
+            narrowed to the template that exists.
+
             """
-            if not self.response or not self.response.is_valid():
+            valid = bool(self.response) and self.response.is_valid()
+            if valid:
+                type = self.type
+                variant = (type.__class__, getattr(type, 'slug', None))
+            else:
+                variant = (self.fallback_template_name,
+                           name in self.templates_without_fallbacks)
+            key = (self._layout_model(self.__class__),
+                   self.base_layout_directory, name, valid) + variant
+
+            names = template_names.get(key)
+            if names is None:
+                names = resolve_template_names(
+                    self._get_layout_template_names(name, valid))
+                template_names.set(key, names)
+            return list(names)
+
+        def _get_layout_template_names(self, name, valid):
+            if not valid:
                 if name not in self.templates_without_fallbacks:
                     name = self.fallback_template_name
 
@@ -46,6 +97,24 @@ else:
                         continue
                     base_path = self._build_model_path(a)
                     ret.append("%s%s.html" % (base_path, name))
-                return ret
+            else:
+                ret = super(TemplatesByEmbedTypeMixin, self)\
+                    .get_layout_template_name(name)
+
+            # a deferred loading class gives its model's paths a second time
+            names = []
+            for n in ret:
+                if n not in names:
+                    names.append(n)
+            return names
+
+        @staticmethod
+        def _layout_model(model_obj):
+            """The model a class Django made for deferred loading stands for"""
+            if getattr(model_obj, '_deferred', False):
+                return model_obj._meta.proxy_for_model
+            return model_obj
 
-            return super(TemplatesByEmbedTypeMixin, self).get_layout_template_name(name)
+        def _build_model_path(self, model_obj):
+            return super(TemplatesByEmbedTypeMixin, self)\
+                ._build_model_path(self._layout_model(model_obj))
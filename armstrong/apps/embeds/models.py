@@ -1,15 +1,43 @@
-import re
-import inspect
-
-from django.db import models
+import sys
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, models
+from django.db.models import Q
+from django.db.models.query_utils import DeferredAttribute
+from django.db.models import signals
+from django.db.models.signals import post_save, post_delete, class_prepared
 from django.template.defaultfilters import slugify
 from django.core.exceptions import ImproperlyConfigured
 from django_extensions.db.fields.json import JSONField
-from model_utils.fields import MonitorField
 
-from .backends import get_backend, InvalidResponseError
-from .fields import EmbedURLField, EmbedForeignKey
+try:
+    from django.utils.timezone import now
+except ImportError:  # DROP_WITH_DJANGO13 # pragma: no cover
+    from datetime import datetime
+    now = datetime.now
+try:
+    from django.utils.encoding import force_text
+except ImportError:  # DROP_WITH_DJANGO13 # pragma: no cover
+    from django.utils.encoding import force_unicode as force_text
+
+from .backends import (
+    registry, get_proxy_methods, chunked, InvalidResponseError)
+from .backends.asynchronous import completed, run_async, map_async
+from .backends.circuit import CircuitBreaker, CircuitOpenError, is_failed_call
+from .bulk import BulkCreator
+from .fields import (
+    EmbedURLField, EmbedForeignKey, CompressedJSONField,
+    DeferrableMonitorField, DeferredResponseAttribute)
+from .fragments import fragments
+from .freshness import policy, revalidator
+from . import hedging
+from .hedging import hedged_call, latencies
 from .mixins import TemplatesByEmbedTypeMixin
+from .routing import router
+from . import search
+from .utils import LRUCache, backoff_delay
 
 
 class Backend(models.Model):
@@ -29,6 +57,12 @@ class Backend(models.Model):
     regex = models.CharField(
         max_length=100,
         help_text="Used to match a URL when automatically assigning backends.")
+    host = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text=("Optional hostname (e.g. youtube.com) the regex applies to, "
+                   "including subdomains. Speeds up automatic assignment; "
+                   "if blank, a hostname is read from the regex if possible."))
     priority = models.PositiveSmallIntegerField(
         default=1,
         help_text=("A higher number means higher priority. "
@@ -44,29 +78,171 @@ class Backend(models.Model):
         to the calling code
 
         """
-        self._proxy_to_backend = []
-        for name, func in inspect.getmembers(self._backend, inspect.ismethod):
-            if hasattr(func, 'proxy') and func.proxy:
-                self._proxy_to_backend.append(name)
+        self._proxy_to_backend = get_proxy_methods(type(self._backend))
 
     def __init__(self, *args, **kwargs):
         super(Backend, self).__init__(*args, **kwargs)
 
-        # Load the backend code and sanity check
+        # Load the shared backend code and sanity check
         try:
-            self._backend = get_backend(self.code_path)
+            self._backend = registry.get(self.code_path)
         except ImportError as e:
             raise ImproperlyConfigured(
                 'Backends must have a code module: %s' % e)
 
         self._setup_backend_proxy_methods()
 
+    @property
+    def batch_size(self):
+        """The number of URLs call_many() can send in one request"""
+        return getattr(self._backend, 'batch_size', 1)
+
+    @property
+    def is_network(self):
+        """False for backends that answer without any network requests"""
+        return getattr(self._backend, 'network', True)
+
+    @property
+    def circuit(self):
+        """The circuit breaker shared by every process using this backend"""
+        return CircuitBreaker(self.code_path)
+
+    def is_available(self):
+        return not self.is_network or not self.circuit.is_open()
+
+    def _call_through_circuit(self, func, arg):
+        if not self.is_network or not arg:
+            return func(arg)
+
+        circuit = self.circuit
+        if not circuit.allow():
+            raise CircuitOpenError(
+                "%s is unavailable after repeated failures" % self.name)
+        started = time.time()
+        try:
+            result = func(arg)
+        except InvalidResponseError:
+            circuit.record_failure()
+            raise
+        if is_failed_call(result):
+            # returned rather than raised, e.g. an HTTP 503
+            circuit.record_failure()
+            return result
+        latencies.record(self.code_path, time.time() - started)
+        circuit.record_success()
+        return result
+
+    def call(self, url):
+        """
+        Call the backend for a URL. Network backends fail fast with
+        CircuitOpenError while repeated failures have opened their circuit.
+
+        """
+        return self._call_through_circuit(self._backend.call, url)
+
+    def call_many(self, urls):
+        """
+        Call the backend for a list of URLs, returning the responses in the
+        same order. Backends without their own batching are called per URL.
+
+        """
+        if 'call_many' in self._proxy_to_backend:
+            return self._call_through_circuit(self._backend.call_many, urls)
+        return [self.call(url) for url in urls]
+
+    def acall(self, url):
+        """
+        Non-blocking call(). Returns an AsyncResult-like handle; use
+        ``get()`` for the response. Network calls run on a shared thread
+        pool; other backends answer immediately.
+
+        """
+        if 'acall' in self._proxy_to_backend:
+            return self._backend.acall(url)
+        if not self.is_network:
+            return completed(self.call, url)
+        return run_async(self.call, url)
+
+    def acall_many(self, urls):
+        """
+        Non-blocking call_many(). Batches of ``batch_size`` URLs are
+        fetched in parallel and ``get()`` returns all the responses in
+        the same order as the URLs.
+
+        """
+        if 'acall_many' in self._proxy_to_backend:
+            return self._backend.acall_many(urls)
+        if not self.is_network:
+            return completed(self.call_many, urls)
+        return map_async(self.call_many, chunked(list(urls), self.batch_size))
+
     def __getattr__(self, name):
         if name in self._proxy_to_backend:
             return getattr(self._backend, name)
         return object.__getattribute__(self, name)
 
 
+class NormalizedNameManager(models.Manager):
+    """
+    Look up the small name-normalization tables (Provider, EmbedType)
+    through a bounded, process-wide cache. Responses need these for every
+    Embed so avoiding the query matters when rendering lists of them.
+
+    """
+    def __init__(self, *args, **kwargs):
+        super(NormalizedNameManager, self).__init__(*args, **kwargs)
+        self._cache = LRUCache(
+            getattr(settings, 'EMBEDS_NAME_CACHE_SIZE', 1000))
+
+    def contribute_to_class(self, model, name):
+        super(NormalizedNameManager, self).contribute_to_class(model, name)
+        post_save.connect(self.clear_cache, sender=model, weak=False)
+        post_delete.connect(self.clear_cache, sender=model, weak=False)
+
+    def clear_cache(self, **kwargs):
+        self._cache.clear()
+
+    def get_for_name(self, name):
+        """
+        Get or create the object with this name.
+
+        Only objects that already existed are cached. A newly created row
+        could still be rolled back with its transaction and shouldn't
+        outlive it in the cache; it'll be cached on its next lookup.
+        ``get_or_create()`` handles concurrent creation of the same name.
+
+        """
+        obj = self._cache.get(name)
+        if obj is None:
+            obj, created = self.get_or_create(name=name)
+            if not created:
+                self._cache.set(name, obj)
+        return obj
+
+    def get_for_names(self, names):
+        """
+        ``get_for_name()`` for several names at once, as a dict by name.
+        The names that aren't cached are read in one query.
+
+        """
+        objs, missing = {}, []
+        for name in set(names):
+            obj = self._cache.get(name)
+            if obj is None:
+                missing.append(name)
+            else:
+                objs[name] = obj
+
+        if missing:
+            for obj in self.filter(name__in=missing):
+                self._cache.set(obj.name, obj)
+                objs[obj.name] = obj
+            for name in missing:
+                if name not in objs:
+                    objs[name] = self.get_for_name(name)
+        return objs
+
+
 class Provider(models.Model):
     """Normalize the embed resource provider"""
 
@@ -76,6 +252,8 @@ class Provider(models.Model):
         editable=False,
         help_text="Automatically populated by the backends")
 
+    objects = NormalizedNameManager()
+
     def __unicode__(self):
         return u"%s" % self.name
 
@@ -94,6 +272,8 @@ class EmbedType(models.Model):
         editable=False,
         help_text="Used as a folder name in the template lookup.")
 
+    objects = NormalizedNameManager()
+
     def __unicode__(self):
         return u"%s" % self.name
 
@@ -105,6 +285,165 @@ class EmbedType(models.Model):
         super(EmbedType, self).save(*args, **kwargs)
 
 
+class EmbedQuerySet(models.query.QuerySet):
+    _for_render = False
+    _for_listing = False
+
+    def for_render(self):
+        """
+        Prepare Embeds for display: join their Backend, EmbedType and
+        Provider, share one Backend instance per row and build every
+        response while the rows are loaded. Rendering a list of Embeds then
+        takes a single query regardless of its length. Stale Embeds are
+        queued for a background refresh.
+
+        """
+        qs = self.select_related('backend', 'type', 'provider').with_response()
+        qs._for_render = True
+        return qs
+
+    def for_listing(self):
+        """
+        Load Embeds for lists of their columns, like the admin changelist:
+        join their Backend, EmbedType and Provider and share one Backend
+        instance per row, but don't read or decode any response data.
+
+        """
+        qs = self.select_related('backend', 'type', 'provider')\
+            .defer(*Embed.RESPONSE_DATA)
+        qs._for_listing = True
+        return qs
+
+    def with_response(self):
+        """
+        Load the response data with the Embeds rather than on first access,
+        for code that uses the response of every Embed it loads.
+
+        """
+        qs = self._clone()
+        names, defer = qs.query.deferred_loading
+        if defer:
+            names = names.difference(Embed.RESPONSE_DATA)
+        else:  # only() lists the fields to load
+            names = names.union(Embed.RESPONSE_DATA)
+        qs.query.deferred_loading = (names, defer)
+        return qs
+
+    def with_image(self):
+        """Embeds whose response has an image (thumbnail)"""
+        return self.exclude(image_url='')
+
+    def search(self, terms):
+        """
+        Embeds whose URL, title, author or description contain every word
+        of ``terms``, found through the search index. Empty terms match all.
+
+        """
+        where = search.index.where(terms)
+        if where is None:
+            return self
+        sql, params = where
+        qn = connection.ops.quote_name
+        return self.extra(
+            where=["%s.%s IN (%s)" % (qn(self.model._meta.db_table),
+                                      qn(self.model._meta.pk.column), sql)],
+            params=params)
+
+    def retry_due(self):
+        """Embeds that aren't waiting out a backoff after failed fetches"""
+
+        return self.filter(Q(retry_after__isnull=True) |
+                           Q(retry_after__lte=now()))
+
+    def _clone(self, *args, **kwargs):
+        kwargs.setdefault('_for_render', self._for_render)
+        kwargs.setdefault('_for_listing', self._for_listing)
+        return super(EmbedQuerySet, self)._clone(*args, **kwargs)
+
+    def iterator(self):
+        objs = super(EmbedQuerySet, self).iterator()
+        if self._for_render:
+            objs = self._prepare_for_render(objs)
+        elif self._for_listing:
+            objs = self._share_backends(objs)
+        return objs
+
+    def _share_backends(self, objs):
+        backend_cache = Embed._meta.get_field('backend').get_cache_name()
+        backends = {}
+
+        for obj in objs:
+            # bypass the descriptor, which would clear the response
+            backend = getattr(obj, backend_cache, None)
+            if backend is not None:
+                backend = backends.setdefault(backend.pk, backend)
+                setattr(obj, backend_cache, backend)
+            yield obj
+
+    def _prepare_for_render(self, objs):
+        for obj in self._share_backends(objs):
+            obj.revalidate_if_stale()
+
+            response = obj.response
+            if response is not None:
+                # reuse the joined objects instead of looking them up
+                data = response._data
+                if obj.type and \
+                        obj.type.name == data.get(response._type_field):
+                    response._type = obj.type
+                if obj.provider and \
+                        obj.provider.name == data.get(response._provider_field):
+                    response._provider = obj.provider
+            yield obj
+
+
+class EmbedManager(models.Manager):
+    def get_queryset(self):
+        return EmbedQuerySet(self.model, using=self._db)
+    get_query_set = get_queryset  # DROP_WITH_DJANGO15
+
+    def for_render(self):
+        return self.get_queryset().for_render()
+
+    def for_listing(self):
+        return self.get_queryset().for_listing()
+
+    def with_response(self):
+        return self.get_queryset().with_response()
+
+    def bulk_create_from_urls(self, urls, workers=8, batch_size=500):
+        """
+        Create Embeds for the URLs that don't have one yet, much faster
+        than saving them one by one; see ``bulk``. Return a
+        ``bulk.BulkOutcome`` for each distinct URL, in the order given.
+
+        """
+        return BulkCreator(workers=workers, batch_size=batch_size)\
+            .create(urls)
+
+    def retry_due(self):
+        return self.get_queryset().retry_due()
+
+    def with_image(self):
+        return self.get_queryset().with_image()
+
+    def search(self, terms):
+        return self.get_queryset().search(terms)
+
+
+class DeferredResponseManager(EmbedManager):
+    """
+    Defers the response data, which is most of an Embed's row, until it's
+    first used. Use ``with_response()`` or ``for_render()`` to load it with
+    the Embeds.
+
+    """
+    def get_queryset(self):
+        return super(DeferredResponseManager, self).get_queryset()\
+            .defer(*self.model.RESPONSE_DATA)
+    get_query_set = get_queryset  # DROP_WITH_DJANGO15
+
+
 class Embed(models.Model, TemplatesByEmbedTypeMixin):
     """
     A URL represented by a Backend that provides the interface for
@@ -123,12 +462,58 @@ class Embed(models.Model, TemplatesByEmbedTypeMixin):
     _response = None
     type = models.ForeignKey(EmbedType, null=True, blank=True)
     provider = models.ForeignKey(Provider, null=True, blank=True)
-    response_cache = JSONField()
-    response_last_updated = MonitorField(
+    response_cache = CompressedJSONField()
+    # `render` resized to each of EMBEDS_RENDER_WIDTHS when it's stored
+    render_variants = JSONField(editable=False)
+    response_last_updated = DeferrableMonitorField(
         default=None, null=True, blank=True, monitor='response_cache')
+    # Deferred by default and loaded together; see load_response_data()
+    RESPONSE_DATA = ('response_cache', 'render_variants')
+
+    # Copied from the response so lists needn't decode `response_cache`;
+    # see copy_response_columns()
+    title = models.CharField(
+        max_length=255, blank=True, db_index=True, editable=False)
+    author_name = models.CharField(
+        max_length=255, blank=True, db_index=True, editable=False)
+    image_url = models.URLField(max_length=500, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False)
+    has_response = models.BooleanField(default=False, editable=False)
+    RESPONSE_COLUMNS = ('title', 'author_name', 'image_url',
+                        'image_width', 'image_height', 'has_response')
+
+    # Failed fetches back off exponentially before the URL is tried again
+    failure_count = models.PositiveIntegerField(default=0, editable=False)
+    last_error = models.TextField(blank=True, editable=False)
+    retry_after = models.DateTimeField(
+        null=True, blank=True, db_index=True, editable=False)
+
+    # Set when a lower priority Backend stood in for an unavailable one
+    needs_upgrade = models.BooleanField(
+        default=False, db_index=True, editable=False)
+
+    # The first manager is the default one, used by dumpdata among others,
+    # so it loads whole rows: deferred instances are a subclass whose name
+    # can't be serialized and loaded again
+    whole_rows = EmbedManager()
+    objects = DeferredResponseManager()
 
     @property
     def response(self):
+        """
+        The wrapped Response object. Rows loaded from the database are only
+        wrapped on first access; callers that never touch the response
+        don't pay for the Backend lookup or the Response object. Nor, unless
+        it was loaded eagerly, for reading the response data.
+
+        """
+        if self._response is None and self.response_cache:
+            self._response = self.backend.wrap_response_data(
+                self.response_cache)
+            self._response._variants = self.render_variants or {}
         return self._response
 
     @response.setter
@@ -153,6 +538,10 @@ class Embed(models.Model, TemplatesByEmbedTypeMixin):
             self.type = response.type
             self.provider = response.provider
             self.response_cache = response._data
+            self.copy_response_columns()
+            self.render_variants = response._variants = \
+                response.build_render_variants(
+                    getattr(settings, 'EMBEDS_RENDER_WIDTHS', ()))
 
     @response.deleter
     def response(self):
@@ -162,44 +551,213 @@ class Embed(models.Model, TemplatesByEmbedTypeMixin):
         self.type = None
         self.provider = None
         self.response_cache = None
+        self.render_variants = None
+        self.copy_response_columns()
+
+    def load_response_data(self):
+        """
+        Load whichever RESPONSE_DATA fields were deferred, in one query.
+        Called on first access to any of them.
+
+        """
+        names = [n for n in self.RESPONSE_DATA if n not in self.__dict__]
+        if not names:
+            return
+
+        values = Embed._base_manager\
+            .using(self._state.db).filter(pk=self.pk)\
+            .values_list(*names).get()
+        for name, value in zip(names, values):
+            self.__dict__[name] = self._meta.get_field(name).to_python(value)
+
+        # the loaded response is the one to compare with when saving
+        field = self._meta.get_field('response_last_updated')
+        field._save_initial(self.__class__, self)
+
+    def copy_response_columns(self):
+        """Copy response attributes into the RESPONSE_COLUMNS fields"""
+
+        response = self.response if self.response_cache else None
+        for name in ('title', 'author_name'):
+            # providers don't always send text, e.g. a numeric title
+            value = force_text(getattr(response, name, None) or '')
+            setattr(self, name, value[:self._meta.get_field(name).max_length])
+
+        # a truncated URL would be a broken one
+        image_url = getattr(response, 'image_url', None) or ''
+        if len(image_url) > self._meta.get_field('image_url').max_length:
+            image_url = ''
+        self.image_url = image_url
+
+        for name in ('image_width', 'image_height'):
+            try:
+                value = int(getattr(response, name, None))
+            except (TypeError, ValueError):
+                value = None
+            if value is not None and value < 0:
+                value = None
+            setattr(self, name, value)
+
+        self.has_response = response is not None
 
     def choose_backend(self, url=None):
-        """Determine the best Backend to use for this object's URL"""
+        """
+        Determine the best Backend to use for this object's URL, passing
+        over Backends whose circuit is open.
 
-        if not (self.url or url):
-            return None
+        """
+        return router.choose(self.url or url, available=Backend.is_available)
 
-        for backend in Backend.objects.all().order_by('-priority'):
-            if re.search(backend.regex, self.url or url):
-                return backend
-        return None
+    def use_best_backend(self):
+        """
+        Assign the best available Backend and flag the Embed for an upgrade
+        if that isn't the one it would have had. Return True if the Backend
+        changed, which clears the response data. An Embed keeps the Backend
+        it has when none is available.
 
-    def get_response(self):
-        """Retrieve a new response from the Backend"""
-        return self.backend.call(self.url)
+        """
+        best = self.choose_backend()
+        self.needs_upgrade = best != router.choose(self.url)
+        if best is None and self.backend_id is not None:
+            return False
+        if best is not None and best.pk == self.backend_id:
+            return False
+        self.backend = best
+        return True
+
+    def get_response(self, hedge=False):
+        """
+        Retrieve a new response from the Backend. If its circuit is open and
+        there's no response data to lose yet, use the next best Backend.
+
+        With ``hedge``, other matching Backends are also tried if this one
+        is slow, and the Embed takes whichever gives the first valid
+        response (again only if there's no response data to lose).
+
+        """
+        if hedge and not self.response_cache:
+            return self._get_hedged_response()
 
-    def update_response(self):
+        try:
+            return self.backend.call(self.url)
+        except CircuitOpenError:
+            if self.response_cache or self.choose_backend() is None or \
+                    not self.use_best_backend():
+                raise
+            return self.backend.call(self.url)
+
+    def _get_hedged_response(self):
+        backends = [self.backend] + [
+            b for b in router.matching(self.url, Backend.is_available)
+            if b.pk != self.backend_id]
+        backend, response = hedged_call(self.url, backends)
+        if backend.pk != self.backend_id:
+            self.backend = backend
+            self.needs_upgrade = backend != router.choose(self.url)
+        return response
+
+    def update_response(self, force=False, hedge=False):
         """
         Get a fresh response from the Backend and update
         if it's valid and different from what we already have.
 
+        Failures are recorded and the Backend isn't asked again until the
+        backoff period has passed, unless ``force`` is True. CircuitOpenError
+        is raised without recording a failure; it's the Backend that's down.
+
         """
-        new = self.get_response()
-        if new and new.is_valid() and new != self.response:
+        if not force and not self.is_retry_due():
+            return False
+
+        try:
+            # keep compatible with get_response() overrides without hedge
+            new = self.get_response(hedge=True) if hedge else \
+                self.get_response()
+        except CircuitOpenError:
+            raise
+        except InvalidResponseError as e:
+            self.record_failure(e)
+            raise
+
+        if not new or not new.is_valid():
+            self.record_failure(new._data if new else "no response")
+            return False
+
+        self.record_success()
+        if new != self.response:
             self.response = new
             return True
         return False
 
+    def is_stale(self):
+        """True when the freshness policy says the response is too old"""
+        return policy.is_stale(self)
+
+    def revalidate_if_stale(self):
+        """
+        Queue a background refresh of a stale response, never blocking.
+        The current response stays in use until it is replaced.
+
+        """
+        if self.is_stale() and self.is_retry_due():
+            revalidator.queue(self)
+            return True
+        return False
+
+    def is_retry_due(self):
+        return self.retry_after is None or self.retry_after <= now()
+
+    def _save_failure_fields(self):
+        if self.pk:
+            type(self).objects.filter(pk=self.pk).update(
+                failure_count=self.failure_count,
+                last_error=self.last_error,
+                retry_after=self.retry_after)
+
+    def record_failure(self, error):
+        """
+        Count a failed fetch and schedule the next attempt. Saved Embeds
+        are updated right away so the backoff holds even if the caller
+        doesn't save.
+
+        """
+        self.failure_count += 1
+        self.last_error = u"%s" % error
+        delay = backoff_delay(
+            self.failure_count,
+            getattr(settings, 'EMBEDS_RETRY_BACKOFF', 60 * 60),
+            getattr(settings, 'EMBEDS_RETRY_BACKOFF_MAX', 60 * 60 * 24 * 30))
+        self.retry_after = now() + timedelta(seconds=delay)
+        self._save_failure_fields()
+
+    def record_success(self):
+        """Forget past failures"""
+
+        if self.failure_count or self.retry_after:
+            self.failure_count = 0
+            self.last_error = ''
+            self.retry_after = None
+            self._save_failure_fields()
+
     def __unicode__(self):
         val = self.url if self.url else self.pk if self.pk else "new"
         return u"Embed-%s" % val
 
-    def __init__(self, *args, **kwargs):
-        super(Embed, self).__init__(*args, **kwargs)
+    # DROP_WITH_DJANGO16
+    def __eq__(self, other):
+        """
+        Django 1.7's comparison: Embeds loaded by ``Embed.objects`` are a
+        deferred subclass, which older versions don't count as equal
 
-        if self.response_cache:
-            self.response = self.backend.wrap_response_data(
-                self.response_cache)
+        """
+        if not isinstance(other, Embed):
+            return False
+        pk = self._get_pk_val()
+        if pk is None:
+            return self is other
+        return pk == other._get_pk_val()
+
+    __hash__ = models.Model.__hash__
 
     def save(self, *args, **kwargs):
         """Auto-assign a Backend and try to load a response for new Embeds"""
@@ -207,11 +765,52 @@ class Embed(models.Model, TemplatesByEmbedTypeMixin):
         if not self.pk:
             # Due to the nature of ForeignKeys, use hasattr instead of getattr
             if not hasattr(self, 'backend'):
-                self.backend = self.choose_backend()
+                self.use_best_backend()
 
             if not self.response:
                 try:
-                    self.update_response()
+                    if hedging.is_enabled():
+                        self.update_response(hedge=True)
+                    else:
+                        self.update_response()
                 except InvalidResponseError:
                     pass
         super(Embed, self).save(*args, **kwargs)
+
+
+# Rebuild the Backend routing table whenever a Backend changes
+post_save.connect(router.invalidate, sender=Backend,
+                  dispatch_uid='embeds_backend_routes_save')
+post_delete.connect(router.invalidate, sender=Backend,
+                    dispatch_uid='embeds_backend_routes_delete')
+
+
+def load_response_data_together(sender, **kwargs):
+    """
+    ``class_prepared`` receiver: the classes Django makes for deferred
+    Embeds load their response data through ``Embed.load_response_data()``
+
+    """
+    if getattr(sender, '_deferred', False) and issubclass(sender, Embed):
+        for name in Embed.RESPONSE_DATA:
+            if isinstance(sender.__dict__.get(name), DeferredAttribute):
+                setattr(sender, name, DeferredResponseAttribute(name, Embed))
+
+
+class_prepared.connect(load_response_data_together,
+                       dispatch_uid='embeds_deferred_response')
+
+# Drop rendered fragments whenever an Embed changes. As with the search
+# index, deferred Embeds are sent as a subclass so any sender is accepted.
+post_save.connect(fragments.invalidate, dispatch_uid='embeds_fragments_save')
+post_delete.connect(fragments.invalidate,
+                    dispatch_uid='embeds_fragments_delete')
+
+# Keep the search index current
+post_save.connect(search.update, dispatch_uid='embeds_search_save')
+post_delete.connect(search.remove, dispatch_uid='embeds_search_delete')
+# DROP_WITH_DJANGO16
+if not hasattr(signals, 'post_migrate'):  # pragma: no cover
+    signals.post_syncdb.connect(
+        search.create_table, sender=sys.modules[__name__],
+        dispatch_uid='embeds_search_table')
@@ -0,0 +1,167 @@
+"""
+Refresh the response data of many Embeds at once.
+
+Fetching is network bound so responses are requested through a bounded pool
+of threads, several URLs per request for backends that support it. Only the
+fetch happens in the workers; comparing responses and saving happens in the
+calling thread, one transaction per batch.
+
+"""
+import time
+from multiprocessing.pool import ThreadPool
+
+try:
+    from django.db.transaction import atomic
+except ImportError:  # DROP_WITH_DJANGO15 # pragma: no cover
+    from django.db.transaction import commit_on_success as atomic
+
+from . import logger
+from .backends import chunked, InvalidResponseError
+
+
+def check_response(embed, response):
+    """Return a ``(embed, response, error)`` tuple for a fetched response"""
+
+    if response is None:
+        return embed, None, InvalidResponseError("no response")
+    if not response.is_valid():
+        return embed, None, InvalidResponseError(response._data)
+    return embed, response, None
+
+
+def fetch_many(embeds):
+    """
+    Get new responses for Embeds that share a Backend with a single
+    ``call_many()``. Return a list of ``(embed, response, error)`` tuples
+    so failures don't stop the rest of a batch.
+
+    """
+    try:
+        responses = embeds[0].backend.call_many([e.url for e in embeds])
+    except Exception as e:  # anything the backend or network can throw
+        return [(embed, None, e) for embed in embeds]
+    return [check_response(embed, response)
+            for embed, response in zip(embeds, responses)]
+
+
+def group_by_backend(embeds, batch_size=None):
+    """
+    Split Embeds into lists that share a Backend and are no longer than
+    that Backend's ``batch_size`` (or the given size), ready for
+    ``fetch_many()``.
+
+    """
+    groups, order = {}, []
+    for embed in embeds:
+        if embed.backend_id not in groups:
+            groups[embed.backend_id] = []
+            order.append(embed.backend_id)
+        groups[embed.backend_id].append(embed)
+
+    tasks = []
+    for backend_id in order:
+        group = groups[backend_id]
+        size = batch_size or group[0].backend.batch_size
+        tasks.extend(chunked(group, size))
+    return tasks
+
+
+class RefreshStats(object):
+    def __init__(self):
+        self.started = time.time()
+        self.processed = self.changed = self.errors = 0
+        self.last_pk = None
+
+    @property
+    def elapsed(self):
+        return time.time() - self.started
+
+    @property
+    def rate(self):
+        """Embeds processed per second"""
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed else 0.0
+
+    def __str__(self):
+        return ("%i processed, %i changed, %i errors in %.1fs (%.1f/s)"
+                % (self.processed, self.changed, self.errors,
+                   self.elapsed, self.rate))
+
+
+class EmbedRefresher(object):
+    """
+    Walk a queryset of Embeds in primary key order, ``batch_size`` rows at a
+    time, fetching new responses with ``workers`` threads and saving the
+    Embeds whose response changed.
+
+    Because rows are visited in primary key order, a run that stopped part
+    way can continue by passing the last finished pk as ``start_after``.
+
+    Failures are recorded on each Embed and Embeds still backing off from
+    earlier failures are skipped unless ``force`` is True.
+
+    """
+    def __init__(self, workers=8, batch_size=100, force=False):
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        self.force = force
+
+    def batches(self, queryset, start_after=None):
+        if not self.force:
+            queryset = queryset.retry_due()
+        queryset = queryset.select_related('backend').with_response()\
+            .order_by('pk')
+        while True:
+            batch = queryset
+            if start_after is not None:
+                batch = batch.filter(pk__gt=start_after)
+            batch = list(batch[:self.batch_size])
+            if not batch:
+                return
+            yield batch
+            start_after = batch[-1].pk
+
+    def fetch_batch(self, pool, embeds):
+        for embed in embeds:
+            if embed.needs_upgrade:
+                # move back to the preferred Backend once it's available
+                embed.use_best_backend()
+
+        results = []
+        for chunk in pool.map(fetch_many, group_by_backend(embeds)):
+            results.extend(chunk)
+        return results
+
+    def save_batch(self, results, stats):
+        with atomic():
+            for embed, response, error in results:
+                stats.processed += 1
+                if error is not None:
+                    stats.errors += 1
+                    embed.record_failure(error)
+                    logger.warn("Refreshing %s failed: %s" % (embed, error))
+                    continue
+
+                embed.record_success()
+                if response != embed.response:
+                    embed.response = response
+                    embed.save()
+                    stats.changed += 1
+
+    def run(self, queryset, start_after=None):
+        """
+        Refresh every Embed in the queryset, yielding the running stats
+        after each batch is saved.
+
+        """
+        stats = RefreshStats()
+        pool = ThreadPool(self.workers)
+        try:
+            for embeds in self.batches(queryset, start_after):
+                results = self.fetch_batch(pool, embeds)
+                self.save_batch(results, stats)
+                stats.last_pk = embeds[-1].pk
+                yield stats
+        finally:
+            pool.close()
+            pool.join()
@@ -0,0 +1,229 @@
+"""
+Process-wide routing table used to auto-assign Backends to URLs.
+
+Backends change rarely but are consulted for every new Embed, so rather
+than query and compile every regex for each URL, the table is built once
+and kept until a Backend is saved or deleted. Other processes compare the
+routing columns of the Backend table with the ones their table was built
+from every ``EMBEDS_ROUTING_CHECK_INTERVAL`` seconds. The data is the
+version, so a table built from rows that were about to change, or whose
+change was rolled back, is replaced at the next check.
+
+Backends are bucketed by the hostname they apply to so a URL is only tested
+against the regexes for its host (and parent domains) plus the catch-all
+Backends that have no host. The host comes from ``Backend.host`` or, when
+that is empty, is read from a regex anchored to a literal hostname such as
+"^https?://twitter\.com/". Any other regex can match anywhere in a URL, even
+in its query string, so it's tested against every URL.
+
+"""
+import re
+import time
+from threading import Lock
+try:
+    from urlparse import urlsplit
+except ImportError:  # PY3 # pragma: no cover
+    from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from . import logger
+
+# The start of a regex anchored to the scheme: "^http://", "^https?:\/\/"...
+ANCHORED_SCHEME_RE = re.compile(r'\^https?\??:(?:\\?/){2}')
+# An optional leading subdomain group such as "(www\.)?" or "(?:[^/]+\.)*"
+OPTIONAL_SUBDOMAIN_RE = re.compile(r'\((?:\?:)?[^()|]*\\\.\)[?*]')
+# Hostname characters; an unescaped "." is treated as a literal dot
+LITERAL_HOST_RE = re.compile(r'(?:[A-Za-z0-9-]|\\?\.)+')
+
+
+def host_from_regex(regex):
+    """
+    Find the literal hostname a Backend regex is restricted to, or None.
+
+    Only the simple, common forms anchored to the start of the URL are
+    recognized, e.g. "^https?://twitter.com/" or
+    "^https?://(www\\.)?youtube\\.com/watch". Anything else (no anchor,
+    alternation, character classes, a host that isn't followed by a path,
+    port or "$") makes the Backend a catch-all, which is always safe: an
+    unanchored "//twitter.com/" also matches "http://a.com/?u=//twitter.com/"
+    and a host at the end of the regex ("^https?://www\.youtube") may only
+    be the start of the URL's hostname.
+
+    """
+    if not regex or '|' in regex:
+        return None
+
+    match = ANCHORED_SCHEME_RE.match(regex)
+    if not match:
+        return None
+    rest = regex[match.end():]
+
+    match = OPTIONAL_SUBDOMAIN_RE.match(rest)
+    if match:
+        rest = rest[match.end():]
+
+    match = LITERAL_HOST_RE.match(rest)
+    if not match:
+        return None
+
+    tail = rest[match.end():]
+    if not tail.startswith(('/', '\\/', ':', '$')):
+        return None
+
+    host = match.group().replace('\\.', '.').lower()
+    if host.startswith('.') or host.endswith('.'):
+        return None  # only part of the hostname is literal
+    return host
+
+
+def host_suffixes(host):
+    """"a.b.com" -> ["a.b.com", "b.com", "com"]"""
+
+    labels = host.split('.')
+    return ['.'.join(labels[i:]) for i in range(len(labels))]
+
+
+class BackendRouter(object):
+    """
+    Match URLs to Backends without touching the database.
+
+    The table holds a tuple of ``(compiled regex, Backend)`` pairs in priority
+    order alongside an index of the same routes by host. It is swapped in
+    whole when rebuilt so readers never need to lock.
+
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._table = None
+        self._version = None
+        self._last_checked = 0
+
+    @property
+    def check_interval(self):
+        """Seconds between checks of the Backend table for changes"""
+        return getattr(settings, 'EMBEDS_ROUTING_CHECK_INTERVAL', 5)
+
+    def _load_backends(self):
+        from .models import Backend
+        return list(Backend.objects.all().order_by('-priority'))
+
+    def _version_of(self, backends):
+        """Everything about the Backends that the table depends on"""
+        return sorted((b.pk, b.code_path, b.regex, b.host, b.priority)
+                      for b in backends)
+
+    def _compile(self, backends):
+        routes = []
+        for backend in backends:
+            try:
+                routes.append((re.compile(backend.regex), backend))
+            except re.error as e:
+                logger.warn("Skipping Backend %s with invalid regex %r: %s"
+                            % (backend.pk, backend.regex, e))
+        return tuple(routes)
+
+    def _build_index(self, routes):
+        """
+        Bucket routes by host. Each entry keeps its position in the overall
+        priority order so candidates from several buckets can be merged.
+
+        """
+        by_host, catchall = {}, []
+        for position, (regex, backend) in enumerate(routes):
+            host = backend.host.strip('.').lower() or \
+                host_from_regex(backend.regex)
+            entry = (position, regex, backend)
+            if host:
+                by_host.setdefault(host, []).append(entry)
+            else:
+                catchall.append(entry)
+        return by_host, tuple(catchall)
+
+    def _rebuild(self, backends=None):
+        with self._lock:
+            if backends is None:
+                backends = self._load_backends()
+            routes = self._compile(backends)
+            by_host, catchall = self._build_index(routes)
+            self._table = (routes, by_host, catchall)
+            self._version = self._version_of(backends)
+            self._last_checked = time.time()
+        return self._table
+
+    @property
+    def table(self):
+        if self._table is None:
+            return self._rebuild()
+
+        now = time.time()
+        if now - self._last_checked >= self.check_interval:
+            self._last_checked = now
+            # cheap next to compiling; only rebuild when something changed
+            backends = self._load_backends()
+            if self._version_of(backends) != self._version:
+                return self._rebuild(backends)
+        return self._table
+
+    @property
+    def routes(self):
+        return self.table[0]
+
+    def candidates(self, url):
+        """
+        Routes worth testing for the URL, in priority order. Without a
+        parseable hostname every route is a candidate.
+
+        """
+        routes, by_host, catchall = self.table
+
+        try:
+            host = urlsplit(url).hostname
+        except ValueError:
+            host = None
+        if not host:
+            return routes
+
+        entries = list(catchall)
+        for suffix in host_suffixes(host):
+            entries.extend(by_host.get(suffix, ()))
+        entries.sort()
+        return [(regex, backend) for _, regex, backend in entries]
+
+    def matching(self, url, available=None):
+        """
+        Generate the Backends matching the URL in priority order.
+        ``available`` is an optional test to pass over some Backends.
+
+        """
+        if not url:
+            return
+
+        for regex, backend in self.candidates(url):
+            if regex.search(url) and (available is None or available(backend)):
+                yield backend
+
+    def choose(self, url, available=None):
+        """Return the highest priority Backend matching the URL or None"""
+
+        for backend in self.matching(url, available):
+            return backend
+        return None
+
+    def invalidate(self, **kwargs):
+        """
+        Drop the local table. Usable directly as a ``post_save``/
+        ``post_delete`` signal receiver; other processes find the change
+        once it's committed.
+
+        """
+        self._table = None
+
+    def reset(self):
+        """Forget the table and when it was checked (for tests)"""
+        self._table = None
+        self._version = None
+        self._last_checked = 0
+
+
+router = BackendRouter()
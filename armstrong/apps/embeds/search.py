@@ -0,0 +1,256 @@
+"""
+Full-text search over Embeds.
+
+Each Embed's URL, title, author and description are kept in a search index
+that is updated whenever the Embed is saved or deleted. The index uses what
+the database offers:
+
+- SQLite: an FTS5 (or FTS4) virtual table
+- PostgreSQL: a ``tsvector`` column with a GIN index, using the text search
+  configuration in ``EMBEDS_SEARCH_CONFIG`` (default: ``'english'``)
+- anything else: a table of lowercased text matched with ``LIKE``, which is
+  still a scan but of far less data than ``response_cache``
+
+Search with ``Embed.objects.search("some words")``; every word must match.
+The table is created by a migration, or by ``syncdb`` on Django versions
+before migrations. Run ``manage.py rebuild_embed_search`` to index existing
+Embeds.
+
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, connections, transaction, DEFAULT_DB_ALIAS
+
+TABLE = 'embeds_embed_search'
+WORDS = re.compile(r'\w+', re.U)
+
+
+def document(embed):
+    """The indexed text of an Embed, by column"""
+
+    response = embed.response if embed.response_cache else None
+    return (
+        embed.url or '',
+        embed.title or '',
+        embed.author_name or '',
+        getattr(response, 'description', None) or '')
+
+
+class SearchIndex(object):
+    """
+    The fallback index: one row of lowercased text per Embed.
+    Subclasses use the database's own full-text search.
+
+    """
+    def install_sql(self):
+        return ["CREATE TABLE %s (embed_id integer PRIMARY KEY, "
+                "document text NOT NULL)" % TABLE]
+
+    def uninstall_sql(self):
+        return ["DROP TABLE %s" % TABLE]
+
+    def insert_sql(self):
+        return "INSERT INTO %s (embed_id, document) VALUES (%%s, %%s)" % TABLE
+
+    def insert_params(self, pk, columns):
+        return [pk, " ".join(columns).lower()]
+
+    def insert(self, cursor, pk, columns):
+        cursor.execute(self.insert_sql(), self.insert_params(pk, columns))
+
+    def remove(self, cursor, pk):
+        cursor.execute("DELETE FROM %s WHERE embed_id = %%s" % TABLE, [pk])
+
+    def update(self, embed):
+        cursor = connection.cursor()
+        self.remove(cursor, embed.pk)
+        self.insert(cursor, embed.pk, document(embed))
+
+    def add_many(self, embeds):
+        """Index Embeds that aren't in the index yet, in one statement"""
+
+        if embeds:
+            connection.cursor().executemany(self.insert_sql(), [
+                self.insert_params(e.pk, document(e)) for e in embeds])
+
+    def where(self, terms):
+        """SQL matching Embed ids and its params, or None for no terms"""
+
+        words = [w.lower() for w in WORDS.findall(terms)]
+        if not words:
+            return None
+        # \w includes the "_" wildcard
+        return ("SELECT embed_id FROM %s WHERE %s" % (
+            TABLE, " AND ".join(["document LIKE %s ESCAPE '!'"] * len(words))),
+            ["%%%s%%" % w.replace('_', '!_') for w in words])
+
+
+class SQLiteSearchIndex(SearchIndex):
+    def __init__(self, module='fts5'):
+        self.module = module
+
+    def install_sql(self):
+        return ["CREATE VIRTUAL TABLE %s USING %s("
+                "url, title, author_name, description)" % (TABLE, self.module)]
+
+    def insert_sql(self):
+        return ("INSERT INTO %s (rowid, url, title, author_name, description) "
+                "VALUES (%%s, %%s, %%s, %%s, %%s)" % TABLE)
+
+    def insert_params(self, pk, columns):
+        return [pk] + list(columns)
+
+    def remove(self, cursor, pk):
+        cursor.execute("DELETE FROM %s WHERE rowid = %%s" % TABLE, [pk])
+
+    def where(self, terms):
+        words = WORDS.findall(terms)
+        if not words:
+            return None
+        # quote each word so nothing is read as query syntax
+        query = " ".join('"%s"' % w for w in words)
+        return ("SELECT rowid FROM %s WHERE %s MATCH %%s" % (TABLE, TABLE),
+                [query])
+
+
+class PostgreSQLSearchIndex(SearchIndex):
+    @property
+    def config(self):
+        return getattr(settings, 'EMBEDS_SEARCH_CONFIG', 'english')
+
+    def install_sql(self):
+        return [
+            "CREATE TABLE %s (embed_id integer PRIMARY KEY, "
+            "document tsvector NOT NULL)" % TABLE,
+            "CREATE INDEX %s_document ON %s USING gin(document)"
+            % (TABLE, TABLE)]
+
+    def insert_sql(self):
+        # weight the title and author above the description and URL
+        return ("INSERT INTO %s (embed_id, document) VALUES (%%s, "
+                "setweight(to_tsvector(%%s, %%s), 'A') || "
+                "setweight(to_tsvector(%%s, %%s), 'B') || "
+                "to_tsvector(%%s, %%s))" % TABLE)
+
+    def insert_params(self, pk, columns):
+        return [pk, self.config, columns[1], self.config, columns[2],
+                self.config, " ".join([columns[0], columns[3]])]
+
+    def where(self, terms):
+        if not WORDS.search(terms):
+            return None
+        return ("SELECT embed_id FROM %s WHERE document @@ "
+                "plainto_tsquery(%%s, %%s)" % TABLE, [self.config, terms])
+
+
+def _sqlite_module(conn):
+    cursor = conn.cursor()
+    for module in ('fts5', 'fts4'):
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE temp.embeds_probe USING %s(a)" % module)
+        except Exception:  # DatabaseError wrapped by the backend
+            continue
+        cursor.execute("DROP TABLE temp.embeds_probe")
+        return module
+    return None
+
+
+def get_index(conn=None):
+    """The search index suited to the database"""
+
+    conn = conn or connection
+    if conn.vendor == 'postgresql':
+        return PostgreSQLSearchIndex()
+    if conn.vendor == 'sqlite':
+        module = _sqlite_module(conn)
+        if module:
+            return SQLiteSearchIndex(module)
+    return SearchIndex()
+
+
+def get_installed_index(conn=None):
+    """
+    The index that matches the table that was created. A SQLite table made
+    without FTS stays the fallback kind even if FTS becomes available.
+
+    """
+    conn = conn or connection
+    if conn.vendor == 'sqlite':
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE name = %s", [TABLE])
+        row = cursor.fetchone()
+        sql = (row[0] if row else '').lower()
+        for module in ('fts5', 'fts4'):
+            if 'using %s' % module in sql:
+                return SQLiteSearchIndex(module)
+        return SearchIndex()
+    return get_index(conn)
+
+
+def install(conn=None):
+    """Create the index table unless it's already there"""
+
+    conn = conn or connection
+    if TABLE in conn.introspection.table_names():
+        return False
+    cursor = conn.cursor()
+    for sql in get_index(conn).install_sql():
+        cursor.execute(sql)
+    # DROP_WITH_DJANGO15
+    if not hasattr(transaction, 'atomic'):  # pragma: no cover
+        transaction.commit_unless_managed(using=conn.alias)
+    index.reset()
+    return True
+
+
+class IndexProxy(object):
+    """Look up the installed index on first use, once per process"""
+
+    _index = None
+
+    def __getattr__(self, name):
+        if self._index is None:
+            self._index = get_installed_index()
+        return getattr(self._index, name)
+
+    def reset(self):
+        self._index = None
+
+
+index = IndexProxy()
+
+
+# Receivers aren't limited to the Embed sender: a deferred Embed is a
+# subclass and saving one sends that class instead
+
+def update(instance, **kwargs):
+    """``post_save`` receiver: reindex the Embed"""
+
+    from .models import Embed
+    if not isinstance(instance, Embed):
+        return
+    if not kwargs.get('created') and 'response_cache' not in instance.__dict__:
+        # the response wasn't loaded so it hasn't changed; nor has the URL
+        # since that clears the response
+        return
+    index.update(instance)
+
+
+def create_table(sender, db=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    ``post_syncdb`` receiver: create the table where there's no migration
+    to do it, i.e. Django before 1.7 without South
+
+    """
+    install(connections[db])
+
+
+def remove(instance, **kwargs):
+    """``post_delete`` receiver: drop the Embed from the index"""
+
+    from .models import Embed
+    if isinstance(instance, Embed):
+        index.remove(connection.cursor(), instance.pk)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding field 'Embed.needs_upgrade'
+        db.add_column(u'embeds_embed', 'needs_upgrade',
+                      self.gf('django.db.models.fields.BooleanField')(default=False, db_index=True),
+                      keep_default=False)
+
+
+    def backwards(self, orm):
+        # Deleting field 'Embed.needs_upgrade'
+        db.delete_column(u'embeds_embed', 'needs_upgrade')
+
+
+    models = {
+        u'embeds.backend': {
+            'Meta': {'object_name': 'Backend'},
+            'code_path': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '100'}),
+            'description': ('django.db.models.fields.CharField', [], {'max_length': '255', 'null': 'True', 'blank': 'True'}),
+            'host': ('django.db.models.fields.CharField', [], {'max_length': '100', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'priority': ('django.db.models.fields.PositiveSmallIntegerField', [], {'default': '1'}),
+            'regex': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        },
+        u'embeds.embed': {
+            'Meta': {'object_name': 'Embed'},
+            'backend': ('armstrong.apps.embeds.fields.EmbedForeignKey', [], {'to': u"orm['embeds.Backend']", 'response_attr': "'response'", 'blank': 'True'}),
+            'failure_count': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'last_error': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'needs_upgrade': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'provider': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['embeds.Provider']", 'null': 'True', 'blank': 'True'}),
+            'response_cache': ('django.db.models.fields.TextField', [], {'default': "'{}'"}),
+            'response_last_updated': ('model_utils.fields.MonitorField', [], {'default': 'None', 'null': 'True', 'monitor': "'response_cache'", 'blank': 'True'}),
+            'retry_after': ('django.db.models.fields.DateTimeField', [], {'db_index': 'True', 'null': 'True', 'blank': 'True'}),
+            'type': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['embeds.EmbedType']", 'null': 'True', 'blank': 'True'}),
+            'url': ('armstrong.apps.embeds.fields.EmbedURLField', [], {'response_attr': "'response'", 'max_length': '200', 'unique': 'True'})
+        },
+        u'embeds.embedtype': {
+            'Meta': {'object_name': 'EmbedType'},
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '25'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'unique': 'True', 'max_length': '25'})
+        },
+        u'embeds.provider': {
+            'Meta': {'object_name': 'Provider'},
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '50'})
+        }
+    }
+
+    complete_apps = ['embeds']
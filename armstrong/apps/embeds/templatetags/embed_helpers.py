@@ -1,29 +1,227 @@
+import re
+from hashlib import sha1
+
+from django.conf import settings
 from django.template import Library, TemplateSyntaxError
 from django.template.defaultfilters import stringfilter
 
 from .. import logger
+from ..utils import LRUCache
 
 register = Library()
 
 
+class ResizeCache(object):
+    """
+    Memoize ``resize_iframe`` by a hash of the HTML and the width: a bounded
+    in-process LRU (``EMBEDS_RESIZE_CACHE_SIZE``, default: 1000) in front of
+    an optional shared Django cache (``EMBEDS_RESIZE_SHARED_CACHE``, a cache
+    alias such as ``'default'``). ``stats()`` helps size them.
+
+    """
+    def __init__(self):
+        self.local = LRUCache(
+            getattr(settings, 'EMBEDS_RESIZE_CACHE_SIZE', 1000))
+        self.shared_hits = self.shared_misses = 0
+
+    @property
+    def shared(self):
+        alias = getattr(settings, 'EMBEDS_RESIZE_SHARED_CACHE', None)
+        if not alias:
+            return None
+        try:
+            from django.core.cache import caches
+        except ImportError:  # DROP_WITH_DJANGO16 # pragma: no cover
+            from django.core.cache import get_cache
+            return get_cache(alias)
+        return caches[alias]
+
+    def key(self, value, width):
+        digest = sha1(value.encode('utf-8')).hexdigest()
+        return "armstrong.apps.embeds-resize-%s-%i" % (digest, width)
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        shared = self.shared
+        if shared is not None:
+            value = shared.get(key)
+            if value is None:
+                self.shared_misses += 1
+            else:
+                self.shared_hits += 1
+                self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        shared = self.shared
+        if shared is not None:
+            shared.set(key, value, getattr(
+                settings, 'EMBEDS_RESIZE_SHARED_TIMEOUT', 60 * 60 * 24))
+
+    def clear(self):
+        """Empty the local tier (the shared tier expires on its own)"""
+        self.local.clear()
+        self.shared_hits = self.shared_misses = 0
+
+    def stats(self):
+        stats = self.local.stats()
+        stats.update(shared_hits=self.shared_hits,
+                     shared_misses=self.shared_misses)
+        return stats
+
+
+resize_cache = ResizeCache()
+
+
+@register.filter
+def for_render(embeds):
+    """
+    Load a queryset or related manager of Embeds ready for rendering.
+    Anything else (a list, a single Embed) passes through untouched.
+
+    ex: {% for embed in article.embeds|for_render %}
+
+    """
+    try:
+        return embeds.for_render()
+    except AttributeError:
+        return embeds
+
+
+# Markup that may hold an iframe tag: comments and raw text elements are
+# copied through untouched, like an HTML parser would
+MARKUP_START = re.compile(r'<!--|<(?:script|style|iframe)\b', re.I)
+MARKUP = re.compile(r"""
+    <!--.*?-->
+  | <(script|style)\b.*?</\1\s*>
+  | <iframe\b
+    (?P<attrs>(?:\s+[^\s"'>/=]+
+      (?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'=<>`]+))?)*)
+    \s*/?>
+""", re.I | re.S | re.X)
+ATTRIBUTE = re.compile(r"""
+    \s+(?P<name>[^\s"'>/=]+)
+    (?:\s*=\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^\s"'=<>`]+)))?
+""", re.X)
+
+
+def _first_value(attrs, name):
+    """The span and value of an attribute's first occurrence, or None"""
+
+    for match in ATTRIBUTE.finditer(attrs):
+        if match.group('name').lower() != name:
+            continue
+        for group in ('dq', 'sq', 'bare'):
+            if match.group(group) is not None:
+                return match.span(group), match.group(group)
+        return None  # no value
+    return None
+
+
+def _resize_attrs(attrs, new_width):
+    """Rewrite the width and height in an iframe's attribute string"""
+
+    width = _first_value(attrs, 'width')
+    try:
+        orig_width = int(width[1])
+    except (TypeError, ValueError):
+        # don't set the width if the value isn't present or isn't a number
+        return attrs
+    if new_width >= orig_width:
+        return attrs
+
+    scaler = new_width / float(orig_width)
+    changes = [(width[0], str(new_width))]
+    height = _first_value(attrs, 'height')
+    try:
+        int(height[1])
+    except (TypeError, ValueError):
+        # don't set height if the value isn't present or isn't a number
+        pass
+    else:
+        changes.append((height[0], str(int(float(height[1]) * scaler))))
+
+    for (start, end), value in sorted(changes, reverse=True):
+        attrs = attrs[:start] + value + attrs[end:]
+    return attrs
+
+
+def _stream_resize(value, new_width):
+    """
+    Resize iframes in one pass over the markup, copying everything but
+    their width and height through as is. Return None for markup this
+    can't follow (an unclosed tag, comment or script) so a parser can.
+
+    """
+    parts = []
+    pos = 0
+    while True:
+        start = MARKUP_START.search(value, pos)
+        if start is None:
+            break
+        match = MARKUP.match(value, start.start())
+        if match is None:
+            return None
+
+        attrs = match.group('attrs')
+        if attrs is not None:
+            resized = _resize_attrs(attrs, new_width)
+            if resized is not attrs:
+                parts.append(value[pos:match.start('attrs')])
+                parts.append(resized)
+                pos = match.end('attrs')
+        parts.append(value[pos:match.end()])
+        pos = match.end()
+    parts.append(value[pos:])
+    return ''.join(parts)
+
+
+@register.filter
+def render_at(response, width):
+    """
+    A Response's ``render_at(width)`` for templates.
+
+    ex: {{ embed.response|render_at:640|safe }}
+
+    """
+    if not response:
+        return ''
+    return response.render_at(int(width))
+
+
 @register.filter
 @stringfilter
 def resize_iframe(value, new_width):
     if not value:
         return value
 
-    try:
-        from lxml.html import fromstring, tostring
-    except ImportError as e:
-        logger.error(
-            "Cannot use template tag because lxml package is missing: %s" % e)
-        return value
-
     new_width = int(new_width)
     if new_width < 0:
         raise TemplateSyntaxError("Can't set a negative size on an iframe")
 
-    parsed = fromstring(value)
+    key = resize_cache.key(value, new_width)
+    resized = resize_cache.get(key)
+    if resized is None:
+        resized = _stream_resize(value, new_width)
+        if resized is None:
+            try:
+                from lxml.html import fromstring, tostring
+            except ImportError as e:
+                logger.error(
+                    "Cannot resize malformed markup because lxml "
+                    "package is missing: %s" % e)
+                return value
+            resized = _resize_iframe(fromstring(value), new_width, tostring)
+        resize_cache.set(key, resized)
+    return resized
+
+
+def _resize_iframe(parsed, new_width, tostring):
+    """Resize iframes in markup lxml had to repair"""
 
     for iframe in parsed.xpath('//iframe'):
         try:
@@ -0,0 +1,92 @@
+import random
+from threading import Lock
+
+
+class LRUCache(object):
+    """
+    A small, thread-safe, size-bounded mapping that evicts the least
+    recently used key. Hits and misses are counted to help size it.
+
+    """
+    # positions in a linked list entry
+    PREV, NEXT, KEY, VALUE = 0, 1, 2, 3
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._lock = Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._map = {}
+            self._root = root = []
+            root[:] = [root, root, None, None]
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._map)
+
+    def __contains__(self, key):
+        return key in self._map
+
+    def _touch(self, link):
+        """Move a link to the most recently used end"""
+
+        prev, next = link[self.PREV], link[self.NEXT]
+        prev[self.NEXT], next[self.PREV] = next, prev
+        root = self._root
+        last = root[self.PREV]
+        last[self.NEXT] = root[self.PREV] = link
+        link[self.PREV], link[self.NEXT] = last, root
+
+    def get(self, key, default=None):
+        with self._lock:
+            link = self._map.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+
+            self._touch(link)
+            self.hits += 1
+            return link[self.VALUE]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            link = self._map.get(key)
+            if link is not None:
+                link[self.VALUE] = value
+                self._touch(link)
+                return
+
+            root = self._root
+            if len(self._map) >= self.maxsize:
+                oldest = root[self.NEXT]
+                root[self.NEXT] = oldest[self.NEXT]
+                oldest[self.NEXT][self.PREV] = root
+                del self._map[oldest[self.KEY]]
+
+            last = root[self.PREV]
+            link = [last, root, key, value]
+            last[self.NEXT] = root[self.PREV] = self._map[key] = link
+
+    def stats(self):
+        return dict(
+            hits=self.hits, misses=self.misses,
+            size=len(self._map), maxsize=self.maxsize)
+
+
+def backoff_delay(failures, base, cap, jitter=0.5):
+    """
+    Seconds to wait before retrying after ``failures`` consecutive
+    failures: ``base`` doubled for each failure after the first, capped
+    at ``cap``, then reduced by a random fraction of up to ``jitter`` so
+    rows that failed together don't all come due together.
+
+    """
+    if failures < 1:
+        return 0
+    delay = min(cap, base * 2 ** min(failures - 1, 32))
+    return delay * (1 - jitter * random.random())
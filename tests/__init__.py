@@ -5,6 +5,14 @@ from .fields import *
 from .forms import *
 from .mixins import *
 from .templatetags import *
+from .routing import *
+from .refresh import *
+from .bulk import *
+from .freshness import *
+from .hedging import *
+from .fragments import *
+from .search import *
+from .utils import *
 
 # Silence our logging during tests
 from armstrong.apps.embeds import logger
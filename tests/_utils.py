@@ -1,5 +1,27 @@
+from django.core.cache import cache
 from armstrong.dev.tests.utils.base import ArmstrongTestCase
 
+from armstrong.apps.embeds.models import EmbedType, Provider
+from armstrong.apps.embeds.routing import router
+from armstrong.apps.embeds.freshness import revalidator
+from armstrong.apps.embeds.hedging import latencies
+from armstrong.apps.embeds.mixins import template_names
+from armstrong.apps.embeds.templatetags.embed_helpers import resize_cache
+
 
 class TestCase(ArmstrongTestCase):
-    pass
+    def _pre_setup(self):
+        """
+        Process-wide caches outlive the test transaction that is rolled
+        back after every test so start each test with them empty.
+
+        """
+        super(TestCase, self)._pre_setup()
+        cache.clear()  # e.g. circuit breaker state
+        router.reset()
+        revalidator.reset()
+        latencies.reset()
+        resize_cache.clear()
+        template_names.clear()
+        EmbedType.objects.clear_cache()
+        Provider.objects.clear_cache()
@@ -8,6 +8,8 @@ except ImportError:  # pragma: no cover
 
 from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User, Permission
 
 from armstrong.apps.embeds.models import Backend, Embed
@@ -19,7 +21,7 @@ from .models import fake_backend_init
 from ._utils import TestCase
 
 __all__ = ['EmbedAdminAddTestCase', 'EmbedAdminChangeTestCase',
-           'BackendAdminTestCase']
+           'EmbedAdminChangelistTestCase', 'BackendAdminTestCase']
 
 
 def return_false(obj):
@@ -93,6 +95,79 @@ class BackendAdminTestCase(CommonAdminBaseTestCase, TestCase):
         self.assertRegexpMatches(r.content, regex)
 
 
+class EmbedAdminChangelistTestCase(CommonAdminBaseTestCase, TestCase):
+    def setUp(self):
+        super(EmbedAdminChangelistTestCase, self).setUp()
+        self.changelist_url = reverse('admin:embeds_embed_changelist')
+
+        backend = Backend.objects.get(name='default')
+        for url in ["http://www.github.com/", "http://www.python.org/"]:
+            Embed.objects.create(url=url, backend=backend)
+
+    def test_changelist_doesnt_load_response_data(self):
+        r = self.client.get(self.changelist_url)
+        for embed in r.context['cl'].result_list:
+            self.assertFalse('response_cache' in embed.__dict__)
+            self.assertIsNone(embed._response)
+        self.assertContains(r, "http://www.github.com/")
+
+    def test_changelist_query_count_doesnt_grow_with_rows(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(self.changelist_url)
+            return len(queries)
+
+        before = count_queries()
+        backend = Backend.objects.get(name='default')
+        for i in range(5):
+            Embed.objects.create(url="http://example.com/%i" % i,
+                                 backend=backend)
+        self.assertEqual(count_queries(), before)
+
+    def test_changelist_filters_by_image(self):
+        Embed.objects.filter(url="http://www.github.com/")\
+            .update(image_url="http://example.com/i.jpg")
+        r = self.client.get(self.changelist_url, {'has_image': 'yes'})
+        self.assertEqual(
+            [e.url for e in r.context['cl'].result_list],
+            ["http://www.github.com/"])
+        r = self.client.get(self.changelist_url, {'has_image': 'no'})
+        self.assertEqual(
+            [e.url for e in r.context['cl'].result_list],
+            ["http://www.python.org/"])
+
+    def test_changelist_searches_the_index(self):
+        r = self.client.get(self.changelist_url, {'q': 'python'})
+        self.assertEqual(
+            [e.url for e in r.context['cl'].result_list],
+            ["http://www.python.org/"])
+
+    def test_changelist_sorts_by_title(self):
+        r = self.client.get(self.changelist_url, {'o': '2'})
+        self.assertEqual(r.status_code, 200)
+
+    def test_changelist_shares_backends(self):
+        r = self.client.get(self.changelist_url)
+        embeds = list(r.context['cl'].result_list)
+        self.assertEqual(len(embeds), 2)
+        self.assertIs(embeds[0].backend, embeds[1].backend)
+
+    def test_retry_now_action_ignores_backoff(self):
+        embed = Embed.objects.get(url="http://www.github.com/")
+        embed.response_cache = dict(url='old')
+        embed.save()
+        embed.record_failure("broken")
+
+        r = self.client.post(self.changelist_url, {
+            'action': 'retry_now',
+            '_selected_action': [embed.pk]}, follow=True)
+        self.assertContains(r, "1 updated, 0 still failing")
+
+        embed = Embed.objects.get(pk=embed.pk)
+        self.assertEqual(embed.failure_count, 0)
+        self.assertEqual(embed.response_cache, dict(url=embed.url))
+
+
 class EmbedAdminBaseTestCase(CommonAdminBaseTestCase):
     def setUp(self):
         super(EmbedAdminBaseTestCase, self).setUp()
@@ -193,6 +268,16 @@ class EmbedAdminBaseTestCase(CommonAdminBaseTestCase):
         r = self.client.post(self.url, self.valid_data)
         self.assertContains(r, 'Response Data')
 
+    def test_step2_only_asks_for_a_hedged_response_when_enabled(self):
+        get_response = Embed.get_response
+
+        def unhedged_get_response(obj):
+            return get_response(obj)
+
+        with fudge.patched_context(Embed, 'get_response', unhedged_get_response):
+            r = self.client.post(self.url, self.valid_data)
+        self.assertContains(r, 'Response Data')
+
     def test_step1_caches_response_data_and_overwrites_possible_existing(self):
         cache_key = generate_cache_key(self.backend, self.valid_data["url"])
         dummy_data = ("The key could already exist from a previous attempt. We "
@@ -1,5 +1,8 @@
 from ._init import *
+from .asynchronous import *
 from .base_response import *
+from .circuit import *
 from .default import *
 from .embedly import *
+from .transport import *
 from .twitter import *
@@ -83,6 +83,19 @@ class CommonResponseTestCaseMixin(object):
         self.assertEqual(r.provider.name, 'TestProvider')
         self.assertEqual(Provider.objects.count(), 1)
 
+    def test_known_type_and_provider_dont_query(self):
+        data = {'type': 'TestType', 'provider_name': 'TestProvider'}
+        self.response_cls(data).type
+        self.response_cls(data).provider
+        self.response_cls(data).type  # now cached
+        self.response_cls(data).provider
+
+        with self.assertNumQueries(0):
+            for i in range(200):
+                r = self.response_cls(data)
+                self.assertEqual(r.type.name, 'TestType')
+                self.assertEqual(r.provider.name, 'TestProvider')
+
     def test_missing_data_returns_empty_string(self):
         self.assertEqual(self.response_cls().title, '')
         self.assertEqual(self.response_cls().render, '')
@@ -104,6 +117,25 @@ class CommonResponseTestCaseMixin(object):
         self.assertEqual(r.title, 'Title')
         self.assertEqual(r.render, '<iframe>')
 
+    def test_builds_render_variants(self):
+        r = self.response_cls(dict(html='<iframe width="400"></iframe>'))
+        self.assertEqual(r.build_render_variants([100, 500]), {
+            '100': '<iframe width="100"></iframe>',
+            '500': '<iframe width="400"></iframe>'})
+
+    def test_no_render_variants_without_html(self):
+        self.assertEqual(self.response_cls().build_render_variants([100]), {})
+
+    def test_render_at_uses_variants(self):
+        r = self.response_cls(dict(html='<iframe width="400"></iframe>'))
+        r._variants = {'100': 'precomputed'}
+        self.assertEqual(r.render_at(100), 'precomputed')
+        self.assertEqual(r.render_at(200), '<iframe width="200"></iframe>')
+
+    def test_render_at_without_html_is_empty(self):
+        self.assertEqual(self.response_cls().render_at(200), '')
+        self.assertEqual(self.response_cls(dict(html=None)).render_at(200), '')
+
     def test_invalid_data_is_invalid(self):
         for data in getattr(self, 'invalid_data', []):
             response = self.response_cls(data)
@@ -1,7 +1,12 @@
-from armstrong.apps.embeds.backends import get_backend
+from armstrong.apps.embeds.backends import (
+    get_backend, get_proxy_methods, proxy, chunked, BackendRegistry)
+from armstrong.apps.embeds.backends.default import DefaultBackend
 from .._utils import TestCase
 
 
+DEFAULT_CODE_PATH = 'armstrong.apps.embeds.backends.default.DefaultBackend'
+
+
 class GetBackendTestCase(TestCase):
     def test_load_no_backend_raises_error(self):
         with self.assertRaises(ImportError):
@@ -10,3 +15,63 @@ class GetBackendTestCase(TestCase):
     def test_load_missing_backend_raises_error(self):
         with self.assertRaises(ImportError):
             get_backend('fake')
+
+    def test_load_backend_returns_new_instances(self):
+        self.assertIsNot(
+            get_backend(DEFAULT_CODE_PATH), get_backend(DEFAULT_CODE_PATH))
+
+
+class ChunkedTestCase(TestCase):
+    def test_chunked(self):
+        self.assertEqual(chunked([1, 2, 3], 2), [[1, 2], [3]])
+        self.assertEqual(chunked([1, 2], 5), [[1, 2]])
+        self.assertEqual(chunked([], 5), [])
+
+    def test_chunked_minimum_size_is_one(self):
+        self.assertEqual(chunked([1, 2], 0), [[1], [2]])
+
+
+class BackendRegistryTestCase(TestCase):
+    def setUp(self):
+        self.registry = BackendRegistry()
+
+    def test_get_returns_backend_instance(self):
+        self.assertTrue(
+            isinstance(self.registry.get(DEFAULT_CODE_PATH), DefaultBackend))
+
+    def test_get_returns_shared_instance(self):
+        self.assertIs(
+            self.registry.get(DEFAULT_CODE_PATH),
+            self.registry.get(DEFAULT_CODE_PATH))
+
+    def test_reset_creates_new_instances(self):
+        backend = self.registry.get(DEFAULT_CODE_PATH)
+        self.registry.reset()
+        self.assertIsNot(self.registry.get(DEFAULT_CODE_PATH), backend)
+
+    def test_missing_backend_raises_error(self):
+        with self.assertRaises(ImportError):
+            self.registry.get('fake')
+        with self.assertRaises(ImportError):
+            self.registry.get('fake')
+
+
+class GetProxyMethodsTestCase(TestCase):
+    def test_finds_proxy_methods(self):
+        self.assertEqual(
+            get_proxy_methods(DefaultBackend),
+            frozenset(['call', 'wrap_response_data']))
+
+    def test_ignores_unmarked_methods(self):
+        class Stub(DefaultBackend):
+            proxy_me = proxy(lambda _: "made it here")
+            but_not_me = lambda _: "unseen"
+
+        names = get_proxy_methods(Stub)
+        self.assertTrue('proxy_me' in names)
+        self.assertFalse('but_not_me' in names)
+
+    def test_result_is_cached_per_class(self):
+        self.assertIs(
+            get_proxy_methods(DefaultBackend),
+            get_proxy_methods(DefaultBackend))
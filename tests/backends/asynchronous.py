@@ -0,0 +1,73 @@
+from threading import current_thread
+
+from armstrong.apps.embeds.backends.asynchronous import (
+    CompletedResult, completed, run_async, map_async, get_pool, reset_pool)
+from .._utils import TestCase
+
+
+def raise_error(*args):
+    raise ValueError("broken")
+
+
+class CompletedResultTestCase(TestCase):
+    def test_value(self):
+        result = CompletedResult('value')
+        self.assertTrue(result.ready())
+        self.assertTrue(result.successful())
+        self.assertEqual(result.get(), 'value')
+        self.assertEqual(result.get(timeout=1), 'value')
+
+    def test_error(self):
+        result = CompletedResult(error=ValueError("broken"))
+        self.assertTrue(result.ready())
+        self.assertFalse(result.successful())
+        with self.assertRaises(ValueError):
+            result.get()
+
+    def test_completed_runs_in_this_thread(self):
+        result = completed(lambda: current_thread())
+        self.assertIs(result.get(), current_thread())
+
+    def test_completed_captures_errors(self):
+        result = completed(raise_error)
+        self.assertFalse(result.successful())
+        with self.assertRaises(ValueError):
+            result.get()
+
+
+class ThreadPoolTestCase(TestCase):
+    def tearDown(self):
+        reset_pool()
+
+    def test_run_async_runs_in_another_thread(self):
+        result = run_async(lambda: current_thread())
+        self.assertIsNot(result.get(1), current_thread())
+
+    def test_run_async_reraises_errors(self):
+        result = run_async(raise_error)
+        with self.assertRaises(ValueError):
+            result.get(1)
+
+    def test_map_async_joins_results_in_order(self):
+        result = map_async(lambda chunk: [x * 2 for x in chunk],
+                           [[1, 2], [3], [4, 5]])
+        self.assertEqual(result.get(1), [2, 4, 6, 8, 10])
+        self.assertTrue(result.ready())
+        self.assertTrue(result.successful())
+
+    def test_map_async_with_a_single_chunk(self):
+        result = map_async(lambda chunk: chunk, [[1, 2]])
+        self.assertEqual(result.get(1), [1, 2])
+
+    def test_pool_is_shared(self):
+        self.assertIs(get_pool(), get_pool())
+
+    def test_reset_pool(self):
+        pool = get_pool()
+        reset_pool()
+        self.assertIsNot(get_pool(), pool)
+
+    def test_pool_size_is_configurable(self):
+        reset_pool()
+        with self.settings(EMBEDS_ASYNC_WORKERS=3):
+            self.assertEqual(get_pool()._processes, 3)
@@ -0,0 +1,84 @@
+import fudge
+
+from armstrong.apps.embeds.backends.circuit import (
+    CircuitBreaker, CircuitOpenError)
+from .._utils import TestCase
+
+
+class CircuitBreakerTestCase(TestCase):
+    def setUp(self):
+        self.circuit = CircuitBreaker('test')
+        self.now = 1000.0
+        self.patched = fudge.patched_context(
+            'armstrong.apps.embeds.backends.circuit.time', 'time',
+            lambda: self.now)
+        self.patched.__enter__()
+
+    def tearDown(self):
+        self.patched.__exit__(None, None, None)
+
+    def trip(self):
+        with self.settings(EMBEDS_CIRCUIT_THRESHOLD=3):
+            for i in range(3):
+                self.circuit.record_failure()
+
+    def test_closed_by_default(self):
+        self.assertFalse(self.circuit.is_open())
+        self.assertTrue(self.circuit.allow())
+
+    def test_opens_after_threshold_failures(self):
+        with self.settings(EMBEDS_CIRCUIT_THRESHOLD=3):
+            self.circuit.record_failure()
+            self.circuit.record_failure()
+            self.assertTrue(self.circuit.allow())
+            self.circuit.record_failure()
+        self.assertTrue(self.circuit.is_open())
+        self.assertFalse(self.circuit.allow())
+
+    def test_success_resets_failures(self):
+        with self.settings(EMBEDS_CIRCUIT_THRESHOLD=3):
+            self.circuit.record_failure()
+            self.circuit.record_failure()
+            self.circuit.record_success()
+            self.circuit.record_failure()
+        self.assertFalse(self.circuit.is_open())
+
+    def test_one_trial_call_after_reset_timeout(self):
+        self.trip()
+        self.now += 61
+        self.assertFalse(self.circuit.is_open())
+        self.assertTrue(self.circuit.allow())
+        self.assertFalse(self.circuit.allow())  # the trial is under way
+
+    def test_successful_trial_closes(self):
+        self.trip()
+        self.now += 61
+        self.circuit.allow()
+        self.circuit.record_success()
+        self.assertTrue(self.circuit.allow())
+        self.assertTrue(self.circuit.allow())
+
+    def test_failed_trial_reopens(self):
+        self.trip()
+        self.now += 61
+        self.circuit.allow()
+        self.circuit.record_failure()
+        self.assertTrue(self.circuit.is_open())
+        self.assertFalse(self.circuit.allow())
+
+    def test_circuits_are_separate(self):
+        self.trip()
+        self.assertFalse(CircuitBreaker('other').is_open())
+
+    def test_state_is_shared_between_instances(self):
+        self.trip()
+        self.assertTrue(CircuitBreaker('test').is_open())
+
+    def test_reset(self):
+        self.trip()
+        self.circuit.reset()
+        self.assertTrue(self.circuit.allow())
+
+    def test_open_error_is_an_invalid_response(self):
+        from armstrong.apps.embeds.backends import InvalidResponseError
+        self.assertTrue(issubclass(CircuitOpenError, InvalidResponseError))
@@ -1,8 +1,13 @@
+import json
 import fudge
 from django.core.exceptions import ImproperlyConfigured
 
-from armstrong.apps.embeds.backends.embedly import EmbedlyResponse, EmbedlyBackend
+from armstrong.apps.embeds.backends import InvalidResponseError
+from armstrong.apps.embeds.backends.embedly import (
+    EmbedlyResponse, EmbedlyBackend, EmbedlyClient)
+from armstrong.apps.embeds.backends.transport import PooledTransport
 from ._common import CommonBackendTestCaseMixin, CommonResponseTestCaseMixin
+from .transport import OEmbedServer
 from .._utils import TestCase
 
 
@@ -108,6 +113,67 @@ class EmbedlyBackendTestCase(CommonBackendTestCaseMixin, TestCase):
             with self.assertRaises(InvalidResponseError):
                 self.backend.call(self.url)
 
+    def fake_oembed(self, calls):
+        class Url(object):  # stands in for embedly.models.Url
+            def __init__(self, data):
+                self.data = data
+
+        def oembed(*args):
+            url_or_urls = args[-1]  # fudge may pass the client too
+            calls.append(url_or_urls)
+            if not isinstance(url_or_urls, list):
+                return Url(dict(type='link', url=url_or_urls))
+            return [Url(dict(type='link', url=u)) for u in url_or_urls]
+        return oembed
+
+    def test_call_many_batches_requests(self):
+        calls = []
+        urls = ["http://example.com/%i" % i for i in range(45)]
+        with fudge.patched_context(
+                self.backend.client, 'oembed', self.fake_oembed(calls)):
+            responses = self.backend.call_many(urls)
+
+        self.assertEqual([len(c) for c in calls], [20, 20, 5])
+        self.assertEqual([r._data['url'] for r in responses], urls)
+        self.assertTrue(all(r.is_fresh() for r in responses))
+
+    def test_call_many_skips_empty_urls(self):
+        calls = []
+        with fudge.patched_context(
+                self.backend.client, 'oembed', self.fake_oembed(calls)):
+            responses = self.backend.call_many(['', self.url, None])
+
+        self.assertEqual(calls, [[self.url]])
+        self.assertIsNone(responses[0])
+        self.assertEqual(responses[1]._data['url'], self.url)
+        self.assertIsNone(responses[2])
+
+    def test_call_many_retries_failed_batch_per_url(self):
+        calls = []
+        single = self.fake_oembed(calls)
+
+        def oembed(*args):
+            if isinstance(args[-1], list):  # one response for them all
+                return single(None)
+            return single(args[-1])
+
+        with fudge.patched_context(self.backend.client, 'oembed', oembed):
+            responses = self.backend.call_many([self.url, self.bad_url])
+        self.assertEqual(calls, [None, self.url, self.bad_url])
+        self.assertEqual([r._data['url'] for r in responses],
+                         [self.url, self.bad_url])
+
+    def test_call_many_server_error_is_wrapped(self):
+        from armstrong.apps.embeds.backends import InvalidResponseError
+
+        def throw_error(*args, **kwargs):
+            from httplib2 import ServerNotFoundError
+            raise ServerNotFoundError
+
+        with fudge.patched_context(self.backend.client, 'oembed', throw_error):
+            with self.assertRaises(InvalidResponseError):
+                self.backend.call_many([self.url])
+
     def test_flickr_response(self):
         self._test_response_data(self.url, self.data)
         self._test_garbage_data_should_not_match_a_valid_response(self.url, self.data)
@@ -139,3 +205,81 @@ class EmbedlyBackendTestCase(CommonBackendTestCaseMixin, TestCase):
 
         self._test_response_data(url, data)
         self._test_garbage_data_should_not_match_a_valid_response(url, data)
+
+
+class EmbedlyLocalServerTestCase(TestCase):
+    """Exercise the real request path against a stand-in API server"""
+
+    def setUp(self):
+        self.server = OEmbedServer().start()
+        self.transport = PooledTransport(read_timeout=0.5)
+        with self.settings(EMBEDLY_KEY='key', EMBEDLY_API_URL=self.server.url):
+            self.backend = EmbedlyBackend()
+        self.backend.client.transport = self.transport
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.stop()
+
+    def test_client_uses_settings_api_url(self):
+        self.assertEqual(self.backend.client.api_url, self.server.url)
+
+    def test_call(self):
+        response = self.backend.call('http://example.com/a')
+        self.assertTrue(response.is_valid())
+        self.assertEqual(response._data['url'], 'http://example.com/a')
+        self.assertTrue(self.server.requests[0].startswith('/1/oembed?'))
+        self.assertIn('key=key', self.server.requests[0])
+
+    def test_call_many_reuses_one_connection(self):
+        urls = ["http://example.com/%i" % i for i in range(45)]
+        responses = self.backend.call_many(urls)
+
+        self.assertEqual([r._data['url'] for r in responses], urls)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_error_status_is_an_invalid_response(self):
+        self.backend.client.api_url = self.server.url + '/status/500'
+        self.assertFalse(self.backend.call('http://example.com/').is_valid())
+
+    def test_error_status_for_many_is_paired_with_each_url(self):
+        self.backend.client.api_url = self.server.url + '/status/500'
+        responses = self.backend.call_many(['http://a.com/', 'http://b.com/'])
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual([r._data['error_code'] for r in responses], [500, 500])
+
+    def test_error_status_for_many_isnt_shared(self):
+        self.backend.client.api_url = self.server.url + '/status/500'
+        responses = self.backend.call_many(['http://a.com/', 'http://b.com/'])
+        responses[0]._data['error_code'] = 404
+        self.assertEqual(responses[1]._data['error_code'], 500)
+
+    def test_raw_content_is_kept_on_request(self):
+        result = self.backend.client.oembed('http://example.com/a', raw=True)
+        self.assertEqual(json.loads(result.data['raw'].decode('utf-8'))['url'],
+                         'http://example.com/a')
+        self.assertFalse(
+            'raw' in self.backend.client.oembed('http://example.com/a').data)
+
+    def test_undecodable_response_is_an_error(self):
+        self.backend.client.api_url = self.server.url + '/garbage'
+        with self.assertRaises(InvalidResponseError):
+            self.backend.call('http://example.com/')
+        with self.assertRaises(InvalidResponseError):
+            self.backend.call_many(['http://a.com/', 'http://b.com/'])
+
+    def test_unpaired_response_for_many_is_retried_per_url(self):
+        self.backend.client.api_url = self.server.url + '/unpaired'
+        responses = self.backend.call_many(['http://a.com/', 'http://b.com/'])
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual([r._data['error_code'] for r in responses], [400, 400])
+
+    def test_timeout_is_wrapped(self):
+        self.backend.client.api_url = self.server.url + '/slow'
+        with self.assertRaises(InvalidResponseError):
+            self.backend.call('http://example.com/')
+
+    def test_shared_transport_by_default(self):
+        from armstrong.apps.embeds.backends.transport import get_transport
+        self.assertIs(EmbedlyClient('key').transport, get_transport())
@@ -0,0 +1,234 @@
+import json
+import time
+from threading import Thread
+from multiprocessing.pool import ThreadPool
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit, parse_qs
+except ImportError:  # PY3 # pragma: no cover
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit, parse_qs
+
+from armstrong.apps.embeds.backends.transport import (
+    PooledTransport, ThreadLocalTransport, TransportError,
+    get_transport, reset_transport)
+from .._utils import TestCase
+
+
+class OEmbedHandler(BaseHTTPRequestHandler):
+    """
+    Answer like the Embedly oEmbed API, echoing the URLs back, plus:
+    paths starting ``/status/<code>`` for an error status, ``/slow`` to
+    trip timeouts, ``/close`` to end the connection after responding,
+    ``/drop`` to end it without saying so (like an idle timeout),
+    ``/garbage`` for a body that isn't JSON and ``/unpaired`` to answer
+    many URLs with a single error.
+
+    """
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+
+        status, close = 200, False
+        if parts.path.startswith('/status/'):
+            status = int(parts.path.split('/')[2])
+        elif parts.path.startswith('/slow'):
+            time.sleep(1)
+        elif parts.path == '/close':
+            close = True
+        elif parts.path == '/drop':
+            self.close_connection = True
+
+        if parts.path.startswith('/unpaired'):
+            data = dict(type='error', error=True, error_code=400)
+        elif 'urls' in query:
+            data = [dict(type='link', url=url)
+                    for url in query['urls'][0].split(',')]
+        else:
+            data = dict(type='link', url=query.get('url', [''])[0])
+        body = json.dumps(data).encode('utf-8')
+        if parts.path.startswith('/garbage'):
+            body = b'<html>Bad Gateway</html>'
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if close:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class OEmbedServer(ThreadingMixIn, HTTPServer):
+    """A local stand-in for an oEmbed API, running on a free port"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), OEmbedHandler)
+        self.connections = 0
+        self.requests = []
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%i' % self.server_address[1]
+
+    def start(self):
+        thread = Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class PooledTransportTestCase(TestCase):
+    transport_cls = PooledTransport
+
+    def setUp(self):
+        self.server = OEmbedServer().start()
+        self.transport = self.transport_cls(read_timeout=0.5)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.stop()
+
+    def test_get_returns_status_and_body(self):
+        status, body = self.transport.get(self.server.url + '/?url=a')
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body.decode('utf-8'))['url'], 'a')
+
+    def test_error_status_is_returned(self):
+        status, _ = self.transport.get(self.server.url + '/status/404')
+        self.assertEqual(status, 404)
+
+    def test_connection_is_reused(self):
+        for i in range(5):
+            self.transport.get(self.server.url + '/?url=%i' % i)
+
+        self.assertEqual(self.server.connections, 1)
+        stats = self.transport.stats()
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertEqual(stats['connections_reused'], 4)
+        self.assertEqual(stats['idle'], 1)
+
+    def test_connection_closed_by_server_is_not_reused(self):
+        self.transport.get(self.server.url + '/close')
+        self.assertEqual(self.transport.stats()['idle'], 0)
+        self.transport.get(self.server.url + '/')
+        self.assertEqual(self.server.connections, 2)
+
+    def test_stale_connection_is_retried(self):
+        self.transport.get(self.server.url + '/drop')
+        self.assertEqual(self.transport.stats()['idle'], 1)
+
+        status, _ = self.transport.get(self.server.url + '/')
+        self.assertEqual(status, 200)
+        self.assertEqual(self.transport.stats()['errors'], 0)
+        self.assertEqual(self.server.connections, 2)
+
+    def test_read_timeout_raises_transport_error(self):
+        with self.assertRaises(TransportError):
+            self.transport.get(self.server.url + '/slow')
+        self.assertEqual(self.transport.stats()['errors'], 1)
+
+    def test_read_timeout_on_reused_connection_isnt_retried(self):
+        self.transport.get(self.server.url + '/')
+        with self.assertRaises(TransportError):
+            self.transport.get(self.server.url + '/slow')
+        self.assertEqual(self.server.requests.count('/slow'), 1)
+
+    def test_connection_failure_raises_transport_error(self):
+        url = self.server.url
+        self.server.stop()
+        with self.assertRaises(TransportError):
+            self.transport.get(url + '/')
+        self.server = OEmbedServer().start()  # for tearDown
+
+    def test_concurrent_requests(self):
+        pool = ThreadPool(4)
+        try:
+            urls = [self.server.url + '/?url=%i' % i for i in range(20)]
+            results = pool.map(self.transport.get, urls)
+        finally:
+            pool.close()
+            pool.join()
+
+        self.assertEqual([json.loads(b.decode('utf-8'))['url']
+                          for _, b in results],
+                         [str(i) for i in range(20)])
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_close_drops_idle_connections(self):
+        self.transport.get(self.server.url + '/')
+        self.transport.close()
+        self.assertEqual(self.transport.stats()['idle'], 0)
+
+
+class ThreadLocalTransportTestCase(PooledTransportTestCase):
+    transport_cls = ThreadLocalTransport
+
+    def test_connection_is_reused(self):
+        for i in range(5):
+            self.transport.get(self.server.url + '/?url=%i' % i)
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.transport.stats()['connections_reused'], 4)
+
+    def test_connection_closed_by_server_is_not_reused(self):
+        self.transport.get(self.server.url + '/close')
+        self.transport.get(self.server.url + '/')
+        self.assertEqual(self.server.connections, 2)
+
+    def test_stale_connection_is_retried(self):
+        self.transport.get(self.server.url + '/drop')
+
+        status, _ = self.transport.get(self.server.url + '/')
+        self.assertEqual(status, 200)
+        self.assertEqual(self.transport.stats()['errors'], 0)
+        self.assertEqual(self.server.connections, 2)
+
+    def test_close_drops_idle_connections(self):
+        self.transport.get(self.server.url + '/')
+        self.transport.close()
+        self.assertEqual(self.transport._connections(), {})
+
+
+class GetTransportTestCase(TestCase):
+    def tearDown(self):
+        reset_transport()
+
+    def test_is_shared(self):
+        reset_transport()
+        self.assertIs(get_transport(), get_transport())
+        self.assertIsInstance(get_transport(), PooledTransport)
+
+    def test_class_from_settings(self):
+        reset_transport()
+        path = 'armstrong.apps.embeds.backends.transport.ThreadLocalTransport'
+        with self.settings(EMBEDS_HTTP_TRANSPORT=path):
+            self.assertIsInstance(get_transport(), ThreadLocalTransport)
+
+    def test_timeouts_from_settings(self):
+        with self.settings(EMBEDS_HTTP_CONNECT_TIMEOUT=1,
+                           EMBEDS_HTTP_READ_TIMEOUT=2,
+                           EMBEDS_HTTP_POOL_SIZE=3):
+            transport = PooledTransport()
+        self.assertEqual(transport.connect_timeout, 1)
+        self.assertEqual(transport.read_timeout, 2)
+        self.assertEqual(transport.pool_size, 3)
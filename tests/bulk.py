@@ -0,0 +1,127 @@
+import fudge
+
+from armstrong.apps.embeds.models import (
+    Embed, Backend, EmbedType, Provider, NormalizedNameManager)
+from armstrong.apps.embeds.backends import InvalidResponseError
+from armstrong.apps.embeds.backends.default import DefaultResponse
+from armstrong.apps.embeds.bulk import (
+    BulkCreator, CREATED, FAILED, EXISTS, NO_BACKEND)
+from ._utils import TestCase
+
+
+class BulkCreateTestCase(TestCase):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        # Remove everything but the default Backend
+        Backend.objects.exclude(name="default").delete()
+        self.backend = Backend.objects.get(name='default')
+        self.urls = ["http://www.testme.com/%i" % i for i in range(5)]
+
+    def create(self, urls=None, **kwargs):
+        kwargs.setdefault('workers', 2)
+        return Embed.objects.bulk_create_from_urls(
+            self.urls if urls is None else urls, **kwargs)
+
+    def test_creates_embeds_with_responses(self):
+        outcomes = self.create()
+        self.assertEqual([o.status for o in outcomes], [CREATED] * 5)
+        self.assertEqual([o.url for o in outcomes], self.urls)
+
+        embeds = list(Embed.objects.with_response().order_by('pk'))
+        self.assertEqual([e.url for e in embeds], self.urls)
+        self.assertEqual([e.pk for e in embeds],
+                         [o.embed.pk for o in outcomes])
+        self.assertEqual(embeds[0].response_cache, dict(url=self.urls[0]))
+        self.assertEqual(embeds[0].backend, self.backend)
+        self.assertTrue(embeds[0].has_response)
+        self.assertIsNotNone(embeds[0].response_last_updated)
+
+    def test_existing_urls_arent_duplicated(self):
+        existing = Embed.objects.create(url=self.urls[1])
+        outcomes = self.create()
+        self.assertEqual(outcomes[1].status, EXISTS)
+        self.assertEqual(outcomes[1].embed.pk, existing.pk)
+        self.assertEqual(Embed.objects.count(), 5)
+
+    def test_existing_urls_are_found_in_one_query(self):
+        self.create()
+        with self.assertNumQueries(1):
+            outcomes = self.create()
+        self.assertEqual([o.status for o in outcomes], [EXISTS] * 5)
+
+    def test_one_outcome_per_distinct_url(self):
+        outcomes = self.create(self.urls[:2] + self.urls[:2])
+        self.assertEqual([o.url for o in outcomes], self.urls[:2])
+
+    def test_works_in_batches(self):
+        outcomes = self.create(batch_size=2)
+        self.assertEqual([o.url for o in outcomes], self.urls)
+        self.assertEqual(Embed.objects.count(), 5)
+
+    def test_urls_without_a_backend_are_skipped(self):
+        self.backend.delete()
+        outcomes = self.create()
+        self.assertEqual([o.status for o in outcomes], [NO_BACKEND] * 5)
+        self.assertIsNone(outcomes[0].embed)
+        self.assertEqual(Embed.objects.count(), 0)
+
+    def test_failures_are_recorded_on_created_embeds(self):
+        def raise_exc(obj, urls):
+            raise InvalidResponseError("broken")
+
+        with fudge.patched_context(Backend, 'call_many', raise_exc):
+            outcomes = self.create()
+        self.assertEqual([o.status for o in outcomes], [FAILED] * 5)
+        self.assertTrue(isinstance(outcomes[0].error, InvalidResponseError))
+
+        embed = Embed.objects.get(url=self.urls[0])
+        self.assertEqual(embed.failure_count, 1)
+        self.assertIsNotNone(embed.retry_after)
+        self.assertFalse(embed.has_response)
+
+    def test_types_and_providers_are_looked_up_together(self):
+        def call_many(obj, urls):
+            return [DefaultResponse(fresh=True, data=dict(
+                url=url, type='video', provider_name='YouTube'))
+                for url in urls]
+
+        created = []
+        get_for_name = NormalizedNameManager.get_for_name
+
+        def counting_get_for_name(manager, name):
+            created.append(name)
+            return get_for_name(manager, name)
+
+        with fudge.patched_context(Backend, 'call_many', call_many):
+            with fudge.patched_context(NormalizedNameManager, 'get_for_name',
+                                       counting_get_for_name):
+                self.create(self.urls[:3])
+                self.create(self.urls[3:])
+
+        # once each, to create them
+        self.assertEqual(sorted(created), ['YouTube', 'video'])
+        self.assertEqual(EmbedType.objects.count(), 1)
+        self.assertEqual(Provider.objects.count(), 1)
+        self.assertEqual(
+            Embed.objects.filter(type__name='video').count(), 5)
+        self.assertEqual(
+            Embed.objects.filter(provider__name='YouTube').count(), 5)
+
+    def test_new_embeds_are_searchable(self):
+        self.create()
+        self.assertEqual(Embed.objects.search('testme').count(), 5)
+
+    def test_urls_taken_during_the_fetch_are_passed_over(self):
+        url = self.urls[0]
+
+        class RacingCreator(BulkCreator):
+            def fetch(self, pool, embeds):
+                Embed.objects.create(url=url)
+                return super(RacingCreator, self).fetch(pool, embeds)
+
+        outcomes = RacingCreator().create(self.urls)
+        self.assertEqual(outcomes[0].status, EXISTS)
+        self.assertEqual([o.status for o in outcomes[1:]], [CREATED] * 4)
+        self.assertEqual(Embed.objects.count(), 5)
+        self.assertEqual(Embed.objects.search('testme').count(), 5)
@@ -1,6 +1,10 @@
+from StringIO import StringIO
+
+from django.core.management import call_command
 from django.db import models
 
 from armstrong.apps.embeds.fields import EmbedURLField
+from armstrong.apps.embeds.models import Embed, Backend
 from .support.models import CustomFieldModel
 from ._utils import TestCase
 
@@ -39,3 +43,68 @@ class CustomFieldTestCase(TestCase):
         model = CustomFieldModel(field="url.com")
         model.field = "url.com"
         self.assertEqual(model.response, 'testing')
+
+
+class CompressedJSONFieldTestCase(TestCase):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        self.field = Embed._meta.get_field('response_cache')
+        self.data = dict(html='<iframe></iframe>' * 100, title='Title')
+        self.backend = Backend.objects.get(name='default')
+
+    def stored(self, embed):
+        return Embed.objects.filter(pk=embed.pk)\
+            .values_list('response_cache', flat=True)[0]
+
+    def create(self):
+        e = Embed(url='http://example.com/', backend=self.backend)
+        e.response_cache = self.data
+        e.save()
+        return e
+
+    def test_stores_plain_json_by_default(self):
+        self.assertTrue(self.stored(self.create()).startswith('{'))
+
+    def test_stores_compressed_json_when_enabled(self):
+        with self.settings(EMBEDS_COMPRESS_RESPONSES=True):
+            e = self.create()
+        stored = self.stored(e)
+        self.assertTrue(stored.startswith(self.field.marker))
+        self.assertLess(len(stored), len(self.field.encode(self.data)))
+        self.assertEqual(Embed.objects.get(pk=e.pk).response_cache, self.data)
+
+    def test_reads_plain_json_when_enabled(self):
+        e = self.create()
+        with self.settings(EMBEDS_COMPRESS_RESPONSES=True):
+            self.assertEqual(
+                Embed.objects.get(pk=e.pk).response_cache, self.data)
+
+    def test_small_values_stay_plain(self):
+        with self.settings(EMBEDS_COMPRESS_RESPONSES=True):
+            self.assertEqual(self.field.encode({'a': 1}), '{"a": 1}')
+
+    def test_min_size_is_configurable(self):
+        with self.settings(EMBEDS_COMPRESS_RESPONSES=True,
+                           EMBEDS_COMPRESS_MIN_SIZE=0):
+            encoded = self.field.encode(dict(a='b' * 100))
+        self.assertTrue(encoded.startswith(self.field.marker))
+
+    def test_command_converts_rows(self):
+        e = self.create()
+        out = StringIO()
+        call_command('compress_embed_responses', stdout=out)
+        self.assertTrue("1 Embeds, 1 converted" in out.getvalue())
+        self.assertTrue(self.stored(e).startswith(self.field.marker))
+        self.assertEqual(Embed.objects.get(pk=e.pk).response_cache, self.data)
+
+        call_command('compress_embed_responses', decompress=True, stdout=out)
+        self.assertTrue(self.stored(e).startswith('{'))
+
+    def test_command_dry_run_only_measures(self):
+        e = self.create()
+        out = StringIO()
+        call_command('compress_embed_responses', dry_run=True, stdout=out)
+        self.assertTrue("1 Embeds, 1 to convert" in out.getvalue())
+        self.assertTrue("Stored size:" in out.getvalue())
+        self.assertTrue(self.stored(e).startswith('{'))
@@ -0,0 +1,107 @@
+import fudge
+from datetime import timedelta
+
+from django.utils.safestring import SafeData
+from armstrong.core.arm_layout.backends import ModelProvidedLayoutBackend
+
+from armstrong.apps.embeds.models import Embed, Backend
+from armstrong.apps.embeds.fragments import fragments, CachedLayoutBackend
+from .support.models import Parent
+from ._utils import TestCase
+
+
+class FragmentCacheTestCase(TestCase):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        Backend.objects.exclude(name="default").delete()
+        self.embed = Embed.objects.create(url="http://www.testme.com")
+        self.backend = CachedLayoutBackend()
+        self.renders = []
+
+        render = ModelProvidedLayoutBackend.render
+
+        def counting_render(backend, obj, name, *args, **kwargs):
+            self.renders.append((obj.pk, name))
+            return render(backend, obj, name, *args, **kwargs)
+
+        self.patched = fudge.patched_context(
+            ModelProvidedLayoutBackend, 'render', counting_render)
+        self.patched.__enter__()
+
+    def tearDown(self):
+        self.patched.__exit__(None, None, None)
+
+    def render(self, embed=None, name='full'):
+        return self.backend.render(embed or self.embed, name)
+
+    def test_renders_like_the_model_provided_backend(self):
+        self.assertEqual(self.render(),
+                         ModelProvidedLayoutBackend().render(self.embed, 'full'))
+
+    def test_second_render_is_cached(self):
+        html = self.render()
+        self.assertEqual(self.render(), html)
+        self.assertEqual(len(self.renders), 1)
+
+    def test_cached_render_skips_queries(self):
+        self.render()
+        with self.assertNumQueries(0):
+            self.render()
+
+    def test_template_names_are_cached_separately(self):
+        self.render(name='full')
+        self.render(name='thumb')
+        self.render(name='thumb')
+        self.assertEqual(len(self.renders), 2)
+
+    def test_cached_render_is_safe(self):
+        self.render()
+        self.assertTrue(isinstance(self.render(), SafeData))
+
+    def test_other_instances_of_the_embed_hit(self):
+        self.render()
+        self.render(Embed.objects.get(pk=self.embed.pk))
+        self.assertEqual(len(self.renders), 1)
+
+    def test_saving_invalidates(self):
+        self.render()
+        self.embed.save()
+        self.render()
+        self.assertEqual(len(self.renders), 2)
+
+    def test_saving_a_deferred_embed_invalidates(self):
+        self.render()
+        Embed.objects.get(pk=self.embed.pk).save()
+        self.render()
+        self.assertEqual(len(self.renders), 2)
+
+    def test_deleting_invalidates(self):
+        self.render()
+        pk = self.embed.pk
+        self.embed.delete()
+        self.assertIsNone(fragments.get(Embed(pk=pk), 'full'))
+
+    def test_changed_response_misses_without_a_save(self):
+        self.render()
+        changed = self.embed.response_last_updated + timedelta(seconds=1)
+        Embed.objects.filter(pk=self.embed.pk).update(
+            response_last_updated=changed)
+
+        self.render(Embed.objects.get(pk=self.embed.pk))
+        self.assertEqual(len(self.renders), 2)
+
+    def test_unsaved_embeds_arent_cached(self):
+        embed = Embed(url="http://www.testme.com/new",
+                      backend=Backend.objects.get(name='default'))
+        self.render(embed)
+        self.render(embed)
+        self.assertEqual(len(self.renders), 2)
+
+    def test_other_models_arent_cached(self):
+        with fudge.patched_context(
+                ModelProvidedLayoutBackend, 'get_layout_template_name',
+                lambda *args: ['layout/embeds/embed/default.html']):
+            self.backend.render(Parent(pk=1), 'full')
+            self.backend.render(Parent(pk=1), 'full')
+        self.assertEqual(len(self.renders), 2)
@@ -0,0 +1,197 @@
+import fudge
+from datetime import datetime, timedelta
+try:
+    from django.utils.timezone import now
+except ImportError:  # DROP_WITH_DJANGO13 # pragma: no cover
+    now = datetime.now
+
+from armstrong.apps.embeds import freshness
+from armstrong.apps.embeds.models import Embed, Backend, EmbedType, Provider
+from armstrong.apps.embeds.backends import InvalidResponseError
+from armstrong.apps.embeds.freshness import policy, revalidator
+from ._utils import TestCase
+
+
+class FreshnessTestCaseMixin(object):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        Backend.objects.exclude(name="default").delete()
+        self.backend = Backend.objects.get(name='default')
+        self.embed = Embed.objects.create(
+            url="http://www.testme.com", backend=self.backend)
+
+    def age(self, embed, seconds):
+        """Make the response look ``seconds`` old"""
+        embed.response_last_updated = now() - timedelta(seconds=seconds)
+        Embed.objects.filter(pk=embed.pk).update(
+            response_last_updated=embed.response_last_updated)
+
+
+class FreshnessPolicyTestCase(FreshnessTestCaseMixin, TestCase):
+    def test_never_stale_by_default(self):
+        self.age(self.embed, 60 * 60 * 24 * 365)
+        self.assertIsNone(policy.max_age(self.embed))
+        self.assertFalse(self.embed.is_stale())
+
+    def test_default_max_age(self):
+        with self.settings(EMBEDS_MAX_AGE=100):
+            self.age(self.embed, 50)
+            self.assertFalse(self.embed.is_stale())
+            self.age(self.embed, 150)
+            self.assertTrue(self.embed.is_stale())
+
+    def test_embed_without_response_isnt_stale(self):
+        self.embed.response_cache = {}
+        with self.settings(EMBEDS_MAX_AGE=0):
+            self.age(self.embed, 100)
+            self.assertFalse(self.embed.is_stale())
+
+    def test_max_age_by_backend(self):
+        with self.settings(EMBEDS_MAX_AGE=100,
+                           EMBEDS_MAX_AGE_BY_BACKEND=dict(default=10)):
+            self.assertEqual(policy.max_age(self.embed), 10)
+
+    def test_max_age_by_provider_beats_backend(self):
+        self.embed.provider = Provider.objects.create(name='TestProvider')
+        with self.settings(EMBEDS_MAX_AGE_BY_BACKEND=dict(default=10),
+                           EMBEDS_MAX_AGE_BY_PROVIDER=dict(TestProvider=20)):
+            self.assertEqual(policy.max_age(self.embed), 20)
+
+    def test_max_age_by_type_beats_provider(self):
+        self.embed.provider = Provider.objects.create(name='TestProvider')
+        self.embed.type = EmbedType.objects.create(name='video')
+        with self.settings(EMBEDS_MAX_AGE_BY_PROVIDER=dict(TestProvider=20),
+                           EMBEDS_MAX_AGE_BY_TYPE=dict(video=30)):
+            self.assertEqual(policy.max_age(self.embed), 30)
+
+    def test_unlisted_names_fall_through(self):
+        self.embed.type = EmbedType.objects.create(name='video')
+        with self.settings(EMBEDS_MAX_AGE=100,
+                           EMBEDS_MAX_AGE_BY_TYPE=dict(photo=30)):
+            self.assertEqual(policy.max_age(self.embed), 100)
+
+    def test_unconfigured_relations_arent_loaded(self):
+        embed = Embed.objects.with_response().get(pk=self.embed.pk)
+        with self.settings(EMBEDS_MAX_AGE=100):
+            with self.assertNumQueries(0):
+                policy.max_age(embed)
+
+    def test_cache_age_shortens_max_age(self):
+        self.embed.response_cache = dict(url='x', cache_age='7200')
+        with self.settings(EMBEDS_MAX_AGE=10000):
+            self.assertEqual(policy.max_age(self.embed), 7200)
+        with self.settings(EMBEDS_MAX_AGE=None):
+            self.assertEqual(policy.max_age(self.embed), 7200)
+
+    def test_cache_age_has_a_minimum(self):
+        self.embed.response_cache = dict(url='x', cache_age=5)
+        with self.settings(EMBEDS_MIN_AGE=60):
+            self.assertEqual(policy.max_age(self.embed), 60)
+
+    def test_cache_age_can_be_ignored(self):
+        self.embed.response_cache = dict(url='x', cache_age=7200)
+        with self.settings(EMBEDS_RESPECT_CACHE_AGE=False):
+            self.assertIsNone(policy.max_age(self.embed))
+
+    def test_bad_cache_age_is_ignored(self):
+        self.embed.response_cache = dict(url='x', cache_age='soon')
+        self.assertIsNone(policy.max_age(self.embed))
+
+
+class RevalidatorTestCase(FreshnessTestCaseMixin, TestCase):
+    def setUp(self):
+        super(RevalidatorTestCase, self).setUp()
+        self.queued = []
+        self.patched = fudge.patched_context(
+            freshness, 'run_async',
+            lambda func, *args: self.queued.append(args))
+        self.patched.__enter__()
+
+    def tearDown(self):
+        self.patched.__exit__(None, None, None)
+
+    def make_stale(self):
+        Embed.objects.filter(pk=self.embed.pk).update(
+            response_cache=dict(url='old'))
+        self.embed = Embed.objects.get(pk=self.embed.pk)
+        self.age(self.embed, 1000)
+
+    def test_fresh_embed_isnt_queued(self):
+        with self.settings(EMBEDS_MAX_AGE=100):
+            self.assertFalse(self.embed.revalidate_if_stale())
+        self.assertEqual(self.queued, [])
+
+    def test_stale_embed_is_queued_once(self):
+        self.make_stale()
+        with self.settings(EMBEDS_MAX_AGE=100):
+            self.assertTrue(self.embed.revalidate_if_stale())
+            self.embed.revalidate_if_stale()
+        self.assertEqual(self.queued, [(self.embed.pk,)])
+
+        revalidator.done(self.embed.pk)
+        with self.settings(EMBEDS_MAX_AGE=100):
+            self.embed.revalidate_if_stale()
+        self.assertEqual(len(self.queued), 2)
+
+    def test_stale_embed_keeps_its_response(self):
+        self.make_stale()
+        with self.settings(EMBEDS_MAX_AGE=100):
+            self.embed.revalidate_if_stale()
+        self.assertEqual(self.embed.response_cache, dict(url='old'))
+
+    def test_embeds_backing_off_arent_queued(self):
+        self.make_stale()
+        self.embed.record_failure("broken")
+        with self.settings(EMBEDS_MAX_AGE=100):
+            self.embed.revalidate_if_stale()
+        self.assertEqual(self.queued, [])
+
+    def test_disabled(self):
+        self.make_stale()
+        with self.settings(EMBEDS_MAX_AGE=100, EMBEDS_REVALIDATE=False):
+            self.embed.revalidate_if_stale()
+        self.assertEqual(self.queued, [])
+
+    def test_for_render_queues_stale_embeds(self):
+        self.make_stale()
+        Embed.objects.create(url="http://www.testme.com/2",
+                             backend=self.backend)
+        with self.settings(EMBEDS_MAX_AGE=100):
+            embeds = list(Embed.objects.for_render())
+        self.assertEqual(self.queued, [(self.embed.pk,)])
+        self.assertEqual(embeds[0].response_cache, dict(url='old'))
+
+    def test_revalidate_updates_response(self):
+        self.make_stale()
+        with self.settings(EMBEDS_MAX_AGE=100):
+            self.assertTrue(revalidator.revalidate(self.embed.pk))
+
+            embed = Embed.objects.get(pk=self.embed.pk)
+            self.assertEqual(embed.response_cache, dict(url=embed.url))
+            self.assertFalse(embed.is_stale())
+
+    def test_revalidate_unchanged_response_becomes_fresh(self):
+        self.age(self.embed, 1000)
+        with self.settings(EMBEDS_MAX_AGE=100):
+            self.assertTrue(revalidator.revalidate(self.embed.pk))
+            self.assertFalse(Embed.objects.get(pk=self.embed.pk).is_stale())
+
+    def test_revalidate_skips_fresh_embed(self):
+        with self.settings(EMBEDS_MAX_AGE=100):
+            self.assertFalse(revalidator.revalidate(self.embed.pk))
+
+    def test_background_errors_are_logged_and_cleared(self):
+        def raise_exc(obj):
+            raise InvalidResponseError("broken")
+
+        self.make_stale()
+        revalidator._pending.add(self.embed.pk)
+        with fudge.patched_context(Embed, 'get_response', raise_exc):
+            with fudge.patched_context(freshness, 'connection',
+                                       fudge.Fake().is_a_stub()):
+                with self.settings(EMBEDS_MAX_AGE=100):
+                    revalidator._run(self.embed.pk)
+
+        self.assertFalse(self.embed.pk in revalidator._pending)
+        self.assertEqual(Embed.objects.get(pk=self.embed.pk).failure_count, 1)
@@ -0,0 +1,171 @@
+import time
+import fudge
+
+from armstrong.apps.embeds.models import Embed, Backend
+from armstrong.apps.embeds.backends import InvalidResponseError
+from armstrong.apps.embeds.backends.default import DefaultResponse
+from armstrong.apps.embeds.backends.embedly import (
+    EmbedlyBackend, EmbedlyResponse)
+from armstrong.apps.embeds.hedging import (
+    LatencyTracker, hedge_delay, hedged_call, latencies)
+from ._utils import TestCase
+
+
+class LatencyTrackerTestCase(TestCase):
+    def setUp(self):
+        self.tracker = LatencyTracker()
+
+    def test_too_few_samples(self):
+        self.tracker.record('a', 1.0)
+        self.assertIsNone(self.tracker.percentile('a', 90))
+        self.assertIsNone(self.tracker.percentile('b', 90))
+
+    def test_percentile(self):
+        for i in range(1, 11):
+            self.tracker.record('a', float(i))
+        self.assertEqual(self.tracker.percentile('a', 0), 1.0)
+        self.assertEqual(self.tracker.percentile('a', 50), 6.0)
+        self.assertEqual(self.tracker.percentile('a', 90), 9.0)
+        self.assertEqual(self.tracker.percentile('a', 100), 10.0)
+
+    def test_keeps_recent_samples(self):
+        with self.settings(EMBEDS_HEDGE_SAMPLES=10):
+            for i in range(100):
+                self.tracker.record('a', float(i))
+        self.assertEqual(self.tracker.percentile('a', 0), 90.0)
+
+    def test_window_follows_the_setting(self):
+        for i in range(20):
+            self.tracker.record('a', float(i))
+        with self.settings(EMBEDS_HEDGE_SAMPLES=10):
+            self.tracker.record('a', 20.0)
+        self.assertEqual(self.tracker.percentile('a', 0), 11.0)
+
+
+class FakeResponse(DefaultResponse):
+    def is_valid(self):
+        return bool(self._data)
+
+
+class FakeBackend(object):
+    code_path = 'fake'
+
+    def __init__(self, pk, delay=0, valid=True, error=None):
+        self.pk, self.delay, self.valid, self.error = pk, delay, valid, error
+        self.called = False
+
+    def call(self, url):
+        self.called = True
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        data = dict(url=url, pk=self.pk) if self.valid else None
+        return FakeResponse(data, fresh=True)
+
+
+class HedgedCallTestCase(TestCase):
+    def test_delay_defaults_without_samples(self):
+        with self.settings(EMBEDS_HEDGE_DELAY=0.5):
+            self.assertEqual(hedge_delay(FakeBackend(1)), 0.5)
+
+    def test_delay_from_percentile(self):
+        for i in range(10):
+            latencies.record('fake', 0.25)
+        self.assertEqual(hedge_delay(FakeBackend(1)), 0.25)
+
+    def test_fast_primary_wins_alone(self):
+        primary, secondary = FakeBackend(1), FakeBackend(2)
+        with self.settings(EMBEDS_HEDGE_DELAY=1):
+            backend, response = hedged_call('u', [primary, secondary])
+        self.assertIs(backend, primary)
+        self.assertFalse(secondary.called)
+
+    def test_slow_primary_is_hedged(self):
+        primary, secondary = FakeBackend(1, delay=0.5), FakeBackend(2)
+        with self.settings(EMBEDS_HEDGE_DELAY=0.05):
+            backend, response = hedged_call('u', [primary, secondary])
+        self.assertIs(backend, secondary)
+        self.assertEqual(response._data['pk'], 2)
+
+    def test_failed_primary_starts_next_immediately(self):
+        primary = FakeBackend(1, error=InvalidResponseError("down"))
+        secondary = FakeBackend(2)
+        with self.settings(EMBEDS_HEDGE_DELAY=10):
+            started = time.time()
+            backend, _ = hedged_call('u', [primary, secondary])
+        self.assertIs(backend, secondary)
+        self.assertLess(time.time() - started, 5)
+
+    def test_invalid_response_loses(self):
+        primary, secondary = FakeBackend(1, valid=False), FakeBackend(2)
+        backend, _ = hedged_call('u', [primary, secondary])
+        self.assertIs(backend, secondary)
+
+    def test_primary_outcome_when_nothing_is_valid(self):
+        primary = FakeBackend(1, error=InvalidResponseError("down"))
+        secondary = FakeBackend(2, valid=False)
+        with self.assertRaises(InvalidResponseError):
+            hedged_call('u', [primary, secondary])
+
+        primary, secondary = FakeBackend(1, valid=False), FakeBackend(2)
+        secondary.error = InvalidResponseError("down")
+        backend, response = hedged_call('u', [primary, secondary])
+        self.assertIs(backend, primary)
+        self.assertFalse(response.is_valid())
+
+    def test_limits_backends(self):
+        backends = [FakeBackend(i, valid=False) for i in range(4)]
+        with self.settings(EMBEDS_HEDGE_MAX=3):
+            hedged_call('u', backends)
+        self.assertEqual([b.called for b in backends],
+                         [True, True, True, False])
+
+
+class EmbedHedgingTestCase(TestCase):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        Backend.objects.exclude(name__in=["default", "Embedly"]).delete()
+        self.default = Backend.objects.get(name='default')
+        self.embedly = Backend.objects.get(name='Embedly')
+        self.url = "http://www.testme.com"
+
+    def slow_embedly(self, delay):
+        def call(obj, url):
+            time.sleep(delay)
+            return EmbedlyResponse(dict(type='link', url=url), fresh=True)
+        return fudge.patched_context(EmbedlyBackend, 'call', call)
+
+    def test_embed_records_the_backend_that_answered(self):
+        e = Embed(url=self.url, backend=self.embedly)
+        with self.slow_embedly(0.5), self.settings(EMBEDS_HEDGE_DELAY=0.05):
+            response = e.get_response(hedge=True)
+        self.assertEqual(response._data, dict(url=self.url))
+        self.assertEqual(e.backend, self.default)
+        self.assertTrue(e.needs_upgrade)
+
+    def test_embed_keeps_fast_backend(self):
+        e = Embed(url=self.url, backend=self.embedly)
+        with self.slow_embedly(0), self.settings(EMBEDS_HEDGE_DELAY=1):
+            e.get_response(hedge=True)
+        self.assertEqual(e.backend, self.embedly)
+        self.assertFalse(e.needs_upgrade)
+
+    def test_embed_with_data_isnt_hedged(self):
+        e = Embed(url=self.url, backend=self.embedly,
+                  response_cache=dict(title='keep me'))
+        with self.slow_embedly(0.2), self.settings(EMBEDS_HEDGE_DELAY=0.01):
+            e.get_response(hedge=True)
+        self.assertEqual(e.backend, self.embedly)
+
+    def test_new_embed_save_hedges_when_enabled(self):
+        with self.slow_embedly(0.5):
+            with self.settings(EMBEDS_HEDGE=True, EMBEDS_HEDGE_DELAY=0.05):
+                e = Embed.objects.create(url=self.url)
+        self.assertEqual(e.backend, self.default)
+
+    def test_calls_record_latency(self):
+        with self.slow_embedly(0):
+            self.embedly.call(self.url)
+        window, samples = latencies._samples[self.embedly.code_path]
+        self.assertEqual(len(samples), 1)
@@ -1,6 +1,8 @@
 import fudge
 
-from armstrong.apps.embeds.mixins import TemplatesByEmbedTypeMixin
+from armstrong.apps.embeds.mixins import (
+    TemplatesByEmbedTypeMixin, template_names)
+from armstrong.apps.embeds.models import Embed, EmbedType
 from .support.models import Parent, Child, TypeModel
 from ._utils import TestCase
 
@@ -104,3 +106,71 @@ class TemplatesByEmbedTypeTestCase(TemplateCompareTestMixin, TestCase):
             '%(base)s/%(app)s/child/%(tpl)s.html',
             '%(base)s/%(app)s/parent/%(tpl)s.html']
         self.compare_templates(obj, expected, use_type=True)
+
+
+class TemplateNameCacheTestCase(TestCase):
+    fixtures = ['embed_backends']
+
+    def valid_embed(self, slug='photo'):
+        embed = Embed(type=EmbedType(slug=slug))
+        embed._response = fudge.Fake().provides('is_valid').returns(True)
+        return embed
+
+    def test_narrows_to_the_existing_template(self):
+        self.assertEqual(
+            self.valid_embed().get_layout_template_name('full'),
+            ['layout/embeds/embedtype/photo/full.html'])
+        self.assertEqual(
+            self.valid_embed('link').get_layout_template_name('full'),
+            ['layout/embeds/embed/full.html'])
+
+    def test_keeps_every_candidate_when_none_exist(self):
+        self.assertEqual(
+            self.valid_embed().get_layout_template_name('missing'), [
+                'layout/embeds/embedtype/photo/missing.html',
+                'layout/embeds/embed/missing.html'])
+
+    def test_keeps_every_candidate_in_debug(self):
+        with self.settings(DEBUG=True):
+            names = self.valid_embed().get_layout_template_name('full')
+        self.assertEqual(len(names), 2)
+
+    def test_builds_names_once(self):
+        self.valid_embed().get_layout_template_name('full')
+        with fudge.patched_context(
+                Embed, '_get_layout_template_names',
+                fudge.Fake().is_callable().times_called(0)):
+            self.assertEqual(
+                self.valid_embed().get_layout_template_name('full'),
+                ['layout/embeds/embedtype/photo/full.html'])
+        self.assertEqual(template_names.stats()['hits'], 1)
+
+    def test_cached_by_type_and_validity(self):
+        self.valid_embed().get_layout_template_name('full')
+        self.valid_embed('video').get_layout_template_name('full')
+        Embed().get_layout_template_name('full')
+        self.assertEqual(template_names.stats()['size'], 3)
+
+    def test_cached_by_fallback_settings(self):
+        obj = Parent()
+        default = obj.get_layout_template_name('tpl')
+        obj.templates_without_fallbacks.append('tpl')
+        self.assertNotEqual(obj.get_layout_template_name('tpl'), default)
+        obj.fallback_template_name = 'usethisone'
+        self.assertNotEqual(Parent().get_layout_template_name('other'),
+                            obj.get_layout_template_name('other'))
+
+    def test_returns_a_copy(self):
+        self.valid_embed().get_layout_template_name('missing').append('x')
+        self.assertEqual(
+            len(self.valid_embed().get_layout_template_name('missing')), 2)
+
+    def test_deferred_embeds_use_the_embed_templates(self):
+        embed = Embed.objects.create(url='http://www.example.com/')
+        deferred = Embed.objects.get(pk=embed.pk)
+        self.assertNotEqual(deferred.__class__, Embed)
+        self.assertEqual(deferred.get_layout_template_name('missing'),
+                         ['layout/embeds/embed/default.html'])
+        self.assertEqual(template_names.stats()['misses'], 1)
+        embed.get_layout_template_name('missing')
+        self.assertEqual(template_names.stats()['hits'], 1)
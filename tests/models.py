@@ -1,11 +1,24 @@
+import os
 import fudge
+import tempfile
+from StringIO import StringIO
+from threading import current_thread
 from datetime import datetime, timedelta
+try:
+    from django.utils.timezone import now
+except ImportError:  # DROP_WITH_DJANGO13 # pragma: no cover
+    now = datetime.now
 
 from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
 
 from armstrong.apps.embeds.models import Embed, Backend, EmbedType, Provider
 from armstrong.apps.embeds.backends import InvalidResponseError, proxy
+from armstrong.apps.embeds.backends.asynchronous import (
+    CompletedResult, reset_pool)
 from armstrong.apps.embeds.backends.default import DefaultBackend, DefaultResponse
+from armstrong.apps.embeds.backends.embedly import EmbedlyBackend, EmbedlyResponse
+from armstrong.apps.embeds.backends.circuit import CircuitOpenError
 from .mixins import TemplateCompareTestMixin
 from ._utils import TestCase
 
@@ -22,6 +35,10 @@ def fake_backend_init(obj, *args, **kwargs):
     obj._setup_backend_proxy_methods()
 
 
+def raise_exec(*args):
+    raise AssertionError("the Backend shouldn't be called")
+
+
 class BackendModelTestCase(TestCase):
     def setUp(self):
         self.url = "http://www.testme.com"
@@ -42,8 +59,15 @@ class BackendModelTestCase(TestCase):
     def test_model_inits_properly(self):
         self.assertTrue(isinstance(self.backend._backend, self.backend_cls))
 
+    def test_models_share_backend_code(self):
+        other = Backend(code_path=self.backend.code_path)
+        self.assertIs(other._backend, self.backend._backend)
+        self.assertIs(other._proxy_to_backend, self.backend._proxy_to_backend)
+
     def test_model_proxys_properly(self):
         for method_name in self.backend._proxy_to_backend:
+            if method_name in Backend.__dict__:
+                continue  # wrapped by the model, e.g. call()
             self.assertEqual(
                 getattr(self.backend, method_name).im_self,
                 self.backend._backend)
@@ -60,6 +84,64 @@ class BackendModelTestCase(TestCase):
         with self.assertRaises(AttributeError):
             self.backend.but_not_me()
 
+    def test_model_call_many_falls_back_to_call(self):
+        urls = [self.url, '', "http://www.other.com"]
+        responses = self.backend.call_many(urls)
+        self.assertEqual(len(responses), 3)
+        self.assertEqual(responses[0]._data['url'], self.url)
+        self.assertIsNone(responses[1])
+        self.assertEqual(responses[2]._data['url'], urls[2])
+
+    def test_model_call_many_uses_backend_batching(self):
+        class Stub(self.backend_cls):
+            batch_size = 10
+            call_many = proxy(lambda _, urls: "batched")
+
+        self.backend._backend = Stub()
+        self.backend._setup_backend_proxy_methods()
+        self.assertEqual(self.backend.call_many([self.url]), "batched")
+        self.assertEqual(self.backend.batch_size, 10)
+
+    def test_model_batch_size_defaults_to_one(self):
+        self.assertEqual(self.backend.batch_size, 1)
+
+    def test_model_acall_answers_immediately_without_network(self):
+        self.assertFalse(self.backend.is_network)
+        result = self.backend.acall(self.url)
+        self.assertTrue(isinstance(result, CompletedResult))
+        self.assertEqual(result.get()._data['url'], self.url)
+
+    def test_model_acall_many_answers_immediately_without_network(self):
+        result = self.backend.acall_many([self.url, ''])
+        self.assertTrue(isinstance(result, CompletedResult))
+        self.assertEqual(len(result.get()), 2)
+
+    def test_model_acall_uses_pool_for_network_backends(self):
+        backend = Backend(
+            code_path='armstrong.apps.embeds.backends.embedly.EmbedlyBackend')
+        self.assertTrue(backend.is_network)
+
+        cls = backend._backend.__class__
+        fake_call = lambda _, url: current_thread()
+        fake_call_many = lambda _, urls: [current_thread() for u in urls]
+        with fudge.patched_context(cls, 'call', fake_call):
+            with fudge.patched_context(cls, 'call_many', fake_call_many):
+                thread = backend.acall(self.url).get(1)
+                threads = backend.acall_many([self.url, self.url]).get(1)
+        self.assertIsNot(thread, current_thread())
+        self.assertEqual(len(threads), 2)
+        reset_pool()
+
+    def test_model_acall_uses_backend_version(self):
+        class Stub(self.backend_cls):
+            acall = proxy(lambda _, url: "async")
+            acall_many = proxy(lambda _, urls: "async many")
+
+        self.backend._backend = Stub()
+        self.backend._setup_backend_proxy_methods()
+        self.assertEqual(self.backend.acall(self.url), "async")
+        self.assertEqual(self.backend.acall_many([self.url]), "async many")
+
     def test_model_calls_properly(self):
         response = self.backend.call(self.url)
         self.assertTrue(isinstance(response, self.response_cls))
@@ -85,6 +167,66 @@ class EmbedTypeTestCase(TestCase):
         self.assertEqual(new.slug, "hey-slug")
 
 
+class NormalizedNameManagerTestCase(TestCase):
+    def test_get_for_name_creates_object(self):
+        t = EmbedType.objects.get_for_name('photo')
+        self.assertTrue(isinstance(t, EmbedType))
+        self.assertEqual(t.slug, 'photo')
+        self.assertEqual(EmbedType.objects.count(), 1)
+
+    def test_get_for_name_returns_existing_object(self):
+        p = Provider.objects.create(name='YouTube')
+        self.assertEqual(Provider.objects.get_for_name('YouTube'), p)
+        self.assertEqual(Provider.objects.count(), 1)
+
+    def test_existing_objects_are_cached(self):
+        Provider.objects.create(name='YouTube')
+        p = Provider.objects.get_for_name('YouTube')
+        with self.assertNumQueries(0):
+            self.assertIs(Provider.objects.get_for_name('YouTube'), p)
+
+    def test_created_objects_arent_cached(self):
+        EmbedType.objects.get_for_name('photo')
+        with self.assertNumQueries(1):
+            EmbedType.objects.get_for_name('photo')
+        with self.assertNumQueries(0):
+            EmbedType.objects.get_for_name('photo')
+
+    def test_saving_clears_cache(self):
+        p = Provider.objects.create(name='YouTube')
+        Provider.objects.get_for_name('YouTube')
+        p.save()
+        with self.assertNumQueries(1):
+            Provider.objects.get_for_name('YouTube')
+
+    def test_get_for_names_reads_uncached_names_together(self):
+        Provider.objects.create(name='YouTube')
+        Provider.objects.create(name='Vimeo')
+        with self.assertNumQueries(1):
+            found = Provider.objects.get_for_names(['YouTube', 'Vimeo'])
+        self.assertEqual(sorted(found), ['Vimeo', 'YouTube'])
+        with self.assertNumQueries(0):
+            Provider.objects.get_for_names(['YouTube', 'Vimeo', 'YouTube'])
+
+    def test_get_for_names_creates_missing_names(self):
+        found = EmbedType.objects.get_for_names(['photo'])
+        self.assertEqual(found['photo'], EmbedType.objects.get(name='photo'))
+
+    def test_deleting_clears_cache(self):
+        Provider.objects.create(name='YouTube')
+        Provider.objects.get_for_name('YouTube').delete()
+        p = Provider.objects.get_for_name('YouTube')
+        self.assertEqual(Provider.objects.get(), p)
+
+    def test_models_have_separate_caches(self):
+        EmbedType.objects.create(name='same')
+        Provider.objects.create(name='same')
+        self.assertTrue(isinstance(
+            EmbedType.objects.get_for_name('same'), EmbedType))
+        self.assertTrue(isinstance(
+            Provider.objects.get_for_name('same'), Provider))
+
+
 class EmbedModelTestCase(TestCase):
     fixtures = ['embed_backends']
 
@@ -305,8 +447,24 @@ class EmbedModelTestCase(TestCase):
         self.assertEqual(e.response_cache, d)
 
     def test_response_cache_requires_backend(self):
+        e = Embed(response_cache=dict(a=2))
         with self.assertRaises(Backend.DoesNotExist):
-            Embed(response_cache=dict(a=2))
+            e.response
+
+    def test_response_cache_isnt_wrapped_on_init(self):
+        e = Embed(response_cache=dict(a=2), backend=self.backend)
+        self.assertIsNone(e._response)
+
+    def test_loading_embed_doesnt_query_backend(self):
+        Embed.objects.create(url=self.url, backend=self.backend)
+
+        with self.assertNumQueries(1):
+            e = Embed.objects.get(url=self.url)
+            self.assertEqual(e.url, self.url)
+            self.assertIsNone(e._response)
+
+        with self.assertNumQueries(2):  # response data, Backend FK
+            self.assertTrue(isinstance(e.response, self.response_cls))
 
     def test_response_cache_wraps_correctly(self):
         data = dict(a=2)
@@ -433,6 +591,568 @@ class EmbedModelTestCase(TestCase):
         self.assertGreater(e.response_last_updated, dt)
 
 
+
+class EmbedRenderVariantsTestCase(TestCase):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        self.backend = Backend.objects.get(name='default')
+        self.response = DefaultResponse(fresh=True, data=dict(
+            type='TestType', provider_name='TestProvider',
+            html='<iframe width="800" height="400"></iframe>'))
+
+    def test_no_variants_by_default(self):
+        e = Embed()
+        e.response = self.response
+        self.assertEqual(e.render_variants, {})
+
+    def test_fresh_response_stores_variants(self):
+        with self.settings(EMBEDS_RENDER_WIDTHS=(320, 640)):
+            e = Embed()
+            e.response = self.response
+        self.assertEqual(e.render_variants, {
+            '320': '<iframe width="320" height="160"></iframe>',
+            '640': '<iframe width="640" height="320"></iframe>'})
+        self.assertEqual(e.response.render_at(320), e.render_variants['320'])
+
+    def test_loaded_response_renders_from_variants(self):
+        with self.settings(EMBEDS_RENDER_WIDTHS=(320,)):
+            e = Embed(url='http://example.com/', backend=self.backend)
+            e.response = self.response
+            e.save()
+
+        e = Embed.objects.get(pk=e.pk)
+        with fudge.patched_context(
+                'armstrong.apps.embeds.templatetags.embed_helpers',
+                'resize_iframe', fudge.Fake().is_callable().times_called(0)):
+            self.assertEqual(e.response.render_at(320),
+                             '<iframe width="320" height="160"></iframe>')
+
+    def test_unfresh_response_keeps_variants(self):
+        e = Embed()
+        e.render_variants = {'320': 'stored'}
+        self.response._fresh = False
+        e.response = self.response
+        self.assertEqual(e.render_variants, {'320': 'stored'})
+
+    def test_deleting_response_clears_variants(self):
+        with self.settings(EMBEDS_RENDER_WIDTHS=(320,)):
+            e = Embed()
+            e.response = self.response
+        del e.response
+        self.assertFalse(e.render_variants)
+
+
+class EmbedResponseColumnsTestCase(TestCase):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        self.backend = Backend.objects.get(name='default')
+        self.response = DefaultResponse(fresh=True, data=dict(
+            title='A Title', html='<iframe></iframe>'))
+
+    def test_fresh_response_sets_columns(self):
+        self.response._data.update(
+            author_name='Someone', thumbnail_url='http://example.com/i.jpg',
+            thumbnail_width=320, thumbnail_height='240')
+        e = Embed()
+        e.response = self.response
+        self.assertEqual(e.title, 'A Title')
+        self.assertEqual(e.author_name, 'Someone')
+        self.assertEqual(e.image_url, 'http://example.com/i.jpg')
+        self.assertEqual(e.image_width, 320)
+        self.assertEqual(e.image_height, 240)
+        self.assertTrue(e.has_response)
+
+    def test_missing_attributes_leave_columns_empty(self):
+        self.response._data.update(thumbnail_width='wide',
+                                   thumbnail_height=-1)
+        e = Embed()
+        e.response = self.response
+        self.assertEqual(e.author_name, '')
+        self.assertEqual(e.image_url, '')
+        self.assertIsNone(e.image_width)
+        self.assertIsNone(e.image_height)
+
+    def test_non_text_attributes_are_converted(self):
+        self.response._data.update(title=12345, author_name=['Someone'])
+        e = Embed()
+        e.response = self.response
+        self.assertEqual(e.title, u'12345')
+        self.assertEqual(e.author_name, u"['Someone']")
+
+    def test_long_image_urls_arent_truncated(self):
+        self.response._data['thumbnail_url'] = 'http://example.com/' + 'x' * 500
+        e = Embed()
+        e.response = self.response
+        self.assertEqual(e.image_url, '')
+
+    def test_with_image_filters_in_the_database(self):
+        e = Embed(url='http://example.com/', backend=self.backend)
+        e.response = self.response
+        e.save()
+        self.assertEqual(Embed.objects.with_image().count(), 0)
+        Embed.objects.update(image_url='http://example.com/i.jpg')
+        self.assertEqual(Embed.objects.with_image().get(), e)
+
+    def test_long_titles_are_truncated(self):
+        self.response._data['title'] = 'x' * 300
+        e = Embed()
+        e.response = self.response
+        self.assertEqual(len(e.title), 255)
+
+    def test_deleting_response_clears_columns(self):
+        e = Embed()
+        e.response = self.response
+        del e.response
+        self.assertEqual(e.title, '')
+        self.assertFalse(e.has_response)
+
+    def test_unfresh_response_doesnt_set_columns(self):
+        self.response._fresh = False
+        e = Embed()
+        e.response = self.response
+        self.assertEqual(e.title, '')
+        self.assertFalse(e.has_response)
+
+    def test_for_listing_defers_response_data(self):
+        Embed.objects.create(url='http://example.com/', backend=self.backend)
+        with self.assertNumQueries(1):
+            e = Embed.objects.for_listing().get()
+            self.assertEqual(e.backend.name, 'default')
+            self.assertTrue(e.has_response)
+        self.assertFalse('response_cache' in e.__dict__)
+
+    def test_for_listing_shares_backends(self):
+        for url in ('http://example.com/1', 'http://example.com/2'):
+            Embed.objects.create(url=url, backend=self.backend)
+        a, b = Embed.objects.for_listing()
+        self.assertIs(a.backend, b.backend)
+
+    def test_backfill_command_copies_columns(self):
+        self.response._data['author_name'] = 'Someone'
+        e = Embed(url='http://example.com/', backend=self.backend)
+        e.response = self.response
+        e.save()
+        Embed.objects.update(title='', author_name='', has_response=False)
+
+        out = StringIO()
+        call_command('backfill_embed_columns', batch_size=1, stdout=out)
+        self.assertTrue("1 Embeds updated" in out.getvalue())
+        e = Embed.objects.get(pk=e.pk)
+        self.assertEqual(e.title, 'A Title')
+        self.assertEqual(e.author_name, 'Someone')
+        self.assertTrue(e.has_response)
+
+class EmbedDeferredResponseTestCase(TestCase):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        self.backend = Backend.objects.get(name='default')
+        self.embed = Embed(url='http://example.com/', backend=self.backend)
+        self.embed.response = DefaultResponse(fresh=True, data=dict(
+            title='A Title', html='<iframe width="800"></iframe>'))
+        with self.settings(EMBEDS_RENDER_WIDTHS=[400]):
+            self.embed.save()
+        self.updated = self.embed.response_last_updated - timedelta(days=1)
+        Embed.objects.filter(pk=self.embed.pk)\
+            .update(response_last_updated=self.updated)
+
+    def get(self, queryset=None):
+        queryset = Embed.objects if queryset is None else queryset
+        return queryset.select_related('backend')\
+            .get(pk=self.embed.pk)
+
+    def test_response_data_isnt_loaded_by_default(self):
+        e = self.get()
+        for name in Embed.RESPONSE_DATA:
+            self.assertFalse(name in e.__dict__)
+        self.assertEqual(e.title, 'A Title')
+
+    def test_first_access_loads_all_response_data(self):
+        e = self.get()
+        with self.assertNumQueries(1):
+            self.assertEqual(e.response, self.embed.response)
+            self.assertEqual(e.render_variants, self.embed.render_variants)
+            self.assertEqual(e.response.render_at(400),
+                             '<iframe width="400"></iframe>')
+
+    def test_with_response_loads_eagerly(self):
+        with self.assertNumQueries(1):
+            e = self.get(Embed.objects.with_response())
+            self.assertEqual(e.response, self.embed.response)
+
+    def test_with_response_keeps_other_deferred_fields(self):
+        e = self.get(Embed.objects.defer('title').with_response())
+        self.assertFalse('title' in e.__dict__)
+        self.assertTrue('response_cache' in e.__dict__)
+
+        e = self.get(Embed.objects.only('url', 'backend').with_response())
+        self.assertFalse('title' in e.__dict__)
+        self.assertTrue('render_variants' in e.__dict__)
+
+    def test_deferred_embeds_equal_loaded_ones(self):
+        e = self.get()
+        self.assertEqual(e, self.embed)
+        self.assertEqual(self.embed, e)
+        self.assertTrue(e in set([self.embed]))
+        unsaved = Embed(url='http://a.com/')
+        self.assertNotEqual(unsaved, Embed(url='http://a.com/'))
+
+    def test_for_render_loads_eagerly(self):
+        e = Embed.objects.for_render().get(pk=self.embed.pk)
+        self.assertEqual(e.__class__, Embed)
+
+    def test_saving_without_loading_keeps_the_response(self):
+        e = self.get()
+        e.needs_upgrade = True
+        e.save()
+        self.assertFalse('response_cache' in e.__dict__)
+
+        e = self.get(Embed.objects.with_response())
+        self.assertEqual(e.response, self.embed.response)
+        self.assertEqual(e.response_last_updated, self.updated)
+
+    def test_loading_doesnt_count_as_a_change(self):
+        e = self.get()
+        e.response_cache
+        e.save()
+        self.assertEqual(self.get().response_last_updated, self.updated)
+
+    def test_changing_a_loaded_response_is_monitored(self):
+        e = self.get()
+        e.response = DefaultResponse(fresh=True, data=dict(title='New'))
+        e.save()
+        self.assertNotEqual(self.get().response_last_updated, self.updated)
+
+    def test_setting_an_unloaded_response_is_monitored(self):
+        e = self.get()
+        e.response_cache = dict(title='New')
+        e.save()
+        self.assertNotEqual(self.get().response_last_updated, self.updated)
+
+    def test_dumpdata_round_trip(self):
+        out = StringIO()
+        call_command('dumpdata', 'embeds.embed', stdout=out)
+        data = out.getvalue()
+        self.assertTrue('"embeds.embed"' in data)
+        self.assertFalse('deferred' in data)
+
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.write(fd, data)
+        os.close(fd)
+        try:
+            Embed.objects.all().delete()
+            call_command('loaddata', path, verbosity=0)
+        finally:
+            os.remove(path)
+        e = self.get(Embed.objects.with_response())
+        self.assertEqual(e.response, self.embed.response)
+        self.assertEqual(e.render_variants, self.embed.render_variants)
+
+
+class EmbedFailureTrackingTestCase(TestCase):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        Backend.objects.exclude(name="default").delete()
+        self.backend = Backend.objects.get(name='default')
+        self.embed = Embed.objects.create(
+            url="http://www.testme.com", backend=self.backend)
+
+    def break_backend(self, error=None):
+        def raise_exc(obj):
+            raise error or InvalidResponseError("broken")
+        return fudge.patched_context(Embed, 'get_response', raise_exc)
+
+    def invalid(self):
+        class InvalidResponse(DefaultResponse):
+            def is_valid(self):
+                return False
+        return fudge.patched_context(
+            Embed, 'get_response',
+            lambda obj: InvalidResponse(dict(error='gone'), fresh=True))
+
+    def reload(self):
+        return Embed.objects.get(pk=self.embed.pk)
+
+    def test_new_embed_has_no_failures(self):
+        self.assertEqual(self.embed.failure_count, 0)
+        self.assertIsNone(self.embed.retry_after)
+        self.assertTrue(self.embed.is_retry_due())
+
+    def test_error_is_recorded_and_reraised(self):
+        with self.break_backend():
+            with self.assertRaises(InvalidResponseError):
+                self.embed.update_response()
+
+        e = self.reload()
+        self.assertEqual(e.failure_count, 1)
+        self.assertEqual(e.last_error, "broken")
+        self.assertGreater(e.retry_after, now())
+
+    def test_open_circuit_isnt_recorded(self):
+        def circuit_open(obj):
+            raise CircuitOpenError("open")
+
+        with fudge.patched_context(Embed, 'get_response', circuit_open):
+            with self.assertRaises(CircuitOpenError):
+                self.embed.update_response()
+
+        e = self.reload()
+        self.assertEqual(e.failure_count, 0)
+        self.assertTrue(e.is_retry_due())
+
+    def test_invalid_response_is_recorded(self):
+        with self.invalid():
+            self.assertFalse(self.embed.update_response())
+
+        e = self.reload()
+        self.assertEqual(e.failure_count, 1)
+        self.assertTrue('gone' in e.last_error)
+        self.assertFalse(e.is_retry_due())
+
+    def test_backoff_skips_backend(self):
+        with self.invalid():
+            self.embed.update_response()
+
+        with fudge.patched_context(Embed, 'get_response', raise_exec):
+            self.assertFalse(self.embed.update_response())
+
+    def test_force_ignores_backoff(self):
+        with self.invalid():
+            self.embed.update_response()
+        del self.embed.response
+        self.assertTrue(self.embed.update_response(force=True))
+
+    def test_backoff_grows_with_failures(self):
+        delays = []
+        with self.settings(EMBEDS_RETRY_BACKOFF=100,
+                           EMBEDS_RETRY_BACKOFF_MAX=1000):
+            for i in range(6):
+                self.embed.record_failure("broken")
+                delays.append(
+                    (self.embed.retry_after - now()).total_seconds())
+
+        self.assertEqual(self.embed.failure_count, 6)
+        for delay, full in zip(delays, [100, 200, 400, 800, 1000, 1000]):
+            self.assertLessEqual(delay, full)
+            self.assertGreater(delay, full / 2 - 1)
+
+    def test_success_clears_failures(self):
+        with self.invalid():
+            self.embed.update_response()
+        self.embed.update_response(force=True)
+
+        e = self.reload()
+        self.assertEqual(e.failure_count, 0)
+        self.assertEqual(e.last_error, '')
+        self.assertIsNone(e.retry_after)
+
+    def test_success_without_failures_doesnt_write(self):
+        with self.assertNumQueries(0):
+            self.embed.record_success()
+
+    def test_new_embed_records_failure_on_save(self):
+        with self.break_backend():
+            e = Embed.objects.create(
+                url="http://www.testme.com/new", backend=self.backend)
+        self.assertEqual(Embed.objects.get(pk=e.pk).failure_count, 1)
+
+    def test_retry_due(self):
+        with self.invalid():
+            self.embed.update_response()
+        other = Embed.objects.create(
+            url="http://www.testme.com/2", backend=self.backend)
+
+        self.assertEqual(list(Embed.objects.retry_due()), [other])
+        Embed.objects.update(retry_after=now() - timedelta(seconds=1))
+        self.assertEqual(Embed.objects.retry_due().count(), 2)
+
+
+class BackendCircuitTestCase(TestCase):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        Backend.objects.exclude(name__in=["default", "Embedly"]).delete()
+        self.default = Backend.objects.get(name='default')
+        self.embedly = Backend.objects.get(name='Embedly')
+        self.url = "http://www.testme.com"
+
+    def break_embedly(self):
+        def raise_exc(obj, url):
+            raise InvalidResponseError("down")
+        return fudge.patched_context(EmbedlyBackend, 'call', raise_exc)
+
+    def open_circuit(self):
+        with self.settings(EMBEDS_CIRCUIT_THRESHOLD=1):
+            self.embedly.circuit.record_failure()
+
+    def test_failures_open_the_circuit(self):
+        with self.settings(EMBEDS_CIRCUIT_THRESHOLD=2):
+            with self.break_embedly():
+                for i in range(2):
+                    with self.assertRaises(InvalidResponseError):
+                        self.embedly.call(self.url)
+            self.assertTrue(self.embedly.circuit.is_open())
+
+    def test_server_error_responses_open_the_circuit(self):
+        def unavailable(obj, url):
+            return EmbedlyResponse(
+                dict(type='error', error=True, error_code=503), fresh=True)
+
+        with self.settings(EMBEDS_CIRCUIT_THRESHOLD=2):
+            with fudge.patched_context(EmbedlyBackend, 'call', unavailable):
+                self.embedly.call(self.url)
+                self.assertFalse(self.embedly.circuit.is_open())
+                self.embedly.call(self.url)
+            self.assertTrue(self.embedly.circuit.is_open())
+
+    def test_url_error_responses_dont_count_as_failures(self):
+        def not_found(obj, url):
+            return EmbedlyResponse(
+                dict(type='error', error=True, error_code=404), fresh=True)
+
+        with self.settings(EMBEDS_CIRCUIT_THRESHOLD=1):
+            with fudge.patched_context(EmbedlyBackend, 'call', not_found):
+                self.embedly.call(self.url)
+            self.assertFalse(self.embedly.circuit.is_open())
+
+    def test_open_circuit_fails_fast(self):
+        self.open_circuit()
+        with fudge.patched_context(EmbedlyBackend, 'call', raise_exec):
+            with self.assertRaises(CircuitOpenError):
+                self.embedly.call(self.url)
+            with self.assertRaises(CircuitOpenError):
+                self.embedly.call_many([self.url])
+
+    def test_backends_without_network_have_no_circuit(self):
+        with self.settings(EMBEDS_CIRCUIT_THRESHOLD=1):
+            self.default.circuit.record_failure()
+        self.assertTrue(self.default.is_available())
+        self.assertIsNotNone(self.default.call(self.url))
+
+    def test_choose_backend_passes_over_open_circuit(self):
+        self.assertEqual(Embed(url=self.url).choose_backend(), self.embedly)
+        self.open_circuit()
+        self.assertEqual(Embed(url=self.url).choose_backend(), self.default)
+
+    def test_new_embed_falls_back_and_is_flagged(self):
+        self.open_circuit()
+        e = Embed.objects.create(url=self.url)
+        self.assertEqual(e.backend, self.default)
+        self.assertTrue(e.needs_upgrade)
+        self.assertEqual(e.response_cache, dict(url=self.url))
+
+    def test_preferred_backend_isnt_flagged(self):
+        with fudge.patched_context(EmbedlyBackend, 'call',
+                                   lambda obj, url: None):
+            e = Embed.objects.create(url=self.url)
+        self.assertEqual(e.backend, self.embedly)
+        self.assertFalse(e.needs_upgrade)
+
+    def test_get_response_falls_back_without_data(self):
+        e = Embed(url=self.url, backend=self.embedly)
+        self.open_circuit()
+        response = e.get_response()
+        self.assertEqual(e.backend, self.default)
+        self.assertTrue(e.needs_upgrade)
+        self.assertEqual(response._data, dict(url=self.url))
+
+    def test_get_response_keeps_backend_with_data(self):
+        e = Embed(url=self.url, backend=self.embedly,
+                  response_cache=dict(title='keep me'))
+        self.open_circuit()
+        with self.assertRaises(CircuitOpenError):
+            e.get_response()
+        self.assertEqual(e.backend, self.embedly)
+
+    def test_use_best_backend_upgrades(self):
+        self.open_circuit()
+        e = Embed.objects.create(url=self.url)
+        self.embedly.circuit.reset()
+
+        self.assertTrue(e.use_best_backend())
+        self.assertEqual(e.backend, self.embedly)
+        self.assertFalse(e.needs_upgrade)
+
+    def test_refresh_upgrades_flagged_embeds(self):
+        from armstrong.apps.embeds.refresh import EmbedRefresher
+
+        self.open_circuit()
+        e = Embed.objects.create(url=self.url)
+        self.embedly.circuit.reset()
+
+        def call_many(obj, urls):
+            return [EmbedlyResponse(dict(type='link', url=u), fresh=True)
+                    for u in urls]
+
+        with fudge.patched_context(EmbedlyBackend, 'call_many', call_many):
+            list(EmbedRefresher(workers=1).run(Embed.objects.all()))
+
+        e = Embed.objects.get(pk=e.pk)
+        self.assertEqual(e.backend, self.embedly)
+        self.assertFalse(e.needs_upgrade)
+        self.assertEqual(e.response_cache['type'], 'link')
+
+
+class EmbedQuerySetTestCase(TestCase):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        # Remove everything but the default Backend
+        Backend.objects.exclude(name="default").delete()
+        self.backend = Backend.objects.get(name='default')
+
+        t = EmbedType.objects.create(name='TestType')
+        p = Provider.objects.create(name='TestProvider')
+        for i in range(5):
+            Embed.objects.create(
+                url="http://www.testme.com/%i" % i,
+                backend=self.backend, type=t, provider=p,
+                response_cache=dict(
+                    url=i, type='TestType', provider_name='TestProvider'))
+
+    def test_manager_and_queryset_provide_for_render(self):
+        self.assertTrue(Embed.objects.for_render()._for_render)
+        self.assertTrue(Embed.objects.all().for_render()._for_render)
+        self.assertFalse(Embed.objects.all()._for_render)
+
+    def test_for_render_survives_chaining(self):
+        qs = Embed.objects.for_render().filter(pk__gt=0).order_by('url')
+        self.assertTrue(qs._for_render)
+
+    def test_for_render_uses_a_single_query(self):
+        with self.assertNumQueries(1):
+            for e in Embed.objects.for_render():
+                self.assertEqual(e.backend, self.backend)
+                self.assertEqual(e.response.title, '')
+                self.assertEqual(e.type.name, 'TestType')
+                self.assertEqual(e.provider.name, 'TestProvider')
+
+    def test_for_render_reuses_joined_type_and_provider(self):
+        with self.assertNumQueries(1):
+            for e in Embed.objects.for_render():
+                self.assertIs(e.response.type, e.type)
+                self.assertIs(e.response.provider, e.provider)
+
+    def test_for_render_builds_responses(self):
+        for e in Embed.objects.for_render():
+            self.assertIsNotNone(e._response)
+
+    def test_for_render_shares_backends(self):
+        embeds = list(Embed.objects.for_render())
+        self.assertTrue(all(e.backend is embeds[0].backend for e in embeds))
+
+    def test_for_render_works_with_get(self):
+        e = Embed.objects.for_render().get(url="http://www.testme.com/1")
+        self.assertIsNotNone(e._response)
+
+    def test_plain_queryset_doesnt_build_responses(self):
+        for e in Embed.objects.all():
+            self.assertIsNone(e._response)
+
+
 class EmbedModelLayoutTestCase(TemplateCompareTestMixin, TestCase):
     fixtures = ['embed_backends']
 
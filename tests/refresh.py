@@ -0,0 +1,220 @@
+import os
+import fudge
+import tempfile
+from StringIO import StringIO
+from datetime import timedelta
+
+from django.core.management import call_command
+
+from armstrong.apps.embeds.models import Embed, Backend, Provider
+from armstrong.apps.embeds.backends import InvalidResponseError
+from armstrong.apps.embeds.refresh import (
+    EmbedRefresher, fetch_many, group_by_backend)
+from armstrong.apps.embeds.routing import router
+from ._utils import TestCase
+
+
+class RefreshTestCaseMixin(object):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        # Remove everything but the default Backend
+        Backend.objects.exclude(name="default").delete()
+        self.backend = Backend.objects.get(name='default')
+
+        # stale data: the Default backend responds with dict(url=url)
+        self.embeds = []
+        for i in range(5):
+            e = Embed(url="http://www.testme.com/%i" % i, backend=self.backend)
+            e.response_cache = dict(url='old')
+            e.save()
+            self.embeds.append(e)
+
+    def refreshed(self):
+        return len([e for e in Embed.objects.all()
+                    if e.response_cache['url'] != 'old'])
+
+
+class EmbedRefresherTestCase(RefreshTestCaseMixin, TestCase):
+    def run_refresher(self, queryset=None, **kwargs):
+        refresher = EmbedRefresher(workers=2, batch_size=2)
+        queryset = Embed.objects.all() if queryset is None else queryset
+        return list(refresher.run(queryset, **kwargs))
+
+    def test_refreshes_every_embed(self):
+        stats = self.run_refresher()
+        self.assertEqual(self.refreshed(), 5)
+        self.assertEqual(stats[-1].processed, 5)
+        self.assertEqual(stats[-1].changed, 5)
+        self.assertEqual(stats[-1].errors, 0)
+
+    def test_yields_stats_per_batch(self):
+        stats = self.run_refresher()
+        self.assertEqual(len(stats), 3)
+        self.assertEqual(stats[-1].last_pk, self.embeds[-1].pk)
+
+    def test_unchanged_embeds_arent_counted(self):
+        self.run_refresher()
+        stats = self.run_refresher()
+        self.assertEqual(stats[-1].processed, 5)
+        self.assertEqual(stats[-1].changed, 0)
+
+    def test_fetch_many_returns_responses_in_order(self):
+        results = fetch_many(self.embeds[:3])
+        self.assertEqual(
+            [e for e, _, _ in results], self.embeds[:3])
+        self.assertEqual(
+            [r._data['url'] for _, r, _ in results],
+            [e.url for e in self.embeds[:3]])
+
+    def test_fetch_many_captures_errors(self):
+        def raise_exc(obj, urls):
+            raise InvalidResponseError("broken")
+
+        with fudge.patched_context(Backend, 'call_many', raise_exc):
+            results = fetch_many(self.embeds[:3])
+        self.assertTrue(all(r is None for _, r, _ in results))
+        self.assertTrue(all(
+            isinstance(e, InvalidResponseError) for _, _, e in results))
+
+    def test_group_by_backend_uses_backend_batch_size(self):
+        other = Backend.objects.create(
+            name='other', regex='.*',
+            code_path='armstrong.apps.embeds.backends.twitter.TwitterBackend')
+        self.embeds[1].backend = other
+        self.embeds[1].save()
+        embeds = list(Embed.objects.select_related('backend').order_by('pk'))
+
+        tasks = group_by_backend(embeds)
+        self.assertEqual(len(tasks), 5)  # neither backend batches
+        self.assertEqual(tasks[-1], [embeds[1]])
+
+        tasks = group_by_backend(embeds, batch_size=3)
+        self.assertEqual([len(t) for t in tasks], [3, 1, 1])
+
+    def test_refresh_uses_call_many(self):
+        calls = []
+
+        def call_many(obj, urls):
+            calls.append(urls)
+            return [obj.call(url) for url in urls]
+
+        with fudge.patched_context(Backend, 'call_many', call_many):
+            self.run_refresher()
+        self.assertEqual(len(calls), 5)
+
+    def test_errors_are_counted_and_not_saved(self):
+        def raise_exc(obj, urls):
+            raise InvalidResponseError("broken")
+
+        with fudge.patched_context(Backend, 'call_many', raise_exc):
+            stats = self.run_refresher()
+        self.assertEqual(stats[-1].errors, 5)
+        self.assertEqual(self.refreshed(), 0)
+
+    def test_errors_are_recorded_on_embeds(self):
+        def raise_exc(obj, urls):
+            raise InvalidResponseError("broken")
+
+        with fudge.patched_context(Backend, 'call_many', raise_exc):
+            self.run_refresher()
+        self.assertEqual(
+            [e.failure_count for e in Embed.objects.all()], [1] * 5)
+
+    def test_embeds_backing_off_are_skipped(self):
+        self.embeds[0].record_failure("broken")
+        stats = self.run_refresher()
+        self.assertEqual(stats[-1].processed, 4)
+        self.assertEqual(self.refreshed(), 4)
+
+    def test_force_includes_embeds_backing_off(self):
+        self.embeds[0].record_failure("broken")
+        refresher = EmbedRefresher(workers=2, batch_size=2, force=True)
+        list(refresher.run(Embed.objects.all()))
+
+        self.assertEqual(self.refreshed(), 5)
+        self.assertEqual(Embed.objects.get(pk=self.embeds[0].pk).failure_count, 0)
+
+    def test_start_after_skips_earlier_embeds(self):
+        stats = self.run_refresher(start_after=self.embeds[2].pk)
+        self.assertEqual(stats[-1].processed, 2)
+        self.assertEqual(self.refreshed(), 2)
+
+    def test_upgrade_without_a_matching_backend_keeps_the_backend(self):
+        Embed.objects.filter(pk=self.embeds[0].pk).update(needs_upgrade=True)
+        Backend.objects.filter(pk=self.backend.pk).update(regex='nomatch')
+        router.invalidate()
+
+        stats = self.run_refresher()
+        self.assertEqual(stats[-1].processed, 5)
+        embed = Embed.objects.get(pk=self.embeds[0].pk)
+        self.assertEqual(embed.backend, self.backend)
+        self.assertFalse(embed.needs_upgrade)
+        self.assertEqual(self.refreshed(), 5)
+
+    def test_only_refreshes_queryset(self):
+        qs = Embed.objects.filter(pk=self.embeds[0].pk)
+        self.run_refresher(qs)
+        self.assertEqual(self.refreshed(), 1)
+
+
+class RefreshEmbedsCommandTestCase(RefreshTestCaseMixin, TestCase):
+    def call(self, **options):
+        out = StringIO()
+        call_command('refresh_embeds', stdout=out, **options)
+        return out.getvalue()
+
+    def test_refreshes_everything_by_default(self):
+        self.call()
+        self.assertEqual(self.refreshed(), 5)
+
+    def test_reports_stats(self):
+        out = self.call()
+        self.assertTrue("5 processed, 5 changed, 0 errors" in out)
+
+    def test_filters_by_age(self):
+        old = self.embeds[0].response_last_updated - timedelta(days=10)
+        Embed.objects.filter(pk=self.embeds[0].pk).update(
+            response_last_updated=old)
+
+        self.call(older_than=5)
+        self.assertEqual(self.refreshed(), 1)
+
+    def test_filters_by_backend(self):
+        self.call(backend=['nope'])
+        self.assertEqual(self.refreshed(), 0)
+        self.call(backend=['default'])
+        self.assertEqual(self.refreshed(), 5)
+
+    def test_filters_by_provider(self):
+        p = Provider.objects.create(name='TestProvider')
+        Embed.objects.filter(pk=self.embeds[0].pk).update(provider=p)
+
+        self.call(provider=['TestProvider'])
+        self.assertEqual(self.refreshed(), 1)
+
+    def test_filters_by_type(self):
+        self.call(type=['photo'])
+        self.assertEqual(self.refreshed(), 0)
+
+    def test_force_includes_embeds_backing_off(self):
+        self.embeds[0].record_failure("broken")
+        self.call()
+        self.assertEqual(self.refreshed(), 4)
+        self.call(force=True)
+        self.assertEqual(self.refreshed(), 5)
+
+    def test_filters_by_needs_upgrade(self):
+        Embed.objects.filter(pk=self.embeds[0].pk).update(needs_upgrade=True)
+        self.call(needs_upgrade=True)
+        self.assertEqual(self.refreshed(), 1)
+
+    def test_resumes_from_checkpoint_and_removes_it(self):
+        fd, path = tempfile.mkstemp()
+        os.write(fd, str(self.embeds[3].pk))
+        os.close(fd)
+
+        out = self.call(checkpoint=path)
+        self.assertTrue("Resuming after Embed %i" % self.embeds[3].pk in out)
+        self.assertEqual(self.refreshed(), 1)
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,275 @@
+import os
+import fudge
+from timeit import timeit
+
+try:
+    import unittest2 as unittest  # PY26, test env will install this
+except ImportError:  # pragma: no cover
+    import unittest
+
+from armstrong.apps.embeds import logger
+from armstrong.apps.embeds.models import Backend
+from armstrong.apps.embeds.routing import (
+    router, BackendRouter, host_from_regex, host_suffixes)
+from .models import fake_backend_init
+from ._utils import TestCase
+
+
+DEFAULT_CODE_PATH = 'armstrong.apps.embeds.backends.default.DefaultBackend'
+
+
+class StaticBackendRouter(BackendRouter):
+    """Route over a fixed list of unsaved Backends"""
+
+    def __init__(self, backends):
+        super(StaticBackendRouter, self).__init__()
+        self.backends = backends
+
+    def _load_backends(self):
+        return sorted(self.backends, key=lambda b: -b.priority)
+
+
+def make_backends(count):
+    """Lots of host-specific Backends plus a single catch-all"""
+
+    backends = [Backend(code_path=DEFAULT_CODE_PATH, regex='.*', priority=0)]
+    for i in range(count - 1):
+        backends.append(Backend(
+            code_path=DEFAULT_CODE_PATH,
+            regex=r'^https?://(www\.)?site%i\.com/' % i,
+            priority=1))
+    return backends
+
+
+class HostFromRegexTestCase(TestCase):
+    def test_catchall_regexes_have_no_host(self):
+        for regex in ['', '.*', 'thiswontmatch', '//.*', '^https?://[^/]+/']:
+            self.assertIsNone(host_from_regex(regex), regex)
+
+    def test_alternation_has_no_host(self):
+        self.assertIsNone(host_from_regex('//(youtube.com|youtu.be)/'))
+        self.assertIsNone(host_from_regex('//youtube.com/|vimeo'))
+
+    def test_literal_host(self):
+        self.assertEqual(
+            host_from_regex('^https?://twitter.com/'), 'twitter.com')
+        self.assertEqual(
+            host_from_regex(r'^https?://vimeo\.com/\d+'), 'vimeo.com')
+        self.assertEqual(
+            host_from_regex(r'^http://Flickr\.com$'), 'flickr.com')
+        self.assertEqual(
+            host_from_regex(r'^https:\/\/example\.com:8080/'), 'example.com')
+
+    def test_unanchored_regexes_have_no_host(self):
+        for regex in ['//twitter.com/', r'https?://vimeo\.com/',
+                      r'.*//vimeo\.com/', r'^.*//vimeo\.com/']:
+            self.assertIsNone(host_from_regex(regex), regex)
+
+    def test_optional_subdomain_group(self):
+        self.assertEqual(
+            host_from_regex(r'^https?://(www\.)?youtube\.com/watch'),
+            'youtube.com')
+        self.assertEqual(
+            host_from_regex(r'^https?://(?:[^/]+\.)*flickr\.com/'),
+            'flickr.com')
+
+    def test_partial_host_has_no_host(self):
+        self.assertIsNone(host_from_regex(r'^https?://youtube\.'))
+        self.assertIsNone(host_from_regex(r'^https?://www\.youtube'))
+        self.assertIsNone(host_from_regex(r'^https?://(www\.)?twitter\.com'))
+        self.assertIsNone(host_from_regex(r'^https?://(www)?youtube\.com/'))
+        self.assertIsNone(host_from_regex(r'^https?://youtube\.com?/'))
+
+    def test_host_suffixes(self):
+        self.assertEqual(
+            host_suffixes('a.b.com'), ['a.b.com', 'b.com', 'com'])
+
+
+class BackendRouterTestCase(TestCase):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        # Remove everything but the default Backend
+        Backend.objects.exclude(name="default").delete()
+
+        self.url = "http://www.testme.com"
+        self.backend = Backend.objects.get(name='default')
+        router.reset()
+
+    def tearDown(self):
+        router.reset()
+
+    def test_choose_returns_none_without_url(self):
+        self.assertIsNone(router.choose(None))
+        self.assertIsNone(router.choose(''))
+
+    def test_choose_returns_matching_backend(self):
+        self.assertEqual(router.choose(self.url), self.backend)
+
+    def test_choose_doesnt_query_once_built(self):
+        router.choose(self.url)
+        with self.assertNumQueries(0):
+            self.assertEqual(router.choose(self.url), self.backend)
+
+    def test_routes_are_compiled_in_priority_order(self):
+        with fudge.patched_context(Backend, '__init__', fake_backend_init):
+            Backend.objects.create(
+                name='b1', code_path='b1', regex='.*', priority=5)
+            Backend.objects.create(
+                name='b2', code_path='b2', regex='.*', priority=6)
+            routes = router.routes
+
+        priorities = [b.priority for _, b in routes]
+        self.assertEqual(priorities, [6, 5, 0])
+        self.assertTrue(all(hasattr(r, 'search') for r, _ in routes))
+
+    def test_saving_backend_rebuilds_routes(self):
+        router.choose(self.url)
+        self.backend.regex = "thiswontmatch"
+        self.backend.save()
+        self.assertIsNone(router.choose(self.url))
+
+    def test_deleting_backend_rebuilds_routes(self):
+        router.choose(self.url)
+        self.backend.delete()
+        self.assertIsNone(router.choose(self.url))
+
+    def change_elsewhere(self):
+        """Change the Backend without this process's signals"""
+        Backend.objects.filter(pk=self.backend.pk)\
+            .update(regex="thiswontmatch")
+
+    def test_other_process_change_rebuilds_routes(self):
+        router.choose(self.url)
+        self.change_elsewhere()
+        with self.settings(EMBEDS_ROUTING_CHECK_INTERVAL=0):
+            self.assertIsNone(router.choose(self.url))
+
+    def test_table_built_before_a_commit_is_replaced(self):
+        # another process rebuilds after the change was announced but
+        # before it was committed; it must not keep the old table
+        router.invalidate()
+        router.choose(self.url)
+        self.change_elsewhere()
+        with self.settings(EMBEDS_ROUTING_CHECK_INTERVAL=0):
+            self.assertIsNone(router.choose(self.url))
+
+    def test_unchanged_backends_arent_recompiled(self):
+        routes = router.routes
+        with self.settings(EMBEDS_ROUTING_CHECK_INTERVAL=0):
+            with self.assertNumQueries(1):
+                self.assertIs(router.routes, routes)
+
+    def test_backends_arent_checked_within_interval(self):
+        router.choose(self.url)
+        self.change_elsewhere()
+        with self.settings(EMBEDS_ROUTING_CHECK_INTERVAL=60):
+            with self.assertNumQueries(0):
+                self.assertEqual(router.choose(self.url), self.backend)
+
+    def test_host_specific_backend_only_tested_for_its_host(self):
+        with fudge.patched_context(Backend, '__init__', fake_backend_init):
+            twitter = Backend.objects.create(
+                name='b1', code_path='b1', regex=r'^https?://twitter\.com/',
+                priority=5)
+
+            self.assertEqual(
+                router.choose("https://twitter.com/status/1"), twitter)
+            self.assertEqual(router.choose(self.url), self.backend)
+            self.assertEqual(
+                [b for _, b in router.candidates(self.url)], [self.backend])
+
+    def test_unanchored_regex_matches_anywhere_in_the_url(self):
+        with fudge.patched_context(Backend, '__init__', fake_backend_init):
+            twitter = Backend.objects.create(
+                name='b1', code_path='b1', regex='//twitter.com/', priority=5)
+            self.assertEqual(
+                router.choose("https://evil.com/?u=https://twitter.com/x"),
+                twitter)
+            self.assertEqual(len(router.candidates(self.url)), 2)
+
+    def test_unanchored_host_prefix_is_a_catchall(self):
+        with fudge.patched_context(Backend, '__init__', fake_backend_init):
+            youtube = Backend.objects.create(
+                name='b1', code_path='b1', regex=r'^https?://www\.youtube',
+                priority=5)
+            self.assertEqual(
+                router.choose("https://www.youtube.com/watch?v=1"), youtube)
+
+    def test_unanchored_host_matches_longer_hostnames(self):
+        with fudge.patched_context(Backend, '__init__', fake_backend_init):
+            twitter = Backend.objects.create(
+                name='b1', code_path='b1',
+                regex=r'^https?://(www\.)?twitter\.com', priority=5)
+            self.assertEqual(router.choose("https://twitter.com.au/x"), twitter)
+            self.assertEqual(router.choose("https://twitter.com/x"), twitter)
+
+    def test_explicit_host_field_matches_subdomains(self):
+        with fudge.patched_context(Backend, '__init__', fake_backend_init):
+            b1 = Backend.objects.create(
+                name='b1', code_path='b1', regex='.*', host='Example.com',
+                priority=5)
+
+            self.assertEqual(router.choose("http://example.com/a"), b1)
+            self.assertEqual(router.choose("http://www.example.com/a"), b1)
+            self.assertEqual(router.choose("http://notexample.com/"), self.backend)
+
+    def test_candidates_keep_priority_order(self):
+        with fudge.patched_context(Backend, '__init__', fake_backend_init):
+            b1 = Backend.objects.create(
+                name='b1', code_path='b1', regex='.*', host='example.com',
+                priority=5)
+            b2 = Backend.objects.create(
+                name='b2', code_path='b2', regex='.*', priority=6)
+            b3 = Backend.objects.create(
+                name='b3', code_path='b3', regex='.*', host='www.example.com',
+                priority=7)
+
+            backends = [b for _, b in
+                        router.candidates("http://www.example.com/")]
+        self.assertEqual(backends, [b3, b2, b1, self.backend])
+
+    def test_url_without_host_tests_every_backend(self):
+        with fudge.patched_context(Backend, '__init__', fake_backend_init):
+            b1 = Backend.objects.create(
+                name='b1', code_path='b1', regex='twitter', host='twitter.com',
+                priority=5)
+            self.assertEqual(router.choose("twitter.com/status/1"), b1)
+            self.assertEqual(len(router.candidates("no host")), 2)
+
+    def test_candidates_dont_grow_with_unrelated_backends(self):
+        small = StaticBackendRouter(make_backends(10))
+        large = StaticBackendRouter(make_backends(1000))
+        url = "http://www.site5.com/page"
+        self.assertEqual(len(small.candidates(url)), 2)
+        self.assertEqual(len(large.candidates(url)), 2)
+        self.assertEqual(small.choose(url).regex, large.choose(url).regex)
+
+    def test_invalid_regex_is_skipped(self):
+        with fudge.patched_context(Backend, '__init__', fake_backend_init):
+            Backend.objects.create(
+                name='b1', code_path='b1', regex='(unbalanced', priority=5)
+            self.assertEqual(router.choose(self.url), self.backend)
+
+
+@unittest.skipUnless(os.environ.get('EMBEDS_BENCHMARK'),
+                     'set EMBEDS_BENCHMARK=1 to run benchmarks')
+class BackendRouterBenchmark(TestCase):
+    """Lookup cost should stay flat as the number of Backends grows"""
+
+    sizes = [10, 100, 1000, 10000]
+    lookups = 10000
+
+    def test_lookup_cost_is_flat(self):
+        timings = []
+        for size in self.sizes:
+            r = StaticBackendRouter(make_backends(size))
+            url = "http://www.site%i.com/page" % (size // 2)
+            r.choose(url)  # build the table outside of the timing
+
+            seconds = timeit(lambda: r.choose(url), number=self.lookups)
+            timings.append(seconds)
+            logger.info("%6i backends: %.2f usec/lookup"
+                        % (size, seconds / self.lookups * 1e6))
+
+        self.assertLess(timings[-1], timings[0] * 3)
@@ -0,0 +1,147 @@
+import fudge
+from StringIO import StringIO
+
+try:
+    import unittest2 as unittest  # PY26, test env will install this
+except ImportError:  # pragma: no cover
+    import unittest
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import signals
+
+from armstrong.apps.embeds import models
+from armstrong.apps.embeds.models import Embed, Backend
+from armstrong.apps.embeds.backends.default import DefaultResponse
+from armstrong.apps.embeds.search import (
+    TABLE, SearchIndex, SQLiteSearchIndex, get_index, get_installed_index,
+    index, install)
+from ._utils import TestCase
+
+
+class SearchTestCaseMixin(object):
+    fixtures = ['embed_backends']
+
+    def setUp(self):
+        self.backend = Backend.objects.get(name='default')
+        self.embed = self.create(
+            'http://example.com/first', title='Kittens on Parade',
+            author_name='Jane Doe', description='A very fluffy march')
+        self.other = self.create(
+            'http://example.org/second', title='Weather Report')
+
+    def create(self, url, **data):
+        embed = Embed(url=url, backend=self.backend)
+        embed.response = DefaultResponse(fresh=True, data=data)
+        embed.save()
+        return embed
+
+    def search(self, terms):
+        return sorted(e.pk for e in Embed.objects.search(terms))
+
+    def test_matches_each_column(self):
+        for terms in ('example.com', 'kittens', 'doe', 'fluffy'):
+            self.assertEqual(self.search(terms), [self.embed.pk], terms)
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search('kittens march'), [self.embed.pk])
+        self.assertEqual(self.search('kittens weather'), [])
+
+    def test_is_case_insensitive(self):
+        self.assertEqual(self.search('KITTENS'), [self.embed.pk])
+
+    def test_empty_terms_match_everything(self):
+        self.assertEqual(self.search(' "* '),
+                         sorted([self.embed.pk, self.other.pk]))
+
+    def test_query_syntax_is_ignored(self):
+        self.assertEqual(self.search('kittens OR "weather'), [])
+
+    def test_saving_updates_the_index(self):
+        self.other.response = DefaultResponse(
+            fresh=True, data=dict(title='Sunny Kittens'))
+        self.other.save()
+        self.assertEqual(self.search('kittens'),
+                         sorted([self.embed.pk, self.other.pk]))
+        self.assertEqual(self.search('weather'), [])
+
+    def test_deleting_removes_from_the_index(self):
+        self.embed.delete()
+        self.assertEqual(self.search('kittens'), [])
+
+    def test_saving_a_deferred_embed_keeps_it_indexed(self):
+        embed = Embed.objects.defer('response_cache').get(pk=self.embed.pk)
+        embed.needs_upgrade = True
+        embed.save()
+        self.assertEqual(self.search('fluffy'), [self.embed.pk])
+
+    def test_rebuild_command(self):
+        connection.cursor().execute("DELETE FROM %s" % TABLE)
+        self.assertEqual(self.search('kittens'), [])
+
+        out = StringIO()
+        call_command('rebuild_embed_search', batch_size=1, stdout=out)
+        self.assertTrue("2 Embeds indexed" in out.getvalue())
+        self.assertEqual(self.search('kittens'), [self.embed.pk])
+
+    def test_failed_rebuild_keeps_the_old_index(self):
+        add_many = index.add_many
+
+        def fail_after_first_batch(embeds):
+            if embeds[0].pk != self.embed.pk:
+                raise RuntimeError("indexing failed")
+            add_many(embeds)
+
+        with fudge.patched_context(index, 'add_many', fail_after_first_batch):
+            with self.assertRaises(RuntimeError):
+                call_command('rebuild_embed_search', batch_size=1,
+                             stdout=StringIO())
+        self.assertEqual(self.search('weather'), [self.other.pk])
+
+
+class SearchTestCase(SearchTestCaseMixin, TestCase):
+    def test_uses_full_text_search_on_sqlite(self):
+        self.assertTrue(isinstance(get_index(), SQLiteSearchIndex))
+        self.assertEqual(get_installed_index().module, get_index().module)
+
+    def drop_table(self):
+        cursor = connection.cursor()
+        for sql in index.uninstall_sql():
+            cursor.execute(sql)
+        index.reset()
+
+    def test_install_creates_a_missing_table(self):
+        self.assertFalse(install())
+        self.drop_table()
+        self.assertTrue(install())
+        self.assertTrue(TABLE in connection.introspection.table_names())
+        self.assertEqual(self.search('kittens'), [])
+
+    @unittest.skipIf(hasattr(signals, 'post_migrate'),
+                     "the table is created by a migration")
+    def test_syncdb_creates_the_table(self):
+        self.drop_table()
+        signals.post_syncdb.send(
+            sender=models, app=models, created_models=[],
+            verbosity=0, interactive=False, db='default')
+        self.assertTrue(TABLE in connection.introspection.table_names())
+        self.create('http://example.com/third', title='Kittens Again')
+        self.assertEqual(len(self.search('kittens')), 1)
+
+
+class FallbackSearchTestCase(SearchTestCaseMixin, TestCase):
+    def setUp(self):
+        cursor = connection.cursor()
+        for sql in index.uninstall_sql() + SearchIndex().install_sql():
+            cursor.execute(sql)
+        index.reset()
+        super(FallbackSearchTestCase, self).setUp()
+
+    def tearDown(self):
+        index.reset()
+
+    def test_uses_the_installed_table(self):
+        self.assertEqual(type(get_installed_index()), SearchIndex)
+
+    def test_underscore_isnt_a_wildcard(self):
+        self.assertEqual(self.search('kittens_on'), [])
@@ -5,11 +5,43 @@ from logging import StreamHandler
 from django.template import TemplateSyntaxError
 
 from armstrong.apps.embeds import logger
-from armstrong.apps.embeds.templatetags.embed_helpers import resize_iframe
+from armstrong.apps.embeds.models import Embed
+from armstrong.apps.embeds.backends.default import DefaultResponse
+from armstrong.apps.embeds.templatetags.embed_helpers import (
+    resize_iframe, resize_cache, for_render, render_at)
 from .._utils import TestCase
 
 
-__all__ = ['ResizeIframeWithoutLXMLTestCase', 'ResizeIframeTestCase']
+__all__ = ['ForRenderTestCase', 'RenderAtTestCase', 'ResizeIframeWithoutLXMLTestCase',
+           'ResizeIframeTestCase', 'ResizeIframeStreamingTestCase',
+           'ResizeIframeCacheTestCase']
+
+
+class ForRenderTestCase(TestCase):
+    def test_prepares_querysets(self):
+        self.assertTrue(for_render(Embed.objects.all())._for_render)
+
+    def test_prepares_managers(self):
+        self.assertTrue(for_render(Embed.objects)._for_render)
+
+    def test_passes_through_other_values(self):
+        embeds = [Embed()]
+        self.assertIs(for_render(embeds), embeds)
+        self.assertEqual(for_render(''), '')
+
+
+class RenderAtTestCase(TestCase):
+    def test_calls_render_at_with_an_int(self):
+        response = fudge.Fake().expects('render_at').with_args(640)\
+            .returns('resized')
+        self.assertEqual(render_at(response, '640'), 'resized')
+
+    def test_no_response_renders_nothing(self):
+        self.assertEqual(render_at(None, 640), '')
+
+    def test_response_without_html_renders_nothing(self):
+        response = DefaultResponse(dict(title='No HTML'))
+        self.assertEqual(render_at(response, 640), '')
 
 
 class ResizeIframeWithoutLXMLTestCase(TestCase):
@@ -19,8 +51,8 @@ class ResizeIframeWithoutLXMLTestCase(TestCase):
         can replace it and then restore it when the tests are finished.
 
         """
-        import lxml.html
-        self.original_module = sys.modules.get('lxml.html')
+        __import__('lxml.html')
+        self.original_module = sys.modules['lxml.html']
         sys.modules['lxml.html'] = fudge.Fake('lxml.html')
 
     def tearDown(self):
@@ -31,15 +63,20 @@ class ResizeIframeWithoutLXMLTestCase(TestCase):
         log_handler = StreamHandler(log_capture)
         logger.addHandler(log_handler)
 
-        resize_iframe('value', 200)
+        resize_iframe('<iframe width="300"', 200)
         self.assertTrue("lxml package is missing" in log_capture.getvalue())
 
         logger.removeHandler(log_handler)
 
     def test_tag_returns_untouched_value(self):
-        value = 'template with a bunch of code'
+        value = 'template with a <iframe width="300" bunch of code'
         self.assertEqual(value, resize_iframe(value, 200))
 
+    def test_resizes_well_formed_markup(self):
+        value = '<iframe width="300" height="150"></iframe>'
+        self.assertEqual(resize_iframe(value, 200),
+                         '<iframe width="200" height="100"></iframe>')
+
 
 class ResizeIframeTestCase(TestCase):
     def setUp(self):
@@ -138,3 +175,89 @@ class ResizeIframeTestCase(TestCase):
         result = resize_iframe(mod, self.new_width)
         self.assertNotEqual(result, mod)
         self.assertEqual(result.count(self.expected_result), 3)
+
+
+class ResizeIframeStreamingTestCase(TestCase):
+    def test_copies_other_markup_through_as_is(self):
+        html = ''.join([
+            '<p class=intro>Tom &amp; Jerry<br>',
+            '<IFRAME src=x WIDTH=\'400\' Height=200 allowfullscreen>',
+            '</IFRAME></p><img src="y.png">'])
+        self.assertEqual(resize_iframe(html, 100), html
+                         .replace("'400'", "'100'")
+                         .replace("Height=200", "Height=50"))
+
+    def test_only_changes_first_of_repeated_attributes(self):
+        html = '<iframe width="400" width="300"></iframe>'
+        self.assertEqual(resize_iframe(html, 100),
+                         '<iframe width="100" width="300"></iframe>')
+
+    def test_ignores_iframes_in_comments_and_scripts(self):
+        html = ''.join([
+            '<!-- <iframe width="400"> -->',
+            '<script>var s = \'<iframe width="400">\';</script>'])
+        self.assertEqual(resize_iframe(html, 100), html)
+
+    def test_ignores_attributes_named_like_width(self):
+        html = '<iframe data-width="400" title="width=400"></iframe>'
+        self.assertEqual(resize_iframe(html, 100), html)
+
+    def test_falls_back_to_lxml_for_malformed_markup(self):
+        result = resize_iframe('<div><iframe width="400" height="200"', 100)
+        self.assertTrue('width="100"' in result)
+        self.assertTrue('height="50"' in result)
+
+    def test_doesnt_parse_well_formed_markup(self):
+        with fudge.patched_context(
+                'armstrong.apps.embeds.templatetags.embed_helpers',
+                '_resize_iframe', fudge.Fake().is_callable().times_called(0)):
+            resize_iframe('<iframe width="400"></iframe>', 100)
+
+
+class ResizeIframeCacheTestCase(TestCase):
+    original = ''.join([
+        '<iframe width="560" height="300" ',
+        'src="http://www.youtube.com/embed/M7lc1UVf-VE"></iframe>'])
+
+    def test_repeated_call_is_a_hit(self):
+        first = resize_iframe(self.original, 280)
+        self.assertEqual(resize_cache.stats()['misses'], 1)
+        self.assertEqual(resize_iframe(self.original, 280), first)
+        self.assertEqual(resize_cache.stats()['hits'], 1)
+
+    def test_width_is_part_of_the_key(self):
+        small = resize_iframe(self.original, 280)
+        smaller = resize_iframe(self.original, 140)
+        self.assertNotEqual(small, smaller)
+        self.assertEqual(resize_cache.stats()['misses'], 2)
+
+    def test_doesnt_parse_on_a_hit(self):
+        resize_iframe(self.original, 280)
+        with fudge.patched_context(
+                'armstrong.apps.embeds.templatetags.embed_helpers',
+                '_resize_iframe', fudge.Fake().is_callable().times_called(0)):
+            resize_iframe(self.original, 280)
+
+    def test_local_tier_is_bounded(self):
+        with self.settings(EMBEDS_RESIZE_CACHE_SIZE=1):
+            resize_cache.__init__()
+        for width in (280, 140):
+            resize_iframe(self.original, width)
+        self.assertEqual(resize_cache.stats()['size'], 1)
+        resize_cache.__init__()
+
+    def test_shared_tier_fills_the_local_tier(self):
+        with self.settings(EMBEDS_RESIZE_SHARED_CACHE='default'):
+            first = resize_iframe(self.original, 280)
+            resize_cache.local.clear()
+            self.assertEqual(resize_iframe(self.original, 280), first)
+            self.assertEqual(resize_cache.stats()['shared_hits'], 1)
+            self.assertEqual(resize_cache.stats()['shared_misses'], 1)
+            resize_iframe(self.original, 280)
+            self.assertEqual(resize_cache.stats()['hits'], 1)
+
+    def test_no_shared_tier_by_default(self):
+        resize_iframe(self.original, 280)
+        stats = resize_cache.stats()
+        self.assertEqual(stats['shared_hits'], 0)
+        self.assertEqual(stats['shared_misses'], 0)
@@ -0,0 +1,70 @@
+from armstrong.apps.embeds.utils import LRUCache, backoff_delay
+from ._utils import TestCase
+
+
+class LRUCacheTestCase(TestCase):
+    def setUp(self):
+        self.cache = LRUCache(maxsize=2)
+
+    def test_get_missing_returns_default(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('a', 'default'), 'default')
+
+    def test_set_and_get(self):
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertTrue('a' in self.cache)
+
+    def test_set_overwrites(self):
+        self.cache.set('a', 1)
+        self.cache.set('a', 2)
+        self.assertEqual(self.cache.get('a'), 2)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertFalse('b' in self.cache)
+        self.assertTrue('a' in self.cache)
+        self.assertTrue('c' in self.cache)
+
+    def test_zero_size_caches_nothing(self):
+        cache = LRUCache(maxsize=0)
+        cache.set('a', 1)
+        self.assertFalse('a' in cache)
+
+    def test_counts_hits_and_misses(self):
+        self.cache.set('a', 1)
+        self.cache.get('a')
+        self.cache.get('b')
+        self.assertEqual(
+            self.cache.stats(),
+            dict(hits=1, misses=1, size=1, maxsize=2))
+
+    def test_clear(self):
+        self.cache.set('a', 1)
+        self.cache.get('a')
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.hits, 0)
+
+
+class BackoffDelayTestCase(TestCase):
+    def test_no_failures_no_delay(self):
+        self.assertEqual(backoff_delay(0, 10, 100), 0)
+
+    def test_doubles_per_failure(self):
+        delays = [backoff_delay(n, 10, 1000, jitter=0) for n in range(1, 5)]
+        self.assertEqual(delays, [10, 20, 40, 80])
+
+    def test_is_capped(self):
+        self.assertEqual(backoff_delay(50, 10, 1000, jitter=0), 1000)
+
+    def test_jitter_reduces_delay(self):
+        for i in range(20):
+            delay = backoff_delay(3, 10, 1000, jitter=0.5)
+            self.assertTrue(20 <= delay <= 40)